@@ -11,35 +11,7 @@ PROMPT_FILE="$SKILL_DIR/agent-loop-prompt.md"
 
 echo "🤖 Spirit Agent Loop - $(date)" >&2
 
-# --- Auto-update skill from GitHub ---
-echo "🔄 Checking for skill updates..." >&2
-(cd "$SKILL_DIR" && GIT_SSH_COMMAND="ssh -i $HOME/.ssh/id_ed25519_spirit" git pull --ff-only 2>&1 | tail -1) >&2 || echo "⚠️ Skill update check failed (continuing)" >&2
-
-# --- Fetch agent details from API ---
-echo "📡 Fetching agent profile from API..." >&2
-AGENT_ME=$(curl -s -H "Authorization: Bearer $PLATFORM_API_KEY" "$PLATFORM_API_URL/api/v1/agents/me" 2>/dev/null)
-if echo "$AGENT_ME" | jq -e '.success' >/dev/null 2>&1; then
-    # Override env vars with live API data
-    AGENT_ID=$(echo "$AGENT_ME" | jq -r '.data.agent.id')
-    BASE_WALLET_ADDRESS=$(echo "$AGENT_ME" | jq -r '.data.agent.wallet_address')
-    X_HANDLE=$(echo "$AGENT_ME" | jq -r '.data.agent.x_handle')
-    AGENT_NAME=$(echo "$AGENT_ME" | jq -r '.data.agent.name')
-    AGENT_STATUS=$(echo "$AGENT_ME" | jq -r '.data.agent.status')
-    AGENT_DISPLAY_NAME=$(echo "$AGENT_ME" | jq -r '.data.agent.display_name // empty')
-    AGENT_DESCRIPTION=$(echo "$AGENT_ME" | jq -r '.data.agent.description // empty')
-    AGENT_AVATAR_EMOJI=$(echo "$AGENT_ME" | jq -r '.data.agent.avatar_emoji // empty')
-    AGENT_CREATED_AT=$(echo "$AGENT_ME" | jq -r '.data.agent.created_at')
-    echo "✅ Agent: $AGENT_NAME ($AGENT_ID) | Wallet: $BASE_WALLET_ADDRESS | X: $X_HANDLE" >&2
-else
-    echo "⚠️ Could not fetch agent profile from API, falling back to .env" >&2
-fi
-
 # --- Mandatory checks ---
-if [[ -z "${BASE_WALLET_ADDRESS:-}" ]]; then
-    echo "❌ BASE_WALLET_ADDRESS not set and API fetch failed. Run setup.sh first." >&2
-    exit 1
-fi
-
 if [[ ! -f "$PROMPT_FILE" ]]; then
     echo "❌ Agent prompt not found: $PROMPT_FILE" >&2
     exit 1
@@ -51,9 +23,58 @@ if [[ ! -f "$STRATEGY_FILE" ]]; then
     exit 1
 fi
 
-# --- MANDATORY: Heartbeat ---
-echo "💓 Heartbeat..." >&2
-"$SCRIPTS_DIR/heartbeat.sh" >/dev/null 2>&1 || echo "⚠️  Heartbeat failed" >&2
+# --- Keep the warm twitter.py daemon running, on the code that is on disk ---
+# A skill update (context.py's git pull) changes the code under a running
+# daemon; ping then reports it stale and it is restarted on the new code
+stop_pid() {
+    kill "$1" 2>/dev/null || return 0
+    for _ in $(seq 50); do
+        kill -0 "$1" 2>/dev/null || return 0
+        sleep 0.1
+    done
+}
+
+ensure_daemon() {
+    local ping
+    ping=$(python3 "$SCRIPTS_DIR/twitter.py" ping 2>/dev/null) || ping='{}'
+    if [[ "$(echo "$ping" | jq -r '.stale // false' 2>/dev/null)" == "true" ]]; then
+        echo "🐦 Restarting twitter.py daemon on updated code..." >&2
+        stop_pid "$(echo "$ping" | jq -r '.pid')"
+    elif [[ "$(echo "$ping" | jq -r '.daemon // false' 2>/dev/null)" == "true" ]]; then
+        return 0
+    else
+        echo "🐦 Starting twitter.py daemon..." >&2
+    fi
+    (cd "$SKILL_DIR" && nohup python3 scripts/twitter.py serve >/dev/null 2>>"$SKILL_DIR/.twitter_daemon.log" &)
+}
+
+ensure_daemon
+
+# --- Keep the price monitor running, on the code that is on disk ---
+# market.py monitor re-prices the watchlist and open positions every few
+# seconds and appends take-profit/stop-loss/move events for context.py.
+# It records its pid and code hash in .monitor.json; `monitor --status`
+# reports it stale after a skill update and it is restarted like the daemon
+ensure_monitor() {
+    local status
+    if [[ -f "$SKILL_DIR/.monitor.pid" ]]; then
+        # A monitor started before .monitor.json existed
+        stop_pid "$(cat "$SKILL_DIR/.monitor.pid")"
+        rm -f "$SKILL_DIR/.monitor.pid"
+    fi
+    status=$(python3 "$SCRIPTS_DIR/market.py" monitor --status 2>/dev/null) || status='{}'
+    if [[ "$(echo "$status" | jq -r '.stale // false' 2>/dev/null)" == "true" ]]; then
+        echo "👀 Restarting price monitor on updated code..." >&2
+        stop_pid "$(echo "$status" | jq -r '.pid')"
+    elif [[ "$(echo "$status" | jq -r '.running // false' 2>/dev/null)" == "true" ]]; then
+        return 0
+    else
+        echo "👀 Starting price monitor..." >&2
+    fi
+    (cd "$SKILL_DIR" && nohup python3 scripts/market.py monitor >>"$SKILL_DIR/.monitor_events.jsonl" 2>>"$SKILL_DIR/.monitor.log" &)
+}
+
+ensure_monitor
 
 # --- Load personality ---
 SOUL_FILE="$SKILL_DIR/SOUL.md"
@@ -62,49 +83,71 @@ if [[ -f "$SOUL_FILE" ]]; then
     SOUL_CONTENT=$(cat "$SOUL_FILE")
 fi
 
-# --- Fetch context from platform (parallel) ---
-API_HEADERS=(-H "Authorization: Bearer $PLATFORM_API_KEY")
-API_BASE="$PLATFORM_API_URL/api/v1"
-
+# --- Fetch context (parallel) ---
+# context.py runs the skill update, heartbeat, agent profile and every prompt
+# section concurrently with per-section timeouts and caching, and prints
+# {"agent", "sections", "status", "timing_ms"}
 echo "📡 Fetching context..." >&2
+CONTEXT=$(python3 "$SCRIPTS_DIR/context.py" || echo '{}')
+
+# The skill update above may have left the daemon and monitor on old code
+ensure_daemon
+ensure_monitor
+
+# --- Startup budget, once per version of twitter.py ---
+# bench.py budget times the twitter.py paths that never reach Twitter (help,
+# ping, local actions, dedup skips); an update that slows them down or makes
+# them import asyncio/twikit/httpx is logged here instead of going unnoticed
+check_budget() {
+    local version
+    version=$(cat "$SCRIPTS_DIR"/twitter*.py | sha1sum | cut -c1-12)
+    if [[ "$(cat "$SKILL_DIR/.budget_version" 2>/dev/null)" == "$version" ]]; then
+        return 0
+    fi
+    echo "⏱️ Checking twitter.py startup budget..." >&2
+    if ! python3 "$SCRIPTS_DIR/bench.py" budget >"$SKILL_DIR/.budget.json" 2>/dev/null; then
+        echo "⚠️ twitter.py startup budget exceeded (see .budget.json)" >&2
+    fi
+    echo "$version" >"$SKILL_DIR/.budget_version"
+}
+
+check_budget
+
+ctx() {
+    echo "$CONTEXT" | jq -r --arg k "$1" '.sections[$k] // empty' 2>/dev/null || true
+}
+
+if echo "$CONTEXT" | jq -e '.agent.id' >/dev/null 2>&1; then
+    # Override env vars with live API data
+    AGENT_ME=$(echo "$CONTEXT" | jq '.agent')
+    AGENT_ID=$(echo "$AGENT_ME" | jq -r '.id')
+    BASE_WALLET_ADDRESS=$(echo "$AGENT_ME" | jq -r '.wallet_address')
+    X_HANDLE=$(echo "$AGENT_ME" | jq -r '.x_handle')
+    AGENT_NAME=$(echo "$AGENT_ME" | jq -r '.name')
+    AGENT_STATUS=$(echo "$AGENT_ME" | jq -r '.status')
+    AGENT_DISPLAY_NAME=$(echo "$AGENT_ME" | jq -r '.display_name // empty')
+    AGENT_DESCRIPTION=$(echo "$AGENT_ME" | jq -r '.description // empty')
+    AGENT_AVATAR_EMOJI=$(echo "$AGENT_ME" | jq -r '.avatar_emoji // empty')
+    AGENT_CREATED_AT=$(echo "$AGENT_ME" | jq -r '.created_at')
+    echo "✅ Agent: $AGENT_NAME ($AGENT_ID) | Wallet: $BASE_WALLET_ADDRESS | X: $X_HANDLE" >&2
+else
+    echo "⚠️ Could not fetch agent profile from API, falling back to .env" >&2
+fi
 
-# Recent actions (last 20)
-RECENT_ACTIONS=$(curl -s "${API_HEADERS[@]}" "$API_BASE/social-actions?limit=20" 2>/dev/null | \
-    jq -r '.data.data[]? | "\(.reportedAt) | \(.actionType) | \(.content // .externalId // "–")"' 2>/dev/null || true)
-
-# Reply log (for agent awareness)
-REPLY_LOG=$(cd "$SKILL_DIR" && python3 -c "
-import json, os, time
-f = os.path.join('$SKILL_DIR', '.reply_log.json')
-if not os.path.exists(f): exit()
-log = json.load(open(f))
-now = time.time()
-for e in log:
-    if now - e.get('ts',0) < 86400:
-        print(f\"tweet:{e['tweet_id']} | {e['text'][:120]}\")
-" 2>/dev/null || true)
-
-# Leaderboard (top agents)
-LEADERBOARD=$(curl -s "$API_BASE/leaderboard?limit=10" 2>/dev/null | \
-    jq -r '.data.agents[]? | "#\(.rank // "?") \(.name) | PnL: $\(.total_pnl_usd // "0") | Trades: \(.trade_count // 0)"' 2>/dev/null || true)
-
-# Platform stats
-PLATFORM_STATS=$(curl -s "$API_BASE/stats" 2>/dev/null | \
-    jq -r '.data // empty | "Agents: \(.total_agents // 0) active: \(.active_agents // 0) | Trades: \(.total_trades // 0) | Volume: $\(.total_volume_usd // "0")"' 2>/dev/null || true)
-
-# Your token launches (with live market data)
-MY_LAUNCHES=$("$SCRIPTS_DIR/launches.sh" 2>/dev/null || echo "No launches yet.")
-
-# Recent onchain transactions
-MY_TXS=$("$SCRIPTS_DIR/transactions.sh" 10 2>/dev/null || echo "No transactions.")
-
-# Own Twitter profile
-OWN_PROFILE=$(cd "$SKILL_DIR" && python3 scripts/twitter.py user "$(echo "${X_HANDLE:-@unknown}" | tr -d '@')" 2>/dev/null | \
-    jq -r '.user // empty | "Name: \(.name) | @\(.username) | Followers: \(.followers) | Following: \(.following) | Tweets: \(.tweets) | Bio: \(.bio // "none")"' 2>/dev/null || true)
+if [[ -z "${BASE_WALLET_ADDRESS:-}" ]]; then
+    echo "❌ BASE_WALLET_ADDRESS not set and API fetch failed. Run setup.sh first." >&2
+    exit 1
+fi
 
-# Own recent tweets performance
-OWN_TWEETS=$(cd "$SKILL_DIR" && python3 scripts/twitter.py user_tweets "$(echo "${X_HANDLE:-@unknown}" | tr -d '@')" 10 2>/dev/null | \
-    jq -r '.tweets[]? | "\(.created_at) | ❤️\(.likes // 0) 🔁\(.retweets // 0) | \(.text[0:80])"' 2>/dev/null || true)
+RECENT_ACTIONS=$(ctx recent_actions)
+REPLY_LOG=$(ctx reply_log)
+PRICE_ALERTS=$(ctx price_alerts)
+LEADERBOARD=$(ctx leaderboard)
+PLATFORM_STATS=$(ctx platform_stats)
+MY_LAUNCHES=$(ctx launches)
+MY_TXS=$(ctx transactions)
+OWN_PROFILE=$(ctx own_profile)
+OWN_TWEETS=$(ctx own_tweets)
 
 echo "✅ Context loaded" >&2
 
@@ -173,15 +216,18 @@ $(date -u +%Y-%m-%dT%H:%M:%SZ)
 ## Your Twitter Profile
 ${OWN_PROFILE:-Could not load profile.}
 
-## Your Recent Tweets (check what performed well)
+## Your Recent Tweets (engagement gained in the last 1h / 24h — see what performed well)
 ${OWN_TWEETS:-No recent tweets.}
 
 ## Your Recent Actions (don't repeat yourself)
 ${RECENT_ACTIONS:-No recent actions yet.}
 
-## Your Reply History (check before replying — don't reply to the same tweet twice or repeat yourself)
+## Your Reply History (last 24h — don't reply to these tweets again; near-identical text is rejected with "skipped": true, so rephrase)
 ${REPLY_LOG:-No replies logged yet.}
 
+## Price Alerts (last hour — take_profit/stop_loss hits on your positions come from your strategy thresholds)
+${PRICE_ALERTS:-No price alerts.}
+
 ## Your Recent Transactions (onchain activity)
 ${MY_TXS:-No transactions.}
 
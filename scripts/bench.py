@@ -0,0 +1,793 @@
+#!/usr/bin/env python3
+"""
+Spirit Agent offline benchmark for twitter.py.
+Usage: python3 bench.py <action> [args...]
+
+Runs twitter.py against a local stand-in for the x.com endpoints it uses
+(CreateTweet, FavoriteTweet, SearchTimeline, HomeTimeline, notifications,
+TweetResultsByRestIds, UserByScreenName/UserTweets, media upload) and for PLATFORM_API_URL
+(/api/v1/social-actions), inside a throwaway copy of the skill directory —
+no real cookies, state files or accounts are touched.
+
+BENCH:
+  run [scenario ...]                   Run scenarios (default: all) and print JSON results
+      [--iterations N]                 Calls per action / loop ticks (default 5)
+      [--batch-size N]                 Requests in the batch scenario (default 40)
+      [--concurrency N]                Batch concurrency (default 4)
+      [--latency MS] [--jitter MS]     Server delay per API request, plus uniform 0..jitter
+      [--error-rate P]                 Fraction of API requests answered with a 503
+      [--rate-limit-rate P]            Fraction answered with a 429 (reset 1s later)
+      [--seed N]                       Seed for injected latency/faults (default 1)
+      [--trace 1]                      Run twitter.py with TWITTER_TRACE=1 (tracing overhead)
+      [--out file]                     Also write the results to file
+  serve [--port N] [fault flags]       Only run the stand-in (point TWITTER_API_BASE and
+                                       PLATFORM_API_URL at it for manual runs)
+  budget [--max-ms N] [--iterations N] Startup budget of the paths that never reach Twitter
+                                       (help, ping, a local action, a dedup hit): exits 1
+                                       if one takes more than N ms (default 40) over the
+                                       bare interpreter or loads asyncio/twikit/httpx
+
+SCENARIOS:
+  cold       Interpreter, twitter.py import and twikit import time
+  actions    End-to-end latency per action, one twitter.py process per call
+  batch      Throughput of one `twitter.py batch` run, in-process and through the daemon
+  loop       An agent-loop tick (timeline, search, like, reply, post) as separate
+             processes, without and with the daemon
+  state      Per-call cost of the dedup store and reply log as they grow
+"""
+
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SKILL_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, '..'))
+
+SCENARIOS = ['cold', 'actions', 'batch', 'loop', 'state']
+DEFAULTS = {
+    'iterations': 5,
+    'batch_size': 40,
+    'concurrency': 4,
+    'latency': 0.0,
+    'jitter': 0.0,
+    'error_rate': 0.0,
+    'rate_limit_rate': 0.0,
+    'seed': 1,
+    'trace': 0,
+    'max_ms': 40.0,
+}
+
+def _log(msg):
+    print(msg, file=sys.stderr, flush=True)
+
+# --- Stand-in server ---
+# Just enough of x.com for twikit: the home page and ondemand.s script it
+# scrapes once per client for X-Client-Transaction-Id, the GraphQL operations
+# and REST endpoints twitter.py calls, the media upload commands and the
+# platform API. Requests are routed on the Host header (TWITTER_API_BASE only
+# changes where twikit connects), counted per route, and every API request —
+# not the bootstrap pages — can be delayed or failed with a 503 or a 429.
+BENCH_HANDLE = 'spiritbench'
+FIRST_TWEET_ID = 1900000000000000000
+FEED_TEXTS = [
+    '$SOL looking strong, breakout incoming 🚀',
+    'gm. $ETH holding the range, patience',
+    'early on $BRETT again? this is the alpha',
+    'bearish divergence on $DEGEN, careful here',
+    'new Base launch $TOSHI pumping, watching volume',
+    'wagmi #base #crypto',
+]
+# twikit reads key bytes at these indices of the site verification key
+ONDEMAND_INDICES = [2, 12, 14, 7]
+ONDEMAND_HASH = 'b3nch'
+
+def _home_page():
+    key = bytes((i * 37 + 11) % 256 for i in range(48))
+    import base64
+    # 16 rows of 11 values (two colours, a rotation and a cubic curve) per frame
+    rows = 'C'.join(' '.join(str((r * 29 + k * 53) % 256) for k in range(11)) for r in range(16))
+    frames = ''.join(f'<svg id="loading-x-anim-{i}"><g><path d="M0"></path><path d="M 10,30 C{rows}"></path></g></svg>'
+                     for i in range(4))
+    return (f'<html><head><meta name="twitter-site-verification" content="{base64.b64encode(key).decode()}">'
+            f'</head><body>{frames}<script>window.__SCRIPTS__={{\'ondemand.s\':\'{ONDEMAND_HASH}\'}}</script>'
+            '</body></html>').encode()
+
+def _ondemand_js():
+    return ('function k(a){return [' + ','.join(f'parseInt(a[{i}], 16)' for i in ONDEMAND_INDICES) + ']}').encode()
+
+def _user_legacy(screen_name):
+    return {
+        'created_at': 'Mon Jan 01 00:00:00 +0000 2024',
+        'name': screen_name.title(),
+        'screen_name': screen_name,
+        'profile_image_url_https': f'https://pbs.twimg.com/profile_images/{screen_name}.jpg',
+        'location': '',
+        'description': f'{screen_name} on Base',
+        'entities': {'description': {'urls': []}},
+        'pinned_tweet_ids_str': [],
+        'verified': False,
+        'possibly_sensitive': False,
+        'can_dm': True,
+        'can_media_tag': True,
+        'want_retweets': True,
+        'default_profile': True,
+        'default_profile_image': False,
+        'has_custom_timelines': False,
+        'followers_count': 1234,
+        'fast_followers_count': 0,
+        'normal_followers_count': 1234,
+        'friends_count': 321,
+        'favourites_count': 99,
+        'listed_count': 3,
+        'media_count': 7,
+        'statuses_count': 4567,
+        'is_translator': False,
+        'translator_type': 'none',
+        'withheld_in_countries': [],
+    }
+
+def _user_id(screen_name):
+    import zlib
+    return str(10 ** 9 + zlib.crc32(screen_name.lower().encode()))
+
+def _user(screen_name):
+    return {'__typename': 'User', 'rest_id': _user_id(screen_name), 'is_blue_verified': False,
+            'legacy': _user_legacy(screen_name)}
+
+def _tweet_legacy(tweet_id, text, user_id, reply_to=None):
+    return {
+        'created_at': time.strftime('%a %b %d %H:%M:%S +0000 %Y', time.gmtime()),
+        'full_text': text,
+        'lang': 'en',
+        'is_quote_status': False,
+        'conversation_id_str': str(reply_to or tweet_id),
+        'in_reply_to_status_id_str': str(reply_to) if reply_to else None,
+        'favorite_count': tweet_id % 97,
+        'retweet_count': tweet_id % 13,
+        'reply_count': tweet_id % 7,
+        'quote_count': 0,
+        'favorited': False,
+        'entities': {'hashtags': [], 'urls': [], 'user_mentions': [], 'symbols': []},
+        'user_id_str': user_id,
+    }
+
+def _tweet(tweet_id, text, screen_name, reply_to=None):
+    user = _user(screen_name)
+    return {
+        '__typename': 'Tweet',
+        'rest_id': str(tweet_id),
+        'core': {'user_results': {'result': user}},
+        'legacy': _tweet_legacy(tweet_id, text, user['rest_id'], reply_to),
+        'views': {'count': str(tweet_id % 5000), 'state': 'EnabledWithCount'},
+        'edit_control': {},
+        'is_translatable': False,
+    }
+
+def _timeline(tweets):
+    """Timeline instructions: tweet entries followed by the top and bottom cursors."""
+    entries = [{'entryId': f'tweet-{t["rest_id"]}', 'sortIndex': t['rest_id'],
+                'content': {'entryType': 'TimelineTimelineItem',
+                            'itemContent': {'itemType': 'TimelineTweet', 'tweet_results': {'result': t}}}}
+               for t in tweets]
+    entries += [{'entryId': f'cursor-{kind}-0', 'content': {'cursorType': kind.title(), 'value': f'{kind}-cursor'}}
+                for kind in ('top', 'bottom')]
+    return {'instructions': [{'type': 'TimelineAddEntries', 'entries': entries}]}
+
+class FakeTwitter:
+    """Request router and canned responses for the stand-in server."""
+    
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit_rate=0.0, seed=1):
+        import itertools
+        self.latency = latency / 1000
+        self.jitter = jitter / 1000
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rng = random.Random(seed)
+        self.ids = itertools.count(FIRST_TWEET_ID + 10 ** 6)
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.home = _home_page()
+    
+    def take_counts(self):
+        """Per-route counters since the last call."""
+        with self.lock:
+            counts, self.counts = self.counts, {}
+        return dict(sorted(counts.items()))
+    
+    def _count(self, route, key):
+        with self.lock:
+            entry = self.counts.setdefault(route, {'requests': 0, 'errors': 0, 'rate_limited': 0})
+            entry[key] += 1
+    
+    def _feed(self, count, prefix=''):
+        base = FIRST_TWEET_ID + int(time.time()) % 10 ** 5 * 100
+        return [_tweet(base + i, prefix + FEED_TEXTS[i % len(FEED_TEXTS)], f'trader{i % 9}')
+                for i in range(min(count, 100))]
+    
+    def _route(self, method, host, path):
+        if path == '/' and method == 'GET' and host in ('x.com', 'twitter.com'):
+            return 'bootstrap:home', None
+        if path.startswith('/responsive-web/client-web/ondemand.s.'):
+            return 'bootstrap:ondemand', None
+        if path.startswith('/i/api/graphql/'):
+            return path.rsplit('/', 1)[-1], 'graphql'
+        if path.startswith('/i/api/2/notifications/'):
+            return 'notifications', 'notifications'
+        if path == '/i/media/upload.json':
+            return 'upload', 'upload'
+        if path.endswith('/user_state.json'):
+            return 'user_state', None
+        if path.startswith('/api/v1/'):
+            return f'platform:{path[len("/api/v1"):].split("?")[0]}', 'platform'
+        return f'unknown:{path}', None
+    
+    def respond(self, method, host, target, body):
+        """(status, headers, body bytes) for one request."""
+        from urllib.parse import parse_qs, urlsplit
+        url = urlsplit(target)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        route, kind = self._route(method, host, url.path)
+        self._count(route, 'requests')
+        if route == 'bootstrap:home':
+            return 200, {'Content-Type': 'text/html'}, self.home
+        if route == 'bootstrap:ondemand':
+            return 200, {'Content-Type': 'application/javascript'}, _ondemand_js()
+        if route == 'user_state':
+            return self._json({'userState': 'normal'})
+        if kind is None:
+            return self._json({'errors': [{'code': 34, 'message': 'Sorry, that page does not exist.'}]}, 404)
+        
+        with self.lock:
+            delay = self.latency + self.rng.uniform(0, self.jitter)
+            roll = self.rng.random()
+        if delay:
+            time.sleep(delay)
+        if roll < self.rate_limit_rate:
+            self._count(route, 'rate_limited')
+            reset = str(int(time.time()) + 1)
+            return self._json({'errors': [{'code': 88, 'message': 'Rate limit exceeded.'}]}, 429,
+                              {'x-rate-limit-limit': '50', 'x-rate-limit-remaining': '0', 'x-rate-limit-reset': reset})
+        if roll < self.rate_limit_rate + self.error_rate:
+            self._count(route, 'errors')
+            return self._json({'errors': [{'code': 131, 'message': 'Internal error'}]}, 503)
+        
+        if kind == 'graphql':
+            if method == 'GET':
+                variables = json.loads(query.get('variables') or '{}')
+            else:
+                variables = (json.loads(body or b'{}') or {}).get('variables') or {}
+            return self._json(self._graphql(route, variables))
+        if kind == 'notifications':
+            return self._json(self._notifications(int(query.get('count') or 20)))
+        if kind == 'upload':
+            return self._upload(query)
+        return self._json({'success': True, 'data': {'id': next(self.ids)}})
+    
+    def _graphql(self, op, variables):
+        count = int(variables.get('count') or 20)
+        if op == 'CreateTweet':
+            reply_to = (variables.get('reply') or {}).get('in_reply_to_tweet_id')
+            tweet = _tweet(next(self.ids), variables.get('tweet_text', ''), BENCH_HANDLE, reply_to)
+            return {'data': {'create_tweet': {'tweet_results': {'result': tweet}}}}
+        if op == 'FavoriteTweet':
+            return {'data': {'favorite_tweet': 'Done'}}
+        if op == 'SearchTimeline':
+            timeline = _timeline(self._feed(count, f'[{variables.get("rawQuery", "")}] '))
+            return {'data': {'search_by_raw_query': {'search_timeline': {'timeline': timeline}}}}
+        if op in ('HomeTimeline', 'HomeLatestTimeline'):
+            return {'data': {'home': {'home_timeline_urt': _timeline(self._feed(count))}}}
+        if op == 'TweetResultsByRestIds':
+            return {'data': {'tweetResult': [{'result': _tweet(int(i), FEED_TEXTS[int(i) % len(FEED_TEXTS)], f'trader{int(i) % 9}')}
+                                             for i in variables.get('tweetIds') or []]}}
+        if op == 'UserByScreenName':
+            return {'data': {'user': {'result': _user(variables.get('screen_name') or BENCH_HANDLE)}}}
+        if op == 'UserByRestId':
+            return {'data': {'user': {'result': _user(BENCH_HANDLE)}}}
+        if op == 'UserTweets':
+            return {'data': {'user': {'result': {'timeline_v2': {'timeline': _timeline(self._feed(count))}}}}}
+        return {'data': {}}
+    
+    def _notifications(self, count):
+        users, tweets, notifications, entries = {}, {}, {}, []
+        for t in self._feed(count):
+            user = t['core']['user_results']['result']
+            users[user['rest_id']] = {'id': user['rest_id'], 'id_str': user['rest_id'], **user['legacy']}
+            tweets[t['rest_id']] = {'id': t['rest_id'], 'id_str': t['rest_id'], **t['legacy']}
+            nid = f'n{t["rest_id"]}'
+            notifications[nid] = {
+                'id': nid,
+                'timestampMs': str(int(time.time() * 1000)),
+                'icon': {'id': 'heart_icon'},
+                'message': {'text': f'{user["legacy"]["name"]} liked your post'},
+                'template': {'aggregateUserActionsV1': {'targetObjects': [{'tweet': {'id': t['rest_id']}}],
+                                                        'fromUsers': [{'user': {'id': user['rest_id']}}]}},
+            }
+            entries.append({'entryId': f'notification-{nid}', 'content': {'notification': {'id': nid}}})
+        entries.append({'entryId': 'cursor-bottom-0', 'content': {'operation': {'cursor': {'value': 'bottom-cursor'}}}})
+        return {'globalObjects': {'users': users, 'tweets': tweets, 'notifications': notifications},
+                'timeline': {'instructions': [{'addEntries': {'entries': entries}}]}}
+    
+    def _upload(self, query):
+        command = query.get('command')
+        if command == 'INIT':
+            media_id = next(self.ids)
+            return self._json({'media_id': media_id, 'media_id_string': str(media_id), 'expires_after_secs': 86400})
+        if command == 'APPEND':
+            return 204, {}, b''
+        if command in ('FINALIZE', 'STATUS'):
+            return self._json({'media_id': int(query.get('media_id') or 0), 'media_id_string': query.get('media_id'),
+                               'processing_info': {'state': 'succeeded', 'progress_percent': 100}})
+        return self._json({'errors': [{'code': 38, 'message': 'command parameter is missing.'}]}, 400)
+    
+    @staticmethod
+    def _json(data, status=200, headers=None):
+        return status, {'Content-Type': 'application/json', **(headers or {})}, json.dumps(data).encode()
+
+def start_server(fake, port=0):
+    """Serve `fake` on 127.0.0.1 from a background thread. Returns (server, base URL)."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, so connection reuse shows up as it would live
+        
+        def _body(self):
+            if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+                chunks = []
+                while True:
+                    size = int(self.rfile.readline().split(b';')[0], 16)
+                    chunk = self.rfile.read(size + 2)[:size]
+                    if not size:
+                        return b''.join(chunks)
+                    chunks.append(chunk)
+            length = int(self.headers.get('Content-Length') or 0)
+            return self.rfile.read(length) if length else b''
+        
+        def _handle(self):
+            body = self._body()
+            host = (self.headers.get('Host') or '').split(':')[0]
+            status, headers, payload = fake.respond(self.command, host, self.path, body)
+            self.send_response(status)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        
+        do_GET = do_POST = do_PUT = do_DELETE = _handle
+        
+        def log_message(self, *args):
+            pass
+    
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        
+        def handle_error(self, request, client_address):
+            # Clients exiting with idle keep-alive connections are expected
+            if not isinstance(sys.exc_info()[1], ConnectionError):
+                super().handle_error(request, client_address)
+    
+    server = Server(('127.0.0.1', port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+# --- Sandbox ---
+# A temporary skill directory holding a copy of twitter.py and its modules, so
+# every state file they derive from their own location (.dedup.db,
+# .reply_log.json, cookies, the daemon socket...) lands there. Local rate
+# budgets are lifted: the point is to time twitter.py, not to wait on its
+# scheduler — 429s still come from the server when injected.
+PNG_1PX = bytes.fromhex('89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+                        '1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082')
+
+class Sandbox:
+    def __init__(self, base_url, trace=False):
+        self.dir = tempfile.mkdtemp(prefix='spirit-bench-')
+        os.makedirs(os.path.join(self.dir, 'scripts'))
+        self.script = os.path.join(self.dir, 'scripts', 'twitter.py')
+        for name in sorted(os.listdir(SCRIPT_DIR)):
+            if name.startswith('twitter') and name.endswith('.py'):
+                shutil.copy(os.path.join(SCRIPT_DIR, name), os.path.join(self.dir, 'scripts', name))
+        self.media = os.path.join(self.dir, 'bench.png')
+        with open(self.media, 'wb') as f:
+            f.write(PNG_1PX)
+        modules = self._import()
+        self.twitter = modules['twitter_stores']
+        env = {
+            'TWITTER_AUTH_TOKEN': 'bench',
+            'TWITTER_CT0': 'bench',
+            'TWITTER_API_BASE': base_url,
+            'PLATFORM_API_URL': base_url,
+            'PLATFORM_API_KEY': 'bench',
+            'TWITTER_TRACE': '1' if trace else '0',
+        }
+        env.update({f'TWITTER_RATE_{endpoint.upper()}': '1000000/1' for endpoint in modules['twitter_client'].RATE_LIMITS})
+        with open(os.path.join(self.dir, '.env'), 'w') as f:
+            f.writelines(f'{key}={value}\n' for key, value in env.items())
+        self.daemon = None
+    
+    def _import(self):
+        """This sandbox's copies of the twitter modules, by name."""
+        import importlib
+        for name in [m for m in sys.modules if m.startswith('twitter_')]:
+            del sys.modules[name]
+        sys.path.insert(0, os.path.join(self.dir, 'scripts'))
+        try:
+            # twitter_actions pulls in everything the stores import lazily
+            importlib.import_module('twitter_actions')
+        finally:
+            sys.path.pop(0)
+        return {name: module for name, module in sys.modules.items() if name.startswith('twitter_')}
+    
+    def run(self, *args, stdin=None):
+        """Run twitter.py once. Returns (ms, exit status, stdout)."""
+        started = time.perf_counter()
+        proc = subprocess.run([sys.executable, self.script, *args], cwd=self.dir, input=stdin,
+                              capture_output=True, text=True, timeout=300)
+        return (time.perf_counter() - started) * 1000, proc.returncode, proc.stdout
+    
+    def start_daemon(self):
+        self.daemon = subprocess.Popen([sys.executable, self.script, 'serve'], cwd=self.dir,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            if self.run('ping')[1] == 0:
+                return
+            time.sleep(0.1)
+        self.stop_daemon()
+        raise RuntimeError('twitter.py daemon did not start')
+    
+    def stop_daemon(self):
+        if self.daemon is not None:
+            self.daemon.terminate()
+            try:
+                self.daemon.wait(10)
+            except subprocess.TimeoutExpired:
+                self.daemon.kill()
+            self.daemon = None
+    
+    def close(self):
+        self.stop_daemon()
+        # Give background outbox flushers a moment before removing their directory
+        time.sleep(0.5)
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+# --- Scenarios ---
+
+def _summary(samples):
+    """Latency summary in milliseconds (nearest-rank percentiles)."""
+    if not samples:
+        return {'n': 0}
+    ms = sorted(samples)
+    rank = lambda p: ms[min(len(ms) - 1, int(p * len(ms)))]
+    return {
+        'n': len(ms),
+        'mean_ms': round(sum(ms) / len(ms), 2),
+        'p50_ms': round(rank(0.5), 2),
+        'p95_ms': round(rank(0.95), 2),
+        'min_ms': round(ms[0], 2),
+        'max_ms': round(ms[-1], 2),
+    }
+
+def _text(i):
+    # Random words, so neither the dedup cache nor the near-duplicate guard skips the write
+    return f'bench {i}: ' + ' '.join(f'{random.getrandbits(32):08x}' for _ in range(6))
+
+def _tweet_id(i):
+    return str(FIRST_TWEET_ID + random.getrandbits(40) + i)
+
+# action: args for the i-th call
+ACTIONS = {
+    'post': lambda sb, i: ['post', _text(i)],
+    'reply': lambda sb, i: ['reply', _tweet_id(i), _text(i)],
+    'like': lambda sb, i: ['like', _tweet_id(i)],
+    'search': lambda sb, i: ['search', '$SOL', '20'],
+    'timeline': lambda sb, i: ['timeline', '20'],
+    'notifications': lambda sb, i: ['notifications', '20'],
+    'user': lambda sb, i: ['user', BENCH_HANDLE],
+    'user_tweets': lambda sb, i: ['user_tweets', BENCH_HANDLE, '10'],
+    'post_media': lambda sb, i: ['post_media', _text(i), sb.media],
+}
+LOOP_TICK = ['timeline', 'search', 'like', 'reply', 'post']
+
+def bench_cold(sb, fake, opts):
+    runs = {
+        'interpreter': [sys.executable, '-c', 'pass'],
+        'twitter_py': [sys.executable, sb.script, 'ping'],  # no daemon: import, then exit
+        'twikit_import': [sys.executable, '-c', 'import twikit'],
+    }
+    out = {}
+    for name, cmd in runs.items():
+        samples = []
+        for _ in range(opts['iterations']):
+            started = time.perf_counter()
+            subprocess.run(cmd, cwd=sb.dir, capture_output=True)
+            samples.append((time.perf_counter() - started) * 1000)
+        out[name] = _summary(samples)
+    return out
+
+def bench_actions(sb, fake, opts):
+    out = {}
+    for action, make_args in ACTIONS.items():
+        samples, failures = [], 0
+        for i in range(opts['iterations']):
+            ms, status, _ = sb.run(*make_args(sb, i))
+            samples.append(ms)
+            failures += status != 0
+        out[action] = {**_summary(samples), 'failures': failures, 'server': fake.take_counts()}
+        _log(f'   {action}: p50 {out[action]["p50_ms"]}ms')
+    return out
+
+def _batch_requests(sb, n):
+    kinds = ['timeline', 'search', 'user', 'like', 'reply', 'post']
+    return '\n'.join(json.dumps({'id': f'r{i}', 'action': kinds[i % len(kinds)],
+                                 'args': ACTIONS[kinds[i % len(kinds)]](sb, i)[1:]})
+                     for i in range(n))
+
+def bench_batch(sb, fake, opts):
+    out = {}
+    for mode in ('in_process', 'daemon'):
+        if mode == 'daemon':
+            sb.start_daemon()
+            fake.take_counts()
+        try:
+            ms, _, stdout = sb.run('batch', '--concurrency', str(opts['concurrency']),
+                                   stdin=_batch_requests(sb, opts['batch_size']))
+        finally:
+            sb.stop_daemon()
+        responses = [json.loads(line) for line in stdout.splitlines() if line.startswith('{')]
+        ok = sum(1 for r in responses if r.get('status') == 0)
+        out[mode] = {
+            'requests': opts['batch_size'],
+            'ok': ok,
+            'wall_ms': round(ms, 2),
+            'throughput_rps': round(opts['batch_size'] / (ms / 1000), 2),
+            'server': fake.take_counts(),
+        }
+        _log(f'   {mode}: {out[mode]["throughput_rps"]} req/s')
+    return out
+
+def bench_loop(sb, fake, opts):
+    out = {}
+    for mode in ('cli', 'daemon'):
+        if mode == 'daemon':
+            sb.start_daemon()
+            fake.take_counts()
+        ticks, per_action, failures = [], {a: [] for a in LOOP_TICK}, 0
+        try:
+            for i in range(opts['iterations']):
+                started = time.perf_counter()
+                for action in LOOP_TICK:
+                    ms, status, _ = sb.run(*ACTIONS[action](sb, i))
+                    per_action[action].append(ms)
+                    failures += status != 0
+                ticks.append((time.perf_counter() - started) * 1000)
+        finally:
+            sb.stop_daemon()
+        out[mode] = {
+            'tick': _summary(ticks),
+            'actions': {a: _summary(s) for a, s in per_action.items()},
+            'failures': failures,
+            'server': fake.take_counts(),
+        }
+        _log(f'   {mode}: tick p50 {out[mode]["tick"]["p50_ms"]}ms')
+    return out
+
+def _size(*paths):
+    return sum(os.path.getsize(p) for p in paths if os.path.exists(p))
+
+def bench_state(sb, fake, opts, dedup_sizes=(0, 1000, 10000, 100000), reply_sizes=(0, 50, 100, 200), ops=200):
+    """Time the dedup check + record and the reply log append in-process, at several store sizes."""
+    tw = sb.twitter
+    out = {'dedup': [], 'reply_log': []}
+    
+    conn = tw._dedup_db()
+    for size in dedup_sizes:
+        now = time.time()
+        have = conn.execute('SELECT COUNT(*) FROM dedup').fetchone()[0]
+        with conn:
+            conn.execute('BEGIN')
+            conn.executemany('INSERT OR IGNORE INTO dedup (key, ts) VALUES (?, ?)',
+                             ((f'like:fill{i}', now) for i in range(have, size)))
+        samples = []
+        for i in range(ops):
+            args = [f'bench{size}-{i}']
+            started = time.perf_counter()
+            tw._is_duplicate('like', args)
+            tw._record_action('like', args)
+            samples.append((time.perf_counter() - started) * 1000)
+        out['dedup'].append({'entries': size, **_summary(samples),
+                             'bytes': _size(tw.DEDUP_DB, tw.DEDUP_DB + '-wal')})
+    
+    for size in reply_sizes:
+        now = time.time()
+        log = [{'tweet_id': _tweet_id(i), 'text': _text(i)[:200], 'ts': now} for i in range(size)]
+        samples = []
+        for i in range(ops):
+            with open(tw.REPLY_LOG_FILE, 'w') as f:
+                json.dump(log, f)
+            started = time.perf_counter()
+            tw._log_reply(_tweet_id(i), _text(i))
+            samples.append((time.perf_counter() - started) * 1000)
+        read = []
+        for _ in range(ops):
+            started = time.perf_counter()
+            tw.get_reply_log()
+            read.append((time.perf_counter() - started) * 1000)
+        out['reply_log'].append({'entries': size, 'append': _summary(samples), 'read': _summary(read),
+                                 'bytes': _size(tw.REPLY_LOG_FILE)})
+    return out
+
+BENCHES = {
+    'cold': bench_cold,
+    'actions': bench_actions,
+    'batch': bench_batch,
+    'loop': bench_loop,
+    'state': bench_state,
+}
+
+def run(scenarios, opts):
+    fake = FakeTwitter(opts['latency'], opts['jitter'], opts['error_rate'], opts['rate_limit_rate'], opts['seed'])
+    server, base_url = start_server(fake)
+    sb = Sandbox(base_url, trace=bool(opts['trace']))
+    random.seed(opts['seed'])
+    results = {}
+    try:
+        for name in scenarios:
+            _log(f'⏱️ {name}...')
+            fake.take_counts()
+            started = time.perf_counter()
+            results[name] = BENCHES[name](sb, fake, opts)
+            _log(f'✅ {name} done in {time.perf_counter() - started:.1f}s')
+    finally:
+        sb.close()
+        server.shutdown()
+    return {'meta': _meta(opts), 'results': results}
+
+def _meta(opts):
+    try:
+        rev = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SKILL_DIR,
+                             capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        rev = None
+    try:
+        from importlib.metadata import version
+        twikit = version('twikit')
+    except Exception:
+        twikit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'git': rev,
+        'python': sys.version.split()[0],
+        'twikit': twikit,
+        'config': opts,
+    }
+
+# --- Startup budget ---
+# Paths that never reach Twitter must start on the bare interpreter: no
+# asyncio, twikit or httpx, and twitter.py's modules loaded from cached
+# bytecode. This repo has no test suite, so `bench.py budget` is the check to
+# run after touching twitter.py's imports or entry point; agent-loop.sh also
+# runs it once per version of the twitter*.py files.
+BUDGET_PATHS = {
+    'help': [],
+    'ping': ['ping'],  # no daemon listening
+    'local': ['cache'],
+    'dedup_hit': ['like', '1'],
+}
+LAZY_MODULES = ['asyncio', 'twikit', 'httpx']
+
+def _lazy_loaded(sb, args):
+    """LAZY_MODULES a twitter.py run imports, from -X importtime."""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', sb.script, *args], cwd=sb.dir,
+                          capture_output=True, text=True, timeout=60)
+    loaded = {line.rsplit('|', 1)[-1].strip() for line in proc.stderr.splitlines() if line.startswith('import time:')}
+    return [m for m in LAZY_MODULES if m in loaded]
+
+def budget(opts):
+    """Time the cheap paths against the interpreter. Returns (ok, results)."""
+    # Measure what a deployment sees: bytecode cached in __pycache__
+    os.environ.pop('PYTHONDONTWRITEBYTECODE', None)
+    sb = Sandbox('http://127.0.0.1:9')  # nothing timed here may reach the network
+    try:
+        sb.twitter._record_action('like', BUDGET_PATHS['dedup_hit'][1:])
+        runs = {'interpreter': [sys.executable, '-c', 'pass']}
+        runs.update({name: [sys.executable, sb.script, *args] for name, args in BUDGET_PATHS.items()})
+        for cmd in runs.values():
+            subprocess.run(cmd, cwd=sb.dir, capture_output=True)  # warm up, write .pyc
+        samples = {name: [] for name in runs}
+        for _ in range(max(opts['iterations'], 10)):
+            # Interleaved, so load on the machine hits every path alike
+            for name, cmd in runs.items():
+                started = time.perf_counter()
+                subprocess.run(cmd, cwd=sb.dir, capture_output=True)
+                samples[name].append((time.perf_counter() - started) * 1000)
+        base = _summary(samples.pop('interpreter'))
+        out = {'ok': True, 'max_ms': opts['max_ms'], 'interpreter': base, 'paths': {}}
+        for name, ms in samples.items():
+            summary = _summary(ms)
+            overhead = round(summary['p50_ms'] - base['p50_ms'], 2)
+            lazy = _lazy_loaded(sb, BUDGET_PATHS[name])
+            ok = overhead <= opts['max_ms'] and not lazy
+            out['paths'][name] = {**summary, 'overhead_ms': overhead, 'loaded': lazy, 'ok': ok}
+            out['ok'] = out['ok'] and ok
+            _log(f'{"✅" if ok else "❌"} {name}: +{overhead}ms over the interpreter'
+                 + (f', loads {", ".join(lazy)}' if lazy else ''))
+        return out['ok'], out
+    finally:
+        sb.close()
+
+# --- Main ---
+
+def _options(args):
+    """Pop --flag value pairs for DEFAULTS out of args. Returns (opts, remaining args)."""
+    opts, rest = dict(DEFAULTS), []
+    out, port = None, 0
+    it = iter(args)
+    for arg in it:
+        key = arg[2:].replace('-', '_') if arg.startswith('--') else None
+        if key in opts or key in ('out', 'port'):
+            value = next(it, None)
+            if value is None:
+                raise ValueError(f'{arg} needs a value')
+            if key == 'out':
+                out = value
+            elif key == 'port':
+                port = int(value)
+            else:
+                opts[key] = type(DEFAULTS[key])(value)
+        else:
+            rest.append(arg)
+    return opts, rest, out, port
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] in ('-h', '--help', 'help'):
+        print(__doc__)
+        sys.exit(0)
+    
+    action = sys.argv[1]
+    try:
+        opts, args, out, port = _options(sys.argv[2:])
+    except ValueError as e:
+        _log(f'❌ {e}')
+        sys.exit(1)
+    
+    if action == 'run':
+        unknown = [a for a in args if a not in BENCHES]
+        if unknown:
+            _log(f'Unknown scenario: {", ".join(unknown)}. Choose from {", ".join(SCENARIOS)}')
+            sys.exit(1)
+        results = run(args or SCENARIOS, opts)
+        text = json.dumps(results, indent=2)
+        if out:
+            with open(out, 'w') as f:
+                f.write(text + '\n')
+        print(text)
+    
+    elif action == 'budget':
+        ok, results = budget(opts)
+        print(json.dumps(results, indent=2))
+        sys.exit(0 if ok else 1)
+    
+    elif action == 'serve':
+        fake = FakeTwitter(opts['latency'], opts['jitter'], opts['error_rate'], opts['rate_limit_rate'], opts['seed'])
+        server, base_url = start_server(fake, port)
+        _log(f'🧪 Stand-in listening on {base_url} — set TWITTER_API_BASE and PLATFORM_API_URL to it')
+        try:
+            while True:
+                time.sleep(60)
+        except KeyboardInterrupt:
+            server.shutdown()
+        print(json.dumps(fake.take_counts(), indent=2))
+    
+    else:
+        _log(f'Unknown action: {action}. Run without args for help.')
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
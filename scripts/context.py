@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Spirit Agent loop context builder.
+Usage: python3 context.py [--no-cache]
+
+Fetches every section agent-loop.sh puts in the prompt concurrently (skill
+update, heartbeat, agent profile, recent actions, reply log, price monitor
+alerts, leaderboard, platform stats, launches, transactions, own Twitter
+profile and tweet engagement) and
+prints one JSON object:
+
+  {"agent": {...} | null, "sections": {"recent_actions": "...", ...},
+   "status": {"<section>": "ok|cached|stale|timeout|error"}, "timing_ms": {...}}
+
+Each section has its own timeout; slow-changing sections are served from
+.context_cache.json within their TTL, and a failed or timed-out section falls
+back to its last good value (status "stale") or is left out.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SKILL_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, '..'))
+ENV_FILE = os.path.join(SKILL_DIR, '.env')
+CACHE_FILE = os.path.join(SKILL_DIR, '.context_cache.json')
+REPLY_LOG_FILE = os.path.join(SKILL_DIR, '.reply_log.json')
+MONITOR_EVENTS_FILE = os.path.join(SKILL_DIR, '.monitor_events.jsonl')
+MONITOR_EVENTS_AGE = 3600
+SNAPSHOT_MAX_AGE = 600  # older engagement snapshots are retaken before the prompt is built
+STALE_MAX_AGE = 86400
+
+def _log(msg):
+    print(msg, file=sys.stderr, flush=True)
+
+def load_env():
+    env = {}
+    if os.path.exists(ENV_FILE):
+        with open(ENV_FILE) as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, _, val = line.partition('=')
+                    env[key.strip()] = val.strip().strip('"').strip("'")
+    return env
+
+def _s(value):
+    """Render a JSON value the way jq string interpolation does."""
+    return value if isinstance(value, str) else json.dumps(value)
+
+def _alt(*values):
+    """jq's `a // b`: first value that is not null/false."""
+    return next((v for v in values if v is not None and v is not False), None)
+
+class Context:
+    """Shared state for one build: env, pooled platform client and memoized dependencies."""
+    
+    def __init__(self, env):
+        self.env = env
+        self._http = None
+        self._tasks = {}
+    
+    def http(self):
+        if self._http is None:
+            import httpx
+            self._http = httpx.AsyncClient(base_url=self.env.get('PLATFORM_API_URL', '') + '/api/v1', timeout=15,
+                                           headers={'Authorization': f'Bearer {self.env.get("PLATFORM_API_KEY", "")}'})
+        return self._http
+    
+    async def api(self, path):
+        resp = await self.http().get(path)
+        resp.raise_for_status()
+        return resp.json()
+    
+    def once(self, name, make):
+        """One shared task per dependency, however many sections await it."""
+        if name not in self._tasks:
+            self._tasks[name] = asyncio.ensure_future(make())
+        # A section timing out must not cancel the shared fetch for the others
+        return asyncio.shield(self._tasks[name])
+    
+    async def close(self):
+        for task in self._tasks.values():
+            task.cancel()
+        if self._http is not None:
+            await self._http.aclose()
+
+async def _kill(proc):
+    """Kill a subprocess on timeout/cancel and reap it."""
+    try:
+        proc.kill()
+    except ProcessLookupError:
+        pass
+    await proc.wait()
+
+async def _run(*cmd, cwd=SKILL_DIR, stdin=None, check=True):
+    """Run a command, returning stdout; raises on non-zero exit when check is set."""
+    proc = await asyncio.create_subprocess_exec(*cmd, cwd=cwd, stdin=asyncio.subprocess.PIPE,
+                                                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+    try:
+        out, _ = await proc.communicate(stdin.encode() if stdin else None)
+    except asyncio.CancelledError:
+        await _kill(proc)
+        raise
+    if check and proc.returncode != 0:
+        raise RuntimeError(f'exit status {proc.returncode}')
+    return out.decode().strip()
+
+# --- Sections ---
+
+async def _update(ctx):
+    env = {**os.environ, 'GIT_SSH_COMMAND': f'ssh -i {os.path.expanduser("~/.ssh/id_ed25519_spirit")}'}
+    proc = await asyncio.create_subprocess_exec('git', 'pull', '--ff-only', cwd=SKILL_DIR, env=env,
+                                                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+    try:
+        out, _ = await proc.communicate()
+    except asyncio.CancelledError:
+        await _kill(proc)
+        raise
+    lines = out.decode().strip().splitlines()
+    if proc.returncode != 0:
+        raise RuntimeError(lines[-1] if lines else 'git pull failed')
+    return lines[-1] if lines else ''
+
+async def _heartbeat(ctx):
+    return await _run(os.path.join(SCRIPT_DIR, 'heartbeat.sh'))
+
+async def _agent(ctx):
+    async def fetch():
+        data = await ctx.api('/agents/me')
+        if not data.get('success'):
+            raise RuntimeError('agents/me failed')
+        return data['data']['agent']
+    return await ctx.once('agent', fetch)
+
+async def _recent_actions(ctx):
+    data = await ctx.api('/social-actions?limit=20')
+    return '\n'.join(f'{_s(a.get("reportedAt"))} | {_s(a.get("actionType"))} | '
+                     f'{_s(_alt(a.get("content"), a.get("externalId"), "–"))}'
+                     for a in ((data.get('data') or {}).get('data') or []))
+
+async def _reply_log(ctx):
+    try:
+        with open(REPLY_LOG_FILE) as f:
+            log = json.load(f)
+    except FileNotFoundError:
+        return ''
+    now = time.time()
+    ids = [e['tweet_id'] for e in log if now - e.get('ts', 0) < 86400]
+    return 'replied to: ' + ' '.join(ids) if ids else ''
+
+async def _price_alerts(ctx):
+    """Events the background `market.py monitor` logged in the last hour."""
+    import calendar
+    try:
+        with open(MONITOR_EVENTS_FILE, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            start = max(0, f.tell() - 65536)
+            f.seek(start)
+            lines = f.read().decode(errors='replace').splitlines()[1 if start else 0:]
+    except FileNotFoundError:
+        return ''
+    now, out = time.time(), []
+    for line in lines:
+        try:
+            e = json.loads(line)
+            age = now - calendar.timegm(time.strptime(e['ts'], '%Y-%m-%dT%H:%M:%SZ'))
+        except (ValueError, KeyError, TypeError):
+            continue
+        if age > MONITOR_EVENTS_AGE:
+            continue
+        change = e.get('change_pct')
+        detail = (f'{change:+}% vs entry ${_s(e.get("entry_price_usd"))}' if change is not None
+                  else f'{_s(e.get("window_change_pct"))}% in {_s(e.get("window_s"))}s')
+        out.append(f'{e["ts"]} | {_s(e.get("event"))} | {_s(e.get("symbol"))} {_s(e.get("address"))} '
+                   f'| ${_s(e.get("price_usd"))} | {detail}')
+    return '\n'.join(out)
+
+async def _leaderboard(ctx):
+    data = await ctx.api('/leaderboard?limit=10')
+    return '\n'.join(f'#{_s(_alt(a.get("rank"), "?"))} {_s(a.get("name"))} | PnL: ${_s(_alt(a.get("total_pnl_usd"), "0"))} '
+                     f'| Trades: {_s(_alt(a.get("trade_count"), 0))}'
+                     for a in ((data.get('data') or {}).get('agents') or []))
+
+async def _platform_stats(ctx):
+    d = (await ctx.api('/stats')).get('data')
+    if not d:
+        return ''
+    return (f'Agents: {_s(_alt(d.get("total_agents"), 0))} active: {_s(_alt(d.get("active_agents"), 0))} | '
+            f'Trades: {_s(_alt(d.get("total_trades"), 0))} | Volume: ${_s(_alt(d.get("total_volume_usd"), "0"))}')
+
+async def _launches(ctx):
+    return await _run(os.path.join(SCRIPT_DIR, 'launches.sh'))
+
+async def _transactions(ctx):
+    return await _run(os.path.join(SCRIPT_DIR, 'transactions.sh'), '10')
+
+async def _twitter(ctx):
+    """Own profile and tweet engagement from twitter.py's snapshot store.
+    
+    The store is read locally; a new snapshot (one profile and one timeline
+    request) is only taken when the last one is older than SNAPSHOT_MAX_AGE,
+    which never happens while the daemon keeps snapshotting in the background.
+    """
+    async def query(action, *args):
+        out = await _run(sys.executable, os.path.join(SCRIPT_DIR, 'twitter.py'), action, *args,
+                         '--window', '1h,24h', '--limit', '10', '--max-text', '80', check=False)
+        try:
+            result = json.loads(out)
+        except ValueError:
+            return None
+        return result if result.get('ok') else None
+    
+    async def fetch():
+        try:
+            agent = await _agent(ctx)
+        except Exception:
+            agent = {}
+        handle = (agent.get('x_handle') or ctx.env.get('X_HANDLE') or '@unknown').lstrip('@')
+        result = await query('engagement')
+        if (result is None or result.get('age') is None or result['age'] > SNAPSHOT_MAX_AGE
+                or (result.get('handle') or '').lower() != handle.lower()):
+            result = await query('snapshot', handle, '10') or result
+        return result or {}
+    return await ctx.once('twitter', fetch)
+
+def _engaged(gained, window):
+    g = gained.get(window) or {}
+    return (g.get('likes') or 0) + (g.get('retweets') or 0) + (g.get('replies') or 0)
+
+async def _own_profile(ctx):
+    u = (await _twitter(ctx)).get('user')
+    if not u:
+        raise RuntimeError('profile lookup failed')
+    gained = u.get('gained') or {}
+    growth = ', '.join(f'{(gained.get(w) or {}).get("followers", 0):+} {w}' for w in ('1h', '24h'))
+    return (f'Name: {_s(u.get("name"))} | @{_s(u.get("username"))} | Followers: {_s(u.get("followers"))} ({growth}) | '
+            f'Following: {_s(u.get("following"))} | Tweets: {_s(u.get("tweets"))} | Bio: {_s(_alt(u.get("bio"), "none"))}')
+
+async def _own_tweets(ctx):
+    result = await _twitter(ctx)
+    if not result:
+        raise RuntimeError('engagement lookup failed')
+    lines = []
+    for t in result.get('tweets') or []:
+        gained = t.get('gained') or {}
+        lines.append(f'{_s(t.get("created_at"))} | ❤️{_s(_alt(t.get("likes"), 0))} 🔁{_s(_alt(t.get("retweets"), 0))} '
+                     f'💬{_s(_alt(t.get("replies"), 0))} | 1h +{_engaged(gained, "1h")} '
+                     f'({_s((gained.get("1h") or {}).get("per_hour", 0))}/h), 24h +{_engaged(gained, "24h")} '
+                     f'| {(t.get("text") or "")[:80]}')
+    top = (result.get('top') or {}).get('24h') or []
+    if top:
+        lines.append('Top 24h: ' + ' | '.join(f'+{_s(t.get("engagement"))} ({_s(t.get("per_hour"))}/h) '
+                                              f'{(t.get("text") or "")[:40]}' for t in top))
+    return '\n'.join(lines)
+
+SECTIONS = {
+    # name: (fetcher, timeout seconds, cache TTL seconds or None for never cached)
+    'update': (_update, 20, None),
+    'heartbeat': (_heartbeat, 15, None),
+    'agent': (_agent, 10, 0),
+    'recent_actions': (_recent_actions, 10, 0),
+    'reply_log': (_reply_log, 2, 0),
+    'price_alerts': (_price_alerts, 2, None),
+    'leaderboard': (_leaderboard, 10, 300),
+    'platform_stats': (_platform_stats, 10, 300),
+    'launches': (_launches, 30, 120),
+    'transactions': (_transactions, 20, 60),
+    'own_profile': (_own_profile, 30, 0),
+    'own_tweets': (_own_tweets, 30, 0),
+}
+
+# --- Build ---
+
+def _load_cache():
+    try:
+        with open(CACHE_FILE) as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def _save_cache(cache):
+    tmp = f'{CACHE_FILE}.{os.getpid()}'
+    with open(tmp, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp, CACHE_FILE)
+
+async def _section(ctx, name, cache, use_cache):
+    """(value, status, ms) for one section, honouring its TTL, timeout and stale fallback."""
+    fetch, timeout, ttl = SECTIONS[name]
+    started = time.perf_counter()
+    elapsed = lambda: round((time.perf_counter() - started) * 1000, 1)
+    entry = cache.get(name)
+    if use_cache and ttl and entry and time.time() - entry[0] < ttl:
+        return entry[1], 'cached', elapsed()
+    try:
+        value = await asyncio.wait_for(fetch(ctx), timeout)
+    except Exception as e:
+        status = 'timeout' if isinstance(e, asyncio.TimeoutError) else 'error'
+        if ttl is not None and entry and time.time() - entry[0] < STALE_MAX_AGE:
+            _log(f'⚠️  {name}: {status}, using last good value')
+            return entry[1], 'stale', elapsed()
+        _log(f'⚠️  {name}: {status}{": " + str(e) if str(e) else ""}')
+        return None, status, elapsed()
+    if ttl is not None:
+        cache[name] = (time.time(), value)
+    return value, 'ok', elapsed()
+
+async def build_context(env, use_cache=True):
+    """Fetch all sections concurrently; returns the JSON-ready context dict."""
+    cache = _load_cache()
+    ctx = Context(env)
+    started = time.perf_counter()
+    try:
+        names = list(SECTIONS)
+        results = await asyncio.gather(*[_section(ctx, name, cache, use_cache) for name in names])
+    finally:
+        await ctx.close()
+    try:
+        _save_cache(cache)
+    except OSError:
+        pass
+    out = {'agent': None, 'sections': {}, 'status': {}, 'timing_ms': {}}
+    for name, (value, status, ms) in zip(names, results):
+        out['status'][name] = status
+        out['timing_ms'][name] = ms
+        if name == 'agent':
+            out['agent'] = value
+        elif value is not None and name not in ('update', 'heartbeat'):
+            out['sections'][name] = value
+    out['timing_ms']['total'] = round((time.perf_counter() - started) * 1000, 1)
+    return out
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] in ('-h', '--help', 'help'):
+        print(__doc__)
+        sys.exit(0)
+    context = asyncio.run(build_context(load_env(), use_cache='--no-cache' not in sys.argv))
+    slowest = sorted(((ms, name) for name, ms in context['timing_ms'].items() if name != 'total'), reverse=True)[:3]
+    _log(f'⏱️ context {context["timing_ms"]["total"]}ms (slowest: '
+         + ', '.join(f'{name} {ms}ms/{context["status"][name]}' for ms, name in slowest) + ')')
+    print(json.dumps(context, ensure_ascii=False))
+
+if __name__ == '__main__':
+    main()
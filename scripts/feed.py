@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Spirit Agent feed signal extractor.
+Usage: python3 feed.py <action> [args...]
+
+FEED:
+  analyze [file]                       Trading signals from twitter.py output (NDJSON tweets,
+                                       {"tweets": [...]} / poll results) or plain feed text,
+                                       read from file or stdin. Mentions are weighted by
+                                       likes/retweets/views, and per-ticker counts roll across
+                                       runs so acceleration is visible
+  reset                                Forget rolling ticker history
+"""
+
+import json
+import math
+import os
+import re
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def _log(msg):
+    print(msg, file=sys.stderr, flush=True)
+
+# --- Matching ---
+# Every keyword family is one named alternative of a single compiled pattern,
+# so each tweet is scanned once and every match (not every matching line) is
+# counted.
+BULLISH_WORDS = ['bull', 'bullish', 'pump', 'moon', 'buy', 'long', 'breakout', 'ath', 'gem', 'rocket', 'send it',
+                 'wagmi', 'diamond', 'hold', 'hodl', 'up only', 'to the moon', 'lets go', 'launch', 'fly', 'parabolic']
+BEARISH_WORDS = ['bear', 'bearish', 'dump', 'short', 'sell', 'crash', 'rug', 'scam', 'rekt', 'ngmi', 'dead', 'down',
+                 'fall', 'drop', 'panic', 'fear', 'avoid', 'trap', 'bubble']
+ALPHA_WORDS = ['alpha', 'call', 'gem', 'early', 'hidden', 'sleeper', 'moonshot', '100x', '1000x']
+ALPHA_EMOJI = ['🔥', '🚀', '💎', '⬆️', '📈']
+
+def _words(words):
+    # Longest first so "to the moon" wins over "moon"
+    return '|'.join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+SIGNAL_PATTERN = re.compile(
+    r'(?P<ticker>\$[A-Za-z]{2,10})'
+    r'|(?P<hashtag>#[A-Za-z0-9_]+)'  # analyze-feed.sh's ASCII class
+    rf'|\b(?P<bullish>{_words(BULLISH_WORDS)})\b'
+    rf'|\b(?P<bearish>{_words(BEARISH_WORDS)})\b'
+    rf'|(?P<alpha>{_words(ALPHA_EMOJI)})|\b(?P<alpha_word>{_words(ALPHA_WORDS)})\b',
+    re.IGNORECASE,
+)
+# Words in two families ("gem") match as bullish and also mark the tweet as alpha
+ALPHA_OVERLAP = {w for w in ALPHA_WORDS if w in BULLISH_WORDS or w in BEARISH_WORDS}
+
+def _weight(tweet):
+    """Engagement weight of a tweet: 1 for nothing, growing logarithmically with likes/retweets/views."""
+    likes = tweet.get('likes') or 0
+    retweets = tweet.get('retweets') or 0
+    replies = tweet.get('replies') or 0
+    try:
+        views = int(tweet.get('views') or 0)
+    except (TypeError, ValueError):
+        views = 0
+    return 1 + math.log1p(likes + 2 * retweets + replies + views / 100)
+
+# --- Input ---
+
+def _tweets_in(record):
+    """Tweet dicts anywhere inside one twitter.py JSON record: a tweet, an action or
+    batch result, or poll output ({"feeds": {"timeline": {"new": [...]}, ...}})."""
+    if isinstance(record, list):
+        for item in record:
+            yield from _tweets_in(item)
+        return
+    if not isinstance(record, dict):
+        return
+    if isinstance(record.get('text'), str):
+        yield record
+        return
+    for key, value in record.items():
+        if key != 'messages':  # DMs carry text too but are not feed tweets
+            yield from _tweets_in(value)
+
+def iter_tweets(lines):
+    """Tweets from NDJSON/JSON lines; non-JSON lines are treated as plain-text tweets."""
+    records = found = 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield {'text': line}
+            continue
+        records += 1
+        for tweet in _tweets_in(record):
+            found += 1
+            yield tweet
+    if records and not found:
+        # Usually twitter.py output in a shape _tweets_in does not know yet
+        _log(f'⚠️  No tweets found in {records} JSON record(s)')
+
+# --- Rolling ticker history ---
+# Each run is one tick. Per-ticker mention counts of tweets not seen in an
+# earlier tick are kept for FEED_WINDOW seconds, so a ticker's current count
+# can be compared with its recent per-tick average.
+FEED_STATE_FILE = os.path.join(SCRIPT_DIR, '..', '.feed_signals.json')
+FEED_WINDOW = 3600
+FEED_SEEN_MAX = 5000
+
+def _load_state():
+    try:
+        with open(FEED_STATE_FILE) as f:
+            return json.load(f)
+    except Exception:
+        return {'ticks': [], 'seen': []}
+
+def _save_state(state):
+    tmp = f'{FEED_STATE_FILE}.{os.getpid()}'
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, FEED_STATE_FILE)
+
+# --- Analysis ---
+TOP_N = 15
+
+def analyze(tweets, state=None, now=None):
+    """Single pass over tweets; returns the analyze-feed result dict and updates state in place."""
+    now = time.time() if now is None else now
+    seen = dict.fromkeys(state['seen']) if state is not None else {}  # insertion-ordered set
+    tickers, hashtags = {}, {}  # key -> [mentions, weighted]
+    fresh = {}  # ticker -> mentions in tweets new to this tick
+    bullish = bearish = 0
+    bullish_w = bearish_w = 0.0
+    alpha = []
+    count = 0
+    for tweet in tweets:
+        count += 1
+        weight = _weight(tweet)
+        is_new = tweet.get('id') is None or str(tweet['id']) not in seen
+        if tweet.get('id') is not None:
+            # Re-seen ids move to the end, so the trim below drops the ones gone longest
+            seen.pop(str(tweet['id']), None)
+            seen[str(tweet['id'])] = None
+        has_alpha = False
+        for m in SIGNAL_PATTERN.finditer(tweet.get('text') or ''):
+            kind = m.lastgroup
+            if kind == 'ticker':
+                symbol = m.group().upper()
+                entry = tickers.setdefault(symbol, [0, 0.0])
+                entry[0] += 1
+                entry[1] += weight
+                if is_new:
+                    fresh[symbol] = fresh.get(symbol, 0) + 1
+            elif kind == 'hashtag':
+                entry = hashtags.setdefault(m.group(), [0, 0.0])
+                entry[0] += 1
+                entry[1] += weight
+            elif kind == 'bullish':
+                bullish += 1
+                bullish_w += weight
+                has_alpha = has_alpha or m.group().lower() in ALPHA_OVERLAP
+            elif kind == 'bearish':
+                bearish += 1
+                bearish_w += weight
+                has_alpha = has_alpha or m.group().lower() in ALPHA_OVERLAP
+            else:
+                has_alpha = True
+        if has_alpha:
+            alpha.append((weight, tweet))
+    
+    if not count:
+        return None
+    
+    # Rolling per-ticker history
+    history = []
+    if state is not None:
+        history = [t for t in state['ticks'] if now - t['ts'] < FEED_WINDOW]
+        state['ticks'] = history + [{'ts': now, 'tickers': fresh}]
+        state['seen'] = list(seen)[-FEED_SEEN_MAX:]
+    
+    def rolling(symbol):
+        past = [t['tickers'].get(symbol, 0) for t in history]
+        current = fresh.get(symbol, 0)
+        avg = sum(past) / len(past) if past else 0
+        return {
+            'window_mentions': sum(past) + current,
+            'avg_per_tick': round(avg, 2),
+            'acceleration': round(current - avg, 2) if past else None,
+        }
+    
+    ranked = sorted(tickers.items(), key=lambda kv: kv[1][1], reverse=True)[:TOP_N]
+    total = bullish_w + bearish_w
+    if total:
+        overall = 'bullish' if bullish_w > bearish_w else 'bearish'
+        confidence = round(max(bullish_w, bearish_w) / total, 2)
+    else:
+        overall, confidence = 'neutral', 0.0
+    alpha.sort(key=lambda wt: wt[0], reverse=True)
+    
+    return {
+        'status': 'ok',
+        'trending': {
+            'tokens': [{'symbol': s, 'mentions': n, 'weighted': round(w, 2), **rolling(s)} for s, (n, w) in ranked],
+            'hashtags': [{'tag': tag, 'mentions': n, 'weighted': round(w, 2)}
+                         for tag, (n, w) in sorted(hashtags.items(), key=lambda kv: kv[1][1], reverse=True)[:TOP_N]],
+        },
+        'sentiment': {
+            'overall': overall,
+            'confidence': confidence,
+            'bullish_signals': bullish,
+            'bearish_signals': bearish,
+            'bullish_weighted': round(bullish_w, 2),
+            'bearish_weighted': round(bearish_w, 2),
+        },
+        'alpha_signals': len(alpha),
+        'alpha': [{'id': t.get('id'), 'user': t.get('user'), 'text': t.get('text'), 'weight': round(w, 2)}
+                  for w, t in alpha[:5]],
+        'tweets': count,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(now)),
+    }
+
+# --- Main ---
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] in ('-h', '--help', 'help'):
+        print(__doc__)
+        sys.exit(0)
+    
+    action, args = sys.argv[1], sys.argv[2:]
+    
+    if action == 'analyze':
+        _log('🐦 Analyzing X feed for alpha...')
+        if args and os.path.isfile(args[0]):
+            _log(f'📄 Reading from file: {args[0]}')
+            with open(args[0]) as f:
+                state = _load_state()
+                result = analyze(iter_tweets(f), state)
+        else:
+            _log('📖 Reading from stdin...')
+            state = _load_state()
+            result = analyze(iter_tweets(sys.stdin), state)
+        if result is None:
+            _log('⚠️  No feed text provided')
+            result = {
+                'status': 'no_input',
+                'signals': [],
+                'trending': {'tokens': [], 'hashtags': []},
+                'sentiment': {'overall': 'unknown', 'confidence': 0},
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            }
+        else:
+            try:
+                _save_state(state)
+            except OSError:
+                pass
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    
+    elif action == 'reset':
+        if os.path.exists(FEED_STATE_FILE):
+            os.unlink(FEED_STATE_FILE)
+        print(json.dumps({'ok': True, 'reset': True}))
+    
+    else:
+        _log(f'Unknown action: {action}. Run without args for help.')
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,856 @@
+#!/usr/bin/env python3
+"""
+Spirit Agent market data tools (DexScreener, no API key needed).
+Usage: python3 market.py <action> [args...]
+
+MARKET:
+  scan [limit] [--watch [seconds]]     Trending Base pairs from search + top boosted tokens
+       [--score]                       (default limit 20); --watch re-scans every N seconds
+                                       (default 30) and prints only new/changed rows as NDJSON;
+                                       --score adds each row's strategy score
+  score <address> [address ...]        Score tokens against the strategy, ranked; one address
+        [--strategy name]              prints the single token-score.sh object
+
+MONITOR:
+  monitor [--interval seconds]         Re-price watchlist tokens and open positions every N
+          [--strategy name]            seconds (default 10) in batched requests; prints
+                                       take_profit / stop_loss / move events as NDJSON
+  monitor --once                       One pass: every watched token's price and change
+                                       from entry, plus any events
+  monitor --status                     Whether a monitor is running (exit 1 if not), its pid,
+                                       and "stale": true when its code has changed on disk
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ENV_FILE = os.path.join(SCRIPT_DIR, '..', '.env')
+STRATEGIES_DIR = os.path.join(SCRIPT_DIR, '..', 'strategies')
+
+DEXSCREENER_URL = 'https://api.dexscreener.com'
+CHAIN = 'base'
+
+class MarketError(Exception):
+    """A DexScreener call failed — reported on stderr with exit 1."""
+
+def _log(msg):
+    print(msg, file=sys.stderr, flush=True)
+
+def load_env():
+    env = {}
+    if os.path.exists(ENV_FILE):
+        with open(ENV_FILE) as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, _, val = line.partition('=')
+                    env[key.strip()] = val.strip().strip('"').strip("'")
+    return env
+
+def load_strategy(name):
+    path = os.path.join(STRATEGIES_DIR, f'{name}.json')
+    if not os.path.exists(path):
+        raise MarketError(f'Strategy not found: {name}')
+    with open(path) as f:
+        return json.load(f)
+
+# --- DexScreener client ---
+# One pooled keep-alive connection for every call in a process. Responses are
+# kept in a short-TTL cache (in memory, and in a small JSON file so back-to-back
+# invocations share it). Each endpoint family is throttled to DexScreener's
+# published budget with a sliding one-minute window kept in SQLite, so scan,
+# the always-on monitor, pnl and safety.py together stay within one budget.
+CACHE_FILE = os.path.join(SCRIPT_DIR, '..', '.dexscreener_cache.json')
+RATE_DB = os.path.join(SCRIPT_DIR, '..', '.dexscreener_ratelimit.db')
+CACHE_TTL = {
+    'boosts': 60,
+    'search': 20,
+    'tokens': 20,
+}
+RATE_LIMITS = {  # requests per minute
+    'boosts': 60,
+    'search': 300,
+    'tokens': 300,
+}
+TOKENS_PER_REQUEST = 30  # /tokens/v1 accepts up to 30 comma-separated addresses
+
+class RateWindows:
+    """Per-endpoint sliding one-minute windows, shared across processes through SQLite.
+    
+    When the database cannot be opened or written, each process falls back to
+    windows of its own rather than failing the call.
+    """
+    
+    def __init__(self, path):
+        from collections import deque
+        self.path = path
+        self._conn = None
+        self._local = {bucket: deque() for bucket in RATE_LIMITS}
+    
+    def _db(self):
+        if self._conn is None:
+            import sqlite3
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS requests (bucket TEXT NOT NULL, ts REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS requests_bucket_ts ON requests (bucket, ts)')
+            self._conn = conn
+        return self._conn
+    
+    def take(self, bucket):
+        """Count one request. Returns 0 on success, else seconds until the window has room."""
+        import sqlite3
+        now = time.time()
+        try:
+            conn = self._db()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute('DELETE FROM requests WHERE bucket = ? AND ts <= ?', (bucket, now - 60))
+                count, oldest = conn.execute('SELECT COUNT(*), MIN(ts) FROM requests WHERE bucket = ?',
+                                             (bucket,)).fetchone()
+                if count < RATE_LIMITS[bucket]:
+                    conn.execute('INSERT INTO requests VALUES (?, ?)', (bucket, now))
+                    wait = 0
+                else:
+                    wait = oldest + 60 - now
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            return wait
+        except sqlite3.Error:
+            window = self._local[bucket]
+            while window and now - window[0] >= 60:
+                window.popleft()
+            if len(window) < RATE_LIMITS[bucket]:
+                window.append(now)
+                return 0
+            return window[0] + 60 - now
+    
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+class DexScreener:
+    """Async DexScreener client with a response cache and per-endpoint throttling."""
+    
+    def __init__(self, cache_file=CACHE_FILE, rate_db=RATE_DB):
+        self.cache_file = cache_file
+        self.cache = self._load_cache()
+        self.dirty = False
+        self.rate = RateWindows(rate_db)
+        self.requests = 0
+        self.cache_hits = 0
+        self._http = None
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        self.save()
+        self.rate.close()
+        if self._http is not None:
+            await self._http.aclose()
+    
+    def _load_cache(self):
+        try:
+            with open(self.cache_file) as f:
+                return json.load(f)
+        except Exception:
+            return {}
+    
+    def save(self):
+        """Merge fresh entries into the on-disk cache, dropping expired ones."""
+        if not self.dirty:
+            return
+        now = time.time()
+        merged = {**self._load_cache(), **self.cache}
+        merged = {k: v for k, v in merged.items() if now - v[0] < CACHE_TTL[k.partition(':')[0]]}
+        try:
+            tmp = f'{self.cache_file}.{os.getpid()}'
+            with open(tmp, 'w') as f:
+                json.dump(merged, f)
+            os.replace(tmp, self.cache_file)
+        except OSError:
+            pass
+        self.dirty = False
+    
+    async def _throttle(self, bucket):
+        while True:
+            wait = self.rate.take(bucket)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+    
+    async def get(self, bucket, path, max_age=None):
+        """GET a DexScreener path as JSON, served from cache while fresh (or younger than max_age seconds)."""
+        key = f'{bucket}:{path}'
+        entry = self.cache.get(key)
+        ttl = CACHE_TTL[bucket] if max_age is None else min(max_age, CACHE_TTL[bucket])
+        if entry and time.time() - entry[0] < ttl:
+            self.cache_hits += 1
+            return entry[1]
+        if self._http is None:
+            import httpx
+            self._http = httpx.AsyncClient(base_url=DEXSCREENER_URL, timeout=15,
+                                           headers={'Accept': 'application/json'})
+        await self._throttle(bucket)
+        self.requests += 1
+        try:
+            resp = await self._http.get(path)
+            resp.raise_for_status()
+            data = resp.json()
+        except Exception as e:
+            raise MarketError(f'{path}: {e}') from e
+        self.cache[key] = (time.time(), data)
+        self.dirty = True
+        return data
+    
+    async def boosts(self):
+        """Top boosted tokens across chains."""
+        data = await self.get('boosts', '/token-boosts/top/v1')
+        return data if isinstance(data, list) else []
+    
+    async def search(self, query):
+        data = await self.get('search', f'/latest/dex/search?q={query}')
+        if not isinstance(data, dict) or 'pairs' not in data:
+            raise MarketError('Invalid API response format')
+        return data['pairs'] or []
+    
+    async def tokens(self, addresses, chain=CHAIN, max_age=None):
+        """All pairs for many token addresses, 30 per request, fetched concurrently."""
+        addresses = list(dict.fromkeys(addresses))
+        chunks = [addresses[i:i + TOKENS_PER_REQUEST] for i in range(0, len(addresses), TOKENS_PER_REQUEST)]
+        pages = await asyncio.gather(*[self.get('tokens', f'/tokens/v1/{chain}/{",".join(chunk)}', max_age)
+                                       for chunk in chunks])
+        pairs = []
+        for page in pages:
+            # /tokens/v1 returns a bare list; older endpoints wrap it in {"pairs": [...]}
+            pairs.extend(page if isinstance(page, list) else (page or {}).get('pairs') or [])
+        return pairs
+
+# --- Market scan ---
+SCAN_LIMIT = 20
+SCAN_QUERY = 'base'
+SCAN_MIN_LIQUIDITY = 1000
+SCAN_MIN_VOLUME = 100
+WATCH_INTERVAL = 30
+
+def _num(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _scan_row(pair, boosted, updated):
+    txns = (pair.get('txns') or {}).get('h24') or {}
+    volume = pair.get('volume') or {}
+    change = pair.get('priceChange') or {}
+    base = pair['baseToken']
+    return {
+        'address': base['address'],
+        'symbol': base.get('symbol'),
+        'name': base.get('name'),
+        'price_usd': _num(pair.get('priceUsd')),
+        'market_cap': pair.get('fdv') or 0,
+        'liquidity_usd': (pair.get('liquidity') or {}).get('usd') or 0,
+        'volume_24h': volume.get('h24') or 0,
+        'volume_6h': volume.get('h6') or 0,
+        'volume_1h': volume.get('h1') or 0,
+        'price_change_24h': change.get('h24') or 0,
+        'price_change_6h': change.get('h6') or 0,
+        'price_change_1h': change.get('h1') or 0,
+        'txns_24h_buys': txns.get('buys') or 0,
+        'txns_24h_sells': txns.get('sells') or 0,
+        'pair_created_at': pair.get('pairCreatedAt'),
+        'pair_address': pair.get('pairAddress'),
+        'dex_id': pair.get('dexId'),
+        'boosted': boosted.get(base['address'].lower(), 0),
+        'updated': updated,
+    }
+
+def _tradeable(pair):
+    return (pair.get('chainId') == CHAIN
+            and ((pair.get('liquidity') or {}).get('usd') or 0) > SCAN_MIN_LIQUIDITY
+            and ((pair.get('volume') or {}).get('h24') or 0) > SCAN_MIN_VOLUME
+            and _num(pair.get('priceUsd')) > 0
+            and (pair.get('baseToken') or {}).get('address') is not None)
+
+async def scan_market(dex, limit=SCAN_LIMIT, strategy=None):
+    """Top Base pairs by 24h volume from search results joined with boosted tokens' pairs.
+    
+    With a strategy, each row also gets its score and recommendation from the
+    already-fetched pair data.
+    """
+    # Search runs while the boosted list is fetched and expanded into pairs
+    search = asyncio.ensure_future(dex.search(SCAN_QUERY))
+    boosted, boosted_pairs = {}, []
+    try:
+        boosts = await dex.boosts()
+        for b in boosts:
+            if b.get('chainId') == CHAIN and b.get('tokenAddress'):
+                boosted[b['tokenAddress'].lower()] = b.get('totalAmount') or b.get('amount') or 0
+        _log(f'📈 Found {len(boosts)} boosted tokens ({len(boosted)} on Base)')
+        if boosted:
+            boosted_pairs = await dex.tokens(list(boosted))
+    except MarketError as e:
+        _log(f'❌ Boosted tokens API error: {e}')
+    try:
+        pairs = await search
+    except MarketError as e:
+        raise MarketError(f'Search API error: {e}') from e
+    
+    seen, candidates = set(), []
+    for pair in pairs + boosted_pairs:
+        if pair.get('pairAddress') in seen or not _tradeable(pair):
+            continue
+        seen.add(pair.get('pairAddress'))
+        candidates.append(pair)
+    candidates.sort(key=lambda p: p['volume']['h24'], reverse=True)
+    candidates = candidates[:limit]
+    updated = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    rows = [_scan_row(p, boosted, updated) for p in candidates]
+    if strategy is not None and rows:
+        for row, scored in zip(rows, score_pairs(candidates, strategy)):
+            row['score'] = scored['score']
+            row['recommendation'] = scored['recommendation']
+    return rows
+
+async def watch_market(dex, limit, interval, emit, strategy=None):
+    """Re-scan forever, emitting rows that are new or changed and a removal marker for dropped pairs."""
+    last = {}
+    while True:
+        try:
+            rows = await scan_market(dex, limit, strategy)
+        except MarketError as e:
+            _log(f'❌ {e}')
+        else:
+            current = {row['pair_address']: row for row in rows}
+            for key, row in current.items():
+                prev = last.get(key)
+                if prev is None or {**prev, 'updated': None} != {**row, 'updated': None}:
+                    emit(row)
+            for key in last.keys() - current.keys():
+                emit({'address': last[key]['address'], 'pair_address': key, 'removed': True})
+            last = current
+            dex.save()
+        await asyncio.sleep(interval)
+
+# --- Token scoring ---
+# Same weighted liquidity/volume/momentum/activity score as the original
+# token-score.sh jq program, computed for a whole batch of pairs at once:
+# column arrays through NumPy when it is installed, a plain loop otherwise.
+SCORE_WEIGHTS = {'liquidity': 0.4, 'volume': 0.3, 'price_action': 0.2, 'txn_activity': 0.1}
+RECOMMENDATIONS = [(80, 'STRONG_BUY'), (60, 'BUY'), (40, 'WATCH'), (20, 'WEAK')]
+
+def _pair_metrics(pair):
+    txns = (pair.get('txns') or {}).get('h24') or {}
+    return {
+        'liquidity_usd': (pair.get('liquidity') or {}).get('usd') or 0,
+        'volume_24h_usd': (pair.get('volume') or {}).get('h24') or 0,
+        'price_change_24h': (pair.get('priceChange') or {}).get('h24') or 0,
+        'txns_24h': (txns.get('buys') or 0) + (txns.get('sells') or 0),
+        'market_cap': pair.get('fdv') or 0,
+    }
+
+def _age_days(created_ms, now):
+    return (now - created_ms / 1000) / 86400
+
+def _score_scalar(metrics, created, min_liq, now):
+    """Per-pair (liquidity, volume, price_action, txn_activity, final) scores."""
+    liq, vol = metrics['liquidity_usd'], metrics['volume_24h_usd']
+    change, txns = metrics['price_change_24h'], metrics['txns_24h']
+    if liq < min_liq:
+        liq_s = 0
+    elif liq >= min_liq * 10:
+        liq_s = 100
+    else:
+        liq_s = min(liq / min_liq * 10, 100)
+    vol_s = min(vol / liq * 20, 100) if liq > 0 else 0
+    if change > 0:
+        price_s = 100 if change > 50 else min(change * 2, 100)
+    else:
+        price_s = 20 if change > -10 else 0
+    if txns > 100:
+        txn_s = 100
+    elif txns > 10:
+        txn_s = txns / 100 * 100
+    else:
+        txn_s = min(txns * 5, 100)
+    total = (liq_s * SCORE_WEIGHTS['liquidity'] + vol_s * SCORE_WEIGHTS['volume']
+             + price_s * SCORE_WEIGHTS['price_action'] + txn_s * SCORE_WEIGHTS['txn_activity'])
+    # Newer pairs are riskier
+    if created:
+        age = _age_days(created, now)
+        total *= 0.8 if age < 1 else 0.9 if age < 7 else 1
+    return liq_s, vol_s, price_s, txn_s, total
+
+def _score_vectorized(np, metrics, created, min_liq, now):
+    """Column-wise version of _score_scalar over all pairs."""
+    liq = np.array([m['liquidity_usd'] for m in metrics], dtype=float)
+    vol = np.array([m['volume_24h_usd'] for m in metrics], dtype=float)
+    change = np.array([m['price_change_24h'] for m in metrics], dtype=float)
+    txns = np.array([m['txns_24h'] for m in metrics], dtype=float)
+    age = _age_days(np.array([c or np.nan for c in created], dtype=float), now)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        liq_s = np.where(liq < min_liq, 0, np.where(liq >= min_liq * 10, 100, np.minimum(liq / min_liq * 10, 100)))
+        vol_s = np.where(liq > 0, np.minimum(vol / liq * 20, 100), 0)
+    price_s = np.where(change > 0, np.where(change > 50, 100, np.minimum(change * 2, 100)),
+                       np.where(change > -10, 20, 0))
+    txn_s = np.where(txns > 100, 100, np.where(txns > 10, txns / 100 * 100, np.minimum(txns * 5, 100)))
+    total = (liq_s * SCORE_WEIGHTS['liquidity'] + vol_s * SCORE_WEIGHTS['volume']
+             + price_s * SCORE_WEIGHTS['price_action'] + txn_s * SCORE_WEIGHTS['txn_activity'])
+    # NaN ages (unknown creation time) compare False and keep the full score
+    total = total * np.where(age < 1, 0.8, np.where(age < 7, 0.9, 1.0))
+    return zip(*(col.tolist() for col in (liq_s, vol_s, price_s, txn_s, total)))
+
+def _recommendation(score):
+    return next((label for floor, label in RECOMMENDATIONS if score >= floor), 'AVOID')
+
+def score_pairs(pairs, strategy, now=None):
+    """Score DexScreener pairs against a strategy; returns token-score.sh records in input order."""
+    import math
+    now = time.time() if now is None else now
+    min_liq = float(strategy['minLiquidityUSD'])
+    metrics = [_pair_metrics(p) for p in pairs]
+    created = [p.get('pairCreatedAt') for p in pairs]
+    try:
+        import numpy as np
+    except ImportError:
+        scores = [_score_scalar(m, c, min_liq, now) for m, c in zip(metrics, created)]
+    else:
+        scores = _score_vectorized(np, metrics, created, min_liq, now)
+    records = []
+    for pair, m, c, (liq_s, vol_s, price_s, txn_s, total) in zip(pairs, metrics, created, scores):
+        base = pair.get('baseToken') or {}
+        records.append({
+            'address': base.get('address'),
+            'symbol': base.get('symbol') or 'UNKNOWN',
+            'name': base.get('name') or 'Unknown Token',
+            'score': math.floor(total),
+            'breakdown': {
+                'liquidity': math.floor(liq_s),
+                'volume': math.floor(vol_s),
+                'price_action': math.floor(price_s),
+                'txn_activity': math.floor(txn_s),
+            },
+            'metrics': {**m, 'age_days': math.floor(_age_days(c, now)) if c else None},
+            'meets_criteria': m['liquidity_usd'] >= min_liq and m['txns_24h'] >= 10,
+            'recommendation': _recommendation(total),
+            'pair_address': pair.get('pairAddress'),
+            'dex': pair.get('dexId'),
+        })
+    return records
+
+def _unscored(address, error):
+    return {
+        'address': address,
+        'symbol': 'UNKNOWN',
+        'name': 'Unknown Token',
+        'score': 0,
+        'breakdown': {'liquidity': 0, 'volume': 0, 'price_action': 0, 'txn_activity': 0},
+        'metrics': {'liquidity_usd': 0, 'volume_24h_usd': 0, 'price_change_24h': 0, 'txns_24h': 0},
+        'meets_criteria': False,
+        'recommendation': 'AVOID',
+        'error': error,
+    }
+
+def _best_pairs(pairs):
+    """(every base token address seen, {lowercased address: its highest-liquidity pair on our chain})."""
+    found, best = set(), {}
+    for pair in pairs:
+        address = ((pair.get('baseToken') or {}).get('address') or '').lower()
+        found.add(address)
+        if pair.get('chainId') != CHAIN:
+            continue
+        liq = (pair.get('liquidity') or {}).get('usd') or 0
+        if address not in best or liq > ((best[address].get('liquidity') or {}).get('usd') or 0):
+            best[address] = pair
+    return found, best
+
+async def score_tokens(dex, addresses, strategy):
+    """Score many token addresses with batched lookups; returns (ranked records, per-stage timing in ms)."""
+    timing = {}
+    started = time.perf_counter()
+    try:
+        pairs = await dex.tokens(addresses)
+    except MarketError as e:
+        _log(f'❌ Failed to fetch token info from DexScreener: {e}')
+        return [_unscored(a, 'API_FAILED') for a in addresses], {'fetch': round((time.perf_counter() - started) * 1000, 2)}
+    mark = time.perf_counter()
+    timing['fetch'] = round((mark - started) * 1000, 2)
+    
+    found, best = _best_pairs(pairs)
+    picked = [best[a.lower()] for a in addresses if a.lower() in best]
+    timing['select'] = round((time.perf_counter() - mark) * 1000, 2)
+    
+    mark = time.perf_counter()
+    scored = {r['address'].lower(): r for r in score_pairs(picked, strategy)}
+    timing['score'] = round((time.perf_counter() - mark) * 1000, 2)
+    
+    mark = time.perf_counter()
+    records = []
+    for address in dict.fromkeys(addresses):
+        key = address.lower()
+        if key in scored:
+            records.append(scored[key])
+        else:
+            records.append(_unscored(address, 'NO_BASE_PAIRS' if key in found else 'NO_PAIRS'))
+    records.sort(key=lambda r: r['score'], reverse=True)
+    timing['rank'] = round((time.perf_counter() - mark) * 1000, 2)
+    timing['total'] = round((time.perf_counter() - started) * 1000, 2)
+    return records, timing
+
+# --- Price monitor ---
+# `monitor` re-prices every watchlist token and open position on its own
+# schedule, independent of the agent loop, in as few /tokens/v1 requests as
+# the 30-address limit allows. Each token keeps a ring buffer of its prices
+# over the last MONITOR_WINDOW seconds. A position emits take_profit or
+# stop_loss when its change from the entry price crosses the strategy's
+# takeProfitPct / stopLossPct (once per crossing; it re-arms when the price
+# comes back), and any token emits move when it swings MONITOR_MOVE_PCT within
+# the window. Positions come from data/trades.jsonl (average cost of what is
+# still held), overridden by the platform portfolio when it is configured.
+DATA_DIR = os.path.join(SCRIPT_DIR, '..', 'data')
+WATCHLIST_FILE = os.path.join(DATA_DIR, 'watchlist.json')
+MONITOR_INTERVAL = 10
+MONITOR_WINDOW = 300
+MONITOR_MOVE_PCT = 10
+PORTFOLIO_REFRESH = 300
+MONITOR_STATE_FILE = os.path.join(SCRIPT_DIR, '..', '.monitor.json')  # pid and code of the running monitor
+
+def _load_watchlist():
+    """{lowercased address: symbol} from data/watchlist.json."""
+    try:
+        with open(WATCHLIST_FILE) as f:
+            tokens = json.load(f).get('tokens') or []
+    except (OSError, ValueError, AttributeError):
+        return {}
+    return {t['address'].lower(): t.get('symbol') for t in tokens if isinstance(t, dict) and t.get('address')}
+
+def _local_positions():
+    """{lowercased address: (symbol, average entry price in USD)} for tokens data/trades.jsonl still holds."""
+    from trades import open_positions  # incremental: only lines appended since the last read are parsed
+    return open_positions()
+
+class _Watched:
+    __slots__ = ('address', 'symbol', 'source', 'entry', 'prices', 'zone', 'moved_at')
+    
+    def __init__(self, address, symbol, source, entry, interval):
+        from collections import deque
+        self.address = address
+        self.symbol = symbol
+        self.source = source
+        self.entry = entry
+        self.prices = deque(maxlen=int(MONITOR_WINDOW / interval) + 1)  # (ts, price USD)
+        self.zone = None
+        self.moved_at = 0
+
+class PriceMonitor:
+    """Batched re-pricing of watched tokens with take-profit/stop-loss/move detection."""
+    
+    def __init__(self, dex, strategy, env, interval=MONITOR_INTERVAL):
+        self.dex = dex
+        self.env = env
+        self.interval = interval
+        self.take_profit = _num(strategy.get('takeProfitPct'))
+        self.stop_loss = _num(strategy.get('stopLossPct'))
+        self.move_pct = _num(env.get('MONITOR_MOVE_PCT') or MONITOR_MOVE_PCT)
+        self.tokens = {}
+        self._platform = {}
+        self._platform_at = 0
+        self._http = None
+    
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+    
+    async def _platform_positions(self):
+        """Open positions from the platform portfolio, re-read every PORTFOLIO_REFRESH seconds."""
+        if not (self.env.get('PLATFORM_API_URL') and self.env.get('PLATFORM_API_KEY')):
+            return {}
+        if time.monotonic() - self._platform_at < PORTFOLIO_REFRESH and self._platform_at:
+            return self._platform
+        self._platform_at = time.monotonic()
+        if self._http is None:
+            import httpx
+            self._http = httpx.AsyncClient(base_url=self.env['PLATFORM_API_URL'] + '/api/v1', timeout=15,
+                                           headers={'Authorization': f'Bearer {self.env["PLATFORM_API_KEY"]}'})
+        try:
+            resp = await self._http.get('/agents/me')
+            resp.raise_for_status()
+            agent_id = resp.json()['data']['agent']['id']
+            resp = await self._http.get(f'/agents/{agent_id}/portfolio')
+            resp.raise_for_status()
+            positions = (resp.json().get('data') or {}).get('positions') or []
+        except Exception as e:
+            _log(f'⚠️  Platform portfolio unavailable: {e}')
+            return self._platform
+        self._platform = {}
+        for p in positions:
+            amount, cost = _num(p.get('amount')), _num(p.get('cost_basis_usd'))
+            if p.get('token_address') and amount > 0 and cost > 0:
+                self._platform[p['token_address'].lower()] = (p.get('symbol'), cost / amount)
+        return self._platform
+    
+    async def refresh(self):
+        """Rebuild the watched set from the watchlist and positions, keeping each token's price history."""
+        wanted = {a: (symbol, 'watchlist', None) for a, symbol in _load_watchlist().items()}
+        positions = {**_local_positions(), **await self._platform_positions()}
+        for a, (symbol, entry) in positions.items():
+            wanted[a] = (symbol or (wanted.get(a) or (None,))[0], 'position', entry)
+        tokens = {}
+        for a, (symbol, source, entry) in wanted.items():
+            token = self.tokens.get(a) or _Watched(a, symbol, source, entry, self.interval)
+            if token.entry != entry:
+                token.zone = None
+            token.symbol, token.source, token.entry = symbol, source, entry
+            tokens[a] = token
+        if tokens.keys() != self.tokens.keys():
+            held = sum(1 for t in tokens.values() if t.source == 'position')
+            requests = -(-len(tokens) // TOKENS_PER_REQUEST)
+            _log(f'👀 Watching {len(tokens)} token(s), {held} position(s) — {requests} request(s) per tick')
+        self.tokens = tokens
+    
+    async def tick(self, now=None):
+        """Re-price every watched token once; returns the events it triggered."""
+        await self.refresh()
+        if not self.tokens:
+            return []
+        pairs = await self.dex.tokens(list(self.tokens), max_age=0)
+        now = time.time() if now is None else now
+        _, best = _best_pairs(pairs)
+        events = []
+        for address, token in self.tokens.items():
+            price = _num((best.get(address) or {}).get('priceUsd'))
+            if price > 0:
+                events.extend(self._check(token, price, now))
+        return events
+    
+    def _event(self, kind, token, now, **fields):
+        price = token.prices[-1][1]
+        return {
+            'event': kind,
+            'address': token.address,
+            'symbol': token.symbol,
+            'source': token.source,
+            'price_usd': price,
+            'entry_price_usd': token.entry,
+            **fields,
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(now)),
+        }
+    
+    def _check(self, token, price, now):
+        prices = token.prices
+        while prices and now - prices[0][0] > MONITOR_WINDOW:
+            prices.popleft()
+        prices.append((now, price))
+        events = []
+        if token.entry:
+            change = (price / token.entry - 1) * 100
+            if self.take_profit and change >= self.take_profit:
+                zone, threshold = 'take_profit', self.take_profit
+            elif self.stop_loss and change <= -self.stop_loss:
+                zone, threshold = 'stop_loss', -self.stop_loss
+            else:
+                zone = None
+            if zone is not None and zone != token.zone:
+                events.append(self._event(zone, token, now, change_pct=round(change, 2), threshold_pct=threshold))
+            token.zone = zone
+        first_ts, first = prices[0]
+        swing = (price / first - 1) * 100
+        if self.move_pct and abs(swing) >= self.move_pct and now - token.moved_at >= MONITOR_WINDOW:
+            token.moved_at = now
+            events.append(self._event('move', token, now, window_change_pct=round(swing, 2),
+                                      window_s=round(now - first_ts)))
+        return events
+    
+    def snapshot(self):
+        """Latest price of every watched token, with its change from entry for positions."""
+        rows = []
+        for token in self.tokens.values():
+            price = token.prices[-1][1] if token.prices else None
+            rows.append({
+                'address': token.address,
+                'symbol': token.symbol,
+                'source': token.source,
+                'price_usd': price,
+                'entry_price_usd': token.entry,
+                'change_pct': round((price / token.entry - 1) * 100, 2) if price and token.entry else None,
+            })
+        return rows
+
+def _source_files():
+    """File names of the skill modules this process has loaded."""
+    files = set()
+    for module in list(sys.modules.values()):
+        path = getattr(module, '__file__', None)
+        if path and os.path.dirname(os.path.abspath(path)) == SCRIPT_DIR:
+            files.add(os.path.basename(path))
+    return sorted(files)
+
+def _code_version(files):
+    """Short hash of those files as they are on disk now."""
+    import hashlib
+    digest = hashlib.sha1()
+    for name in files:
+        digest.update(name.encode() + b'\0')
+        try:
+            with open(os.path.join(SCRIPT_DIR, name), 'rb') as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(b'\0missing')
+    return digest.hexdigest()[:12]
+
+def _save_monitor_state():
+    files = _source_files()
+    tmp = f'{MONITOR_STATE_FILE}.{os.getpid()}'
+    try:
+        with open(tmp, 'w') as f:
+            json.dump({'pid': os.getpid(), 'code': _code_version(files), 'files': files}, f)
+        os.replace(tmp, MONITOR_STATE_FILE)
+    except OSError as e:
+        _log(f'⚠️ Could not write {MONITOR_STATE_FILE}: {e}')
+
+def monitor_status():
+    """The running monitor's pid and code hash, and whether that code has changed on disk since."""
+    try:
+        with open(MONITOR_STATE_FILE) as f:
+            state = json.load(f)
+        os.kill(state['pid'], 0)
+    except (OSError, ValueError, KeyError, TypeError):
+        return {'running': False}
+    return {'running': True, 'pid': state['pid'], 'code': state.get('code'),
+            'stale': _code_version(state.get('files') or []) != state.get('code')}
+
+async def run_monitor(monitor, emit):
+    """Tick forever on the monitor's interval, emitting events as they happen."""
+    # Saved before the first tick, so agent-loop.sh sees us at once, and again
+    # after it, when the lazily imported modules are loaded too
+    _save_monitor_state()
+    first = True
+    while True:
+        started = time.monotonic()
+        try:
+            for event in await monitor.tick():
+                emit(event)
+            monitor.dex.save()
+        except MarketError as e:
+            _log(f'❌ {e}')
+        except Exception as e:
+            # A malformed pair or watchlist/portfolio record must not end the monitor
+            _log(f'❌ Monitor tick failed: {type(e).__name__}: {e}')
+        if first:
+            _save_monitor_state()
+            first = False
+        await asyncio.sleep(max(0, monitor.interval - (time.monotonic() - started)))
+
+# --- Main ---
+
+def _emit(record):
+    print(json.dumps(record), flush=True)
+
+async def main():
+    if len(sys.argv) < 2 or sys.argv[1] in ('-h', '--help', 'help'):
+        print(__doc__)
+        sys.exit(0)
+    
+    action, args = sys.argv[1], sys.argv[2:]
+    
+    if action == 'monitor' and '--status' in args:
+        status = monitor_status()
+        print(json.dumps(status))
+        sys.exit(0 if status['running'] else 1)
+    
+    strategy = None
+    if action in ('scan', 'score', 'monitor'):
+        name = None
+        if '--strategy' in args:
+            i = args.index('--strategy')
+            name = args[i + 1] if i + 1 < len(args) else None
+            del args[i:i + 2]
+        if action != 'scan' or '--score' in args or name:
+            args = [a for a in args if a != '--score']
+            try:
+                strategy = load_strategy(name or load_env().get('STRATEGY') or 'default')
+            except MarketError as e:
+                _log(f'❌ {e}')
+                sys.exit(1)
+    
+    if action == 'scan':
+        watch = '--watch' in args
+        interval = WATCH_INTERVAL
+        if watch:
+            i = args.index('--watch')
+            if i + 1 < len(args) and args[i + 1].isdigit():
+                interval = int(args.pop(i + 1))
+            args.pop(i)
+        try:
+            limit = int(args[0]) if args else SCAN_LIMIT
+        except ValueError:
+            _log('Usage: market.py scan [limit] [--watch [seconds]]')
+            sys.exit(1)
+        
+        _log('🔍 Scanning Base market for trending tokens via DexScreener...')
+        async with DexScreener() as dex:
+            if watch:
+                await watch_market(dex, limit, interval, _emit, strategy)
+            try:
+                rows = await scan_market(dex, limit, strategy)
+            except MarketError as e:
+                _log(f'❌ {e}')
+                print('[]')
+                sys.exit(1)
+        print(json.dumps(rows, indent=2))
+    
+    elif action == 'score':
+        if not args:
+            _log('Usage: market.py score <token_address> [token_address ...] [--strategy name]')
+            sys.exit(1)
+        _log(f'📊 Scoring {len(args)} token(s)...')
+        async with DexScreener() as dex:
+            records, timing = await score_tokens(dex, args, strategy)
+        _log('⏱️ ' + ' · '.join(f'{stage} {ms}ms' for stage, ms in timing.items()))
+        if len(args) == 1:
+            print(json.dumps(records[0], indent=2))
+        else:
+            print(json.dumps({'tokens': records, 'timing_ms': timing}, indent=2))
+    
+    elif action == 'monitor':
+        env = load_env()
+        once = '--once' in args
+        args = [a for a in args if a != '--once']
+        try:
+            interval = float(args[args.index('--interval') + 1]) if '--interval' in args \
+                else float(env.get('MONITOR_INTERVAL') or MONITOR_INTERVAL)
+        except (IndexError, ValueError):
+            _log('Usage: market.py monitor [--interval seconds] [--once] [--strategy name]')
+            sys.exit(1)
+        async with DexScreener() as dex:
+            monitor = PriceMonitor(dex, strategy, env, max(1.0, interval))
+            try:
+                if once:
+                    events = await monitor.tick()
+                else:
+                    await run_monitor(monitor, _emit)
+            except MarketError as e:
+                _log(f'❌ {e}')
+                sys.exit(1)
+            finally:
+                await monitor.close()
+        print(json.dumps({'tokens': monitor.snapshot(), 'events': events, 'requests': dex.requests}, indent=2))
+    
+    else:
+        _log(f'Unknown action: {action}. Run without args for help.')
+        sys.exit(1)
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
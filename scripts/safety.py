@@ -0,0 +1,554 @@
+#!/usr/bin/env python3
+"""
+Spirit Agent token safety checks (Base RPC, Basescan, DexScreener).
+Usage: python3 safety.py <action> [args...]
+
+SAFETY:
+  check <address> [address ...]        Ownership, holder, fee, verification and pair-age checks;
+        [--concurrency N] [--no-cache] one address prints the token-safety.sh object, several
+                                       print {"tokens": [...], "timing_ms": {...}, "rpc": {...}}
+  cache [clear]                        Cached facts per token (or wipe them)
+"""
+
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ENV_FILE = os.path.join(SCRIPT_DIR, '..', '.env')
+CACHE_FILE = os.path.join(SCRIPT_DIR, '..', '.safety_cache.json')
+
+DEFAULT_RPC = 'https://mainnet.base.org'
+BASESCAN_URL = 'https://api.basescan.org/api'
+ZERO_ADDRESS = '0x0000000000000000000000000000000000000000'
+DEAD_ADDRESS = '0x000000000000000000000000000000000000dEaD'
+ADDRESS_RE = re.compile(r'0x[0-9a-fA-F]{40}')
+
+class SafetyError(Exception):
+    """An RPC call failed as a whole — reported on stderr with exit 1."""
+
+def _log(msg):
+    print(msg, file=sys.stderr, flush=True)
+
+def load_env():
+    env = {}
+    if os.path.exists(ENV_FILE):
+        with open(ENV_FILE) as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, _, val = line.partition('=')
+                    env[key.strip()] = val.strip().strip('"').strip("'")
+    return env
+
+# --- ABI ---
+# Only what the checks need: zero/one-address calls in, uint/address/string
+# words out, and Multicall3's aggregate3((address,bool,bytes)[]). Selectors
+# are the first four bytes of keccak256 of each signature.
+SELECTORS = {
+    'name': '06fdde03',          # name()
+    'symbol': '95d89b41',        # symbol()
+    'decimals': '313ce567',      # decimals()
+    'totalSupply': '18160ddd',   # totalSupply()
+    'owner': '8da5cb5b',         # owner()
+    'balanceOf': '70a08231',     # balanceOf(address)
+    'totalFee': '1df4ccfc',      # totalFee()
+    'sellFee': '2b14ca56',       # sellFee()
+    'tax': '99c8d556',           # tax()
+    'aggregate3': '82ad56cb',    # aggregate3((address,bool,bytes)[])
+}
+
+def _word(n):
+    return n.to_bytes(32, 'big')
+
+def _calldata(fn, address=None):
+    data = bytes.fromhex(SELECTORS[fn])
+    if address is not None:
+        data += bytes(12) + bytes.fromhex(address[2:])
+    return data
+
+def _uint(data):
+    if len(data) < 32:
+        raise ValueError('short return data')
+    return int.from_bytes(data[:32], 'big')
+
+def _address(data):
+    return '0x' + _uint(data).to_bytes(32, 'big')[12:].hex()
+
+def _string(data):
+    """ABI string, or the bytes32 some older tokens return instead."""
+    if len(data) == 32:
+        return data.rstrip(b'\0').decode(errors='replace')
+    offset = _uint(data)
+    length = _uint(data[offset:])
+    return data[offset + 32:offset + 32 + length].decode(errors='replace')
+
+def encode_aggregate3(calls):
+    """aggregate3 calldata for [(target, calldata)], every call allowed to fail."""
+    heads, tails = [], b''
+    for target, data in calls:
+        heads.append(len(calls) * 32 + len(tails))
+        padded = data + bytes(-len(data) % 32)
+        tails += (bytes(12) + bytes.fromhex(target[2:]) + _word(1) + _word(0x60)
+                  + _word(len(data)) + padded)
+    return (bytes.fromhex(SELECTORS['aggregate3']) + _word(0x20) + _word(len(calls))
+            + b''.join(_word(h) for h in heads) + tails)
+
+def decode_aggregate3(data):
+    """[(success, return data)] from aggregate3's (bool,bytes)[] result."""
+    start = _uint(data) + 32
+    count = _uint(data[start - 32:])
+    results = []
+    for i in range(count):
+        item = start + _uint(data[start + i * 32:])
+        success = bool(_uint(data[item:]))
+        offset = item + _uint(data[item + 32:])
+        length = _uint(data[offset:])
+        results.append((success, data[offset + 32:offset + 32 + length]))
+    return results
+
+# --- RPC client ---
+# Every read of a check round goes out as one Multicall3 eth_call. When the
+# node has no Multicall3 (a bare anvil, say) the same reads fall back to one
+# JSON-RPC batch of plain eth_calls. Either way a round is one HTTP request.
+MULTICALL3 = '0xcA11bde05977b3631167028862bE2a173976CA11'
+
+class Rpc:
+    """Async JSON-RPC client with Multicall3 batching over one pooled connection."""
+    
+    def __init__(self, url):
+        self.url = url
+        self.multicall = True  # False once the node turns out not to have Multicall3
+        self.requests = 0
+        self.calls = 0
+        self._ids = 0
+        self._http = None
+    
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+    
+    async def _post(self, payload):
+        if self._http is None:
+            import httpx
+            self._http = httpx.AsyncClient(timeout=20, headers={'Content-Type': 'application/json'})
+        self.requests += 1
+        try:
+            resp = await self._http.post(self.url, content=json.dumps(payload))
+            resp.raise_for_status()
+            return resp.json()
+        except Exception as e:
+            raise SafetyError(f'RPC {self.url}: {e}') from e
+    
+    def _request(self, method, params):
+        self._ids += 1
+        return {'jsonrpc': '2.0', 'id': self._ids, 'method': method, 'params': params}
+    
+    async def eth_call(self, target, data):
+        resp = await self._post(self._request('eth_call', [{'to': target, 'data': '0x' + data.hex()}, 'latest']))
+        if 'error' in resp:
+            raise SafetyError(f'eth_call: {resp["error"].get("message")}')
+        return bytes.fromhex(resp['result'][2:])
+    
+    async def has_code(self, address):
+        resp = await self._post(self._request('eth_getCode', [address, 'latest']))
+        if 'error' in resp:
+            raise SafetyError(f'eth_getCode: {resp["error"].get("message")}')
+        return resp.get('result') not in (None, '0x', '0x0')
+    
+    async def codes(self, addresses):
+        """Whether each address has code, from one JSON-RPC batch; None where the lookup failed."""
+        if not addresses:
+            return []
+        requests = [self._request('eth_getCode', [address, 'latest']) for address in addresses]
+        resp = await self._post(requests)
+        if not isinstance(resp, list):
+            raise SafetyError(f'RPC batch: {(resp.get("error") or {}).get("message", "unexpected response")}')
+        by_id = {r.get('id'): r for r in resp}
+        out = []
+        for req in requests:
+            result = (by_id.get(req['id']) or {}).get('result')
+            out.append(None if result is None else result not in ('0x', '0x0'))
+        return out
+    
+    async def read(self, calls):
+        """Run [(target, calldata)] in one request. Returns return data per call, None where it failed."""
+        if not calls:
+            return []
+        self.calls += len(calls)
+        if self.multicall:
+            try:
+                results = decode_aggregate3(await self.eth_call(MULTICALL3, encode_aggregate3(calls)))
+            except (SafetyError, ValueError):
+                results = None
+            if results is not None and len(results) == len(calls):
+                # A call to an address without code "succeeds" with no data
+                return [data if ok and data else None for ok, data in results]
+            # Only a node without Multicall3 turns it off for the run; anything else
+            # (a timeout, a flaky node) falls back for this round alone. A failed
+            # eth_getCode raises, like any other failed request would.
+            if not await self.has_code(MULTICALL3):
+                self.multicall = False
+        requests = [self._request('eth_call', [{'to': target, 'data': '0x' + data.hex()}, 'latest'])
+                    for target, data in calls]
+        resp = await self._post(requests)
+        if not isinstance(resp, list):
+            raise SafetyError(f'RPC batch: {(resp.get("error") or {}).get("message", "unexpected response")}')
+        by_id = {r.get('id'): r for r in resp}
+        out = []
+        for req in requests:
+            result = (by_id.get(req['id']) or {}).get('result')
+            out.append(bytes.fromhex(result[2:]) if result and result != '0x' else None)
+        return out
+
+# --- Fact cache ---
+# Per token, in .safety_cache.json. Facts that cannot change once seen
+# (name, symbol, decimals, a renounced owner, a verified contract) are kept
+# forever; supply, balances, owner, fees and unverified status are re-read
+# after SAFETY_TTL seconds. A failed owner() read is never a fact: it may be
+# a flaky node or a token that is not deployed yet.
+SAFETY_TTL = 300
+
+def _load_cache():
+    try:
+        with open(CACHE_FILE) as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def _save_cache(cache):
+    tmp = f'{CACHE_FILE}.{os.getpid()}'
+    with open(tmp, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp, CACHE_FILE)
+
+# --- Checks ---
+SAFETY_CONCURRENCY = 4
+TOKENS_PER_MULTICALL = 25  # ~10 reads each
+FEE_FUNCTIONS = ('totalFee', 'sellFee', 'tax')  # the first one a token answers counts
+DECODERS = {
+    'name': _string,
+    'symbol': _string,
+    'decimals': _uint,
+    'totalSupply': _uint,
+    'owner': _address,
+    'dead_balance': _uint,
+    'zero_balance': _uint,
+    'owner_balance': _uint,
+    **{fn: _uint for fn in FEE_FUNCTIONS},
+}
+
+def _decode(key, data):
+    if data is None:
+        return None
+    try:
+        return DECODERS[key](data)
+    except (ValueError, IndexError):
+        return None
+
+def _reads(token, entry, fresh):
+    """[(key, target, calldata)] still needed for a token, given its cache entry."""
+    facts = entry['facts']
+    reads = [(fn, token, _calldata(fn)) for fn in ('name', 'symbol', 'decimals') if fn not in facts]
+    if facts.get('owner') != ZERO_ADDRESS and not fresh:
+        reads.append(('owner', token, _calldata('owner')))
+    if not fresh:
+        reads.append(('totalSupply', token, _calldata('totalSupply')))
+        reads.append(('dead_balance', token, _calldata('balanceOf', DEAD_ADDRESS)))
+        reads.append(('zero_balance', token, _calldata('balanceOf', ZERO_ADDRESS)))
+        reads.extend((fn, token, _calldata(fn)) for fn in FEE_FUNCTIONS)
+    return reads
+
+async def _read_onchain(rpc, tokens, cache, now, use_cache, concurrency):
+    """Fill each token's cache entry from at most two rounds of batched reads."""
+    sem = asyncio.Semaphore(max(1, concurrency))
+    
+    async def round_(reads_by_token):
+        # Several tokens share one multicall; the chunks run concurrently
+        items = [(t, key, target, data) for t, reads in reads_by_token.items() for key, target, data in reads]
+        per_call = TOKENS_PER_MULTICALL * 10
+        chunks = [items[i:i + per_call] for i in range(0, len(items), per_call)]
+        
+        async def run(chunk):
+            async with sem:
+                results = await rpc.read([(target, data) for _, _, target, data in chunk])
+            return [(t, key, _decode(key, data)) for (t, key, _, _), data in zip(chunk, results)]
+        return [row for rows in await asyncio.gather(*[run(c) for c in chunks]) for row in rows]
+    
+    fresh = {t: use_cache and now - cache[t]['state'].get('ts', 0) < SAFETY_TTL for t in tokens}
+    first = {t: _reads(t, cache[t], fresh[t]) for t in tokens}
+    read = {t: {} for t in tokens}
+    for t, key, value in await round_({t: r for t, r in first.items() if r}):
+        read[t][key] = value
+    
+    for t in tokens:
+        entry, values = cache[t], read[t]
+        for fn in ('name', 'symbol', 'decimals'):
+            # A failed read is retried next time rather than cached as a fact
+            if values.get(fn) is not None:
+                entry['facts'][fn] = values[fn]
+        if fresh[t]:
+            continue
+        if entry['facts'].get('owner') != ZERO_ADDRESS:
+            entry['facts'].pop('owner', None)  # caches from before only renounced was final
+        owner = entry['facts'].get('owner', values.get('owner'))
+        if owner == ZERO_ADDRESS:
+            entry['facts']['owner'] = owner  # renounced: final
+        fee = next((values[fn] for fn in FEE_FUNCTIONS if values.get(fn) is not None), None)
+        entry['state'] = {'ts': now, 'owner': owner, 'totalSupply': values.get('totalSupply'),
+                          'dead_balance': values.get('dead_balance'), 'zero_balance': values.get('zero_balance'),
+                          'fee': fee, 'owner_balance': None, 'has_code': None}
+    
+    # Round two: what the owner holds, for owned tokens with a supply, and
+    # whether tokens without an owner() answer have code to answer with
+    second = {t: [('owner_balance', t, _calldata('balanceOf', cache[t]['state']['owner']))]
+              for t in tokens if not fresh[t] and cache[t]['state'].get('owner') not in (None, ZERO_ADDRESS)
+              and cache[t]['state'].get('totalSupply')}
+    ownerless = [t for t in tokens if not fresh[t] and cache[t]['state'].get('owner') is None]
+    balances, codes = await asyncio.gather(round_(second), rpc.codes(ownerless))
+    for t, key, value in balances:
+        cache[t]['state'][key] = value
+    for t, code in zip(ownerless, codes):
+        cache[t]['state']['has_code'] = code
+
+async def _verified(http, token, entry, now, use_cache, sem):
+    """Basescan verification status; "yes" is kept forever, "no" for SAFETY_TTL."""
+    if entry['facts'].get('verified') == 'yes':
+        return 'yes'
+    cached = entry.get('verified')
+    if use_cache and cached and now - cached[0] < SAFETY_TTL:
+        return cached[1]
+    async with sem:
+        try:
+            resp = await http.get(BASESCAN_URL, params={'module': 'contract', 'action': 'getabi', 'address': token})
+            verified = 'yes' if resp.json().get('status') == '1' else 'no'
+        except Exception:
+            verified = 'no'
+    if verified == 'yes':
+        entry['facts']['verified'] = 'yes'
+    else:
+        entry['verified'] = [now, verified]
+    return verified
+
+def _jq_str(value):
+    """A JSON number the way `jq -r` prints it."""
+    return value if isinstance(value, str) else json.dumps(value)
+
+def _rate(token, entry, verified, pair, now_ms):
+    """token-safety.sh's score, rating, checks and warnings for one token."""
+    facts, state = entry['facts'], entry['state']
+    warnings = []
+    score = 100
+    
+    owner = state.get('owner')
+    supply = state.get('totalSupply') or 0
+    if owner is None and state.get('has_code') is not True:
+        # No code, or no way to tell: owner() failing says nothing about ownership
+        owner_status = 'unknown'
+        if state.get('has_code') is False:
+            warnings.append('🚨 No contract code at this address')
+        else:
+            warnings.append('⚠️ Could not read owner()')
+        score -= 20
+    elif owner is None:
+        owner_status, owner = 'no_owner_function', 'no_owner_function'
+    elif owner == ZERO_ADDRESS:
+        owner_status = 'renounced'
+    else:
+        owner_status = 'owned'
+        warnings.append(f'⚠️ Contract has owner: {owner}')
+        score -= 20
+    
+    if verified != 'yes':
+        warnings.append('⚠️ Contract not verified on Basescan')
+        score -= 15
+    
+    owner_balance = state.get('owner_balance')
+    if owner_status == 'owned' and supply and owner_balance:
+        owner_pct = round(owner_balance / supply * 100, 1)
+        if owner_pct > 10:
+            warnings.append(f'🚨 Owner holds {owner_pct}% of supply')
+            score -= 25
+    
+    fee = state.get('fee')
+    if fee:
+        warnings.append(f'⚠️ Token has fee/tax: {fee}')
+        score -= 10
+    
+    pair_age, liquidity = 'unknown', 'unknown'
+    if pair is not None and pair.get('pairCreatedAt') is not None:
+        age_hours = round((now_ms - pair['pairCreatedAt']) / 3600000, 1)
+        pair_age = f'{age_hours}h'
+        if age_hours < 1:
+            warnings.append('🚨 Pair less than 1 hour old!')
+            score -= 20
+        elif age_hours < 24:
+            warnings.append('⚠️ Pair less than 24 hours old')
+            score -= 10
+        liquidity = _jq_str((pair.get('liquidity') or {}).get('usd') or 0)
+    
+    if score >= 80:
+        rating = 'SAFE'
+    elif score >= 60:
+        rating = 'MODERATE'
+    elif score >= 40:
+        rating = 'RISKY'
+    else:
+        rating = 'DANGEROUS'
+    
+    return {
+        'address': token,
+        'name': facts.get('name') or 'UNKNOWN',
+        'symbol': facts.get('symbol') or '???',
+        'safety_score': max(score, 0),
+        'rating': rating,
+        'checks': {
+            'ownership': owner_status,
+            'owner_address': owner,
+            'verified': verified,
+            'pair_age': pair_age,
+            'liquidity_usd': liquidity,
+        },
+        'warnings': warnings,
+    }
+
+def _invalid(address):
+    """The record for something that is not a token address; nothing is read for it."""
+    return {
+        'address': address,
+        'error': 'Invalid address: expected 0x followed by 40 hex characters',
+        'safety_score': 0,
+        'rating': 'INVALID',
+        'checks': {},
+        'warnings': ['🚨 Not a valid token address'],
+    }
+
+async def _first_pairs(addresses):
+    """DexScreener's first pair per token (what token-safety.sh read), batched through market.py."""
+    from market import DexScreener, MarketError
+    try:
+        async with DexScreener() as dex:
+            pairs = await dex.tokens(addresses)
+    except MarketError as e:
+        _log(f'⚠️  DexScreener unavailable: {e}')
+        return {}
+    first = {}
+    for pair in pairs:
+        address = ((pair.get('baseToken') or {}).get('address') or '').lower()
+        first.setdefault(address, pair)
+    return first
+
+async def check_tokens(addresses, env, concurrency=SAFETY_CONCURRENCY, use_cache=True):
+    """Safety-check many tokens at once; returns (records in input order, timing in ms, rpc stats)."""
+    import httpx
+    started = time.perf_counter()
+    now = time.time()
+    cache = _load_cache()
+    # A malformed address would misalign the calldata of every read sharing its multicall
+    tokens = list(dict.fromkeys(a.lower() for a in addresses if ADDRESS_RE.fullmatch(a)))
+    for t in tokens:
+        entry = cache.setdefault(t, {})
+        entry.setdefault('facts', {})
+        entry.setdefault('state', {})
+    
+    timing = {}
+    
+    async def timed(name, work):
+        mark = time.perf_counter()
+        try:
+            return await work
+        finally:
+            timing[name] = round((time.perf_counter() - mark) * 1000, 2)
+    
+    rpc = Rpc(env.get('BASE_RPC') or DEFAULT_RPC)
+    sem = asyncio.Semaphore(max(1, concurrency))
+    verified, pairs = [], {}
+    try:
+        if tokens:
+            async with httpx.AsyncClient(timeout=15) as http:
+                verify = asyncio.gather(*[_verified(http, t, cache[t], now, use_cache, sem) for t in tokens])
+                _, verified, pairs = await asyncio.gather(
+                    timed('rpc', _read_onchain(rpc, tokens, cache, now, use_cache, concurrency)),
+                    timed('basescan', verify),
+                    timed('dexscreener', _first_pairs(tokens)))
+    finally:
+        await rpc.close()
+    try:
+        _save_cache(cache)
+    except OSError:
+        pass
+    
+    now_ms = int(time.time() * 1000)
+    rated = {t: _rate(t, cache[t], v, pairs.get(t), now_ms) for t, v in zip(tokens, verified)}
+    records = []
+    for address in dict.fromkeys(addresses):
+        record = dict(rated[address.lower()]) if address.lower() in rated else _invalid(address)
+        record['address'] = address
+        records.append(record)
+    timing['total'] = round((time.perf_counter() - started) * 1000, 2)
+    stats = {'requests': rpc.requests, 'calls': rpc.calls, 'multicall': rpc.multicall}
+    return records, timing, stats
+
+# --- Main ---
+
+async def main():
+    if len(sys.argv) < 2 or sys.argv[1] in ('-h', '--help', 'help'):
+        print(__doc__)
+        sys.exit(0)
+    
+    action, args = sys.argv[1], sys.argv[2:]
+    
+    if action == 'check':
+        env = load_env()
+        use_cache = '--no-cache' not in args
+        args = [a for a in args if a != '--no-cache']
+        concurrency = int(env.get('SAFETY_CONCURRENCY') or SAFETY_CONCURRENCY)
+        if '--concurrency' in args:
+            i = args.index('--concurrency')
+            try:
+                concurrency = int(args[i + 1])
+            except (IndexError, ValueError):
+                args = []
+            else:
+                del args[i:i + 2]
+        if not args:
+            _log('Usage: safety.py check <token_address> [token_address ...] [--concurrency N] [--no-cache]')
+            sys.exit(1)
+        _log(f'🛡️ Safety check: {" ".join(args) if len(args) == 1 else f"{len(args)} tokens"}')
+        try:
+            records, timing, rpc = await check_tokens(args, env, concurrency, use_cache)
+        except SafetyError as e:
+            _log(f'❌ {e}')
+            sys.exit(1)
+        _log(f'⏱️ {rpc["requests"]} RPC request(s) for {rpc["calls"]} read(s) · '
+             + ' · '.join(f'{stage} {ms}ms' for stage, ms in timing.items()))
+        for record in records:
+            if 'error' in record:
+                _log(f'❌ {record["address"]}: {record["error"]}')
+        if len(args) == 1:
+            print(json.dumps(records[0], indent=2, ensure_ascii=False))
+        else:
+            print(json.dumps({'tokens': records, 'timing_ms': timing, 'rpc': rpc}, indent=2, ensure_ascii=False))
+        if all('error' in record for record in records):
+            sys.exit(1)
+    
+    elif action == 'cache':
+        if args[:1] == ['clear']:
+            if os.path.exists(CACHE_FILE):
+                os.unlink(CACHE_FILE)
+            print(json.dumps({'ok': True, 'cleared': True}))
+        else:
+            print(json.dumps(_load_cache(), indent=2, ensure_ascii=False))
+    
+    else:
+        _log(f'Unknown action: {action}. Run without args for help.')
+        sys.exit(1)
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
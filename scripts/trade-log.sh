@@ -26,7 +26,7 @@ fi
 echo "📝 Logging trade to $TRADES_FILE..."
 
 # Create trade log entry
-TRADE_ENTRY=$(jq -n \
+TRADE_ENTRY=$(jq -nc \
     --arg ts "$(date -u +%Y-%m-%dT%H:%M:%SZ)" \
     --arg action "$ACTION" \
     --arg token "$TOKEN_ADDRESS" \
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Spirit Agent local trade analytics over data/trades.jsonl.
+Usage: python3 trades.py <action> [args...]
+
+TRADES:
+  pnl [--no-prices] [--reconcile]      Realized/unrealized PnL, cost basis per open position and
+                                       win rate from the local index; unrealized PnL prices open
+                                       positions in one batched DexScreener call. Compared with
+                                       the platform portfolio at most every PNL_RECONCILE_INTERVAL
+                                       seconds (--reconcile forces it)
+  stats                                Per-token trade counts, win rate and realized PnL
+  reindex                              Rebuild the index from the start of trades.jsonl
+"""
+
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ENV_FILE = os.path.join(SCRIPT_DIR, '..', '.env')
+TRADES_FILE = os.path.join(SCRIPT_DIR, '..', 'data', 'trades.jsonl')
+INDEX_FILE = os.path.join(SCRIPT_DIR, '..', '.trades_index.json')
+
+def _log(msg):
+    print(msg, file=sys.stderr, flush=True)
+
+def load_env():
+    env = {}
+    if os.path.exists(ENV_FILE):
+        with open(ENV_FILE) as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, _, val = line.partition('=')
+                    env[key.strip()] = val.strip().strip('"').strip("'")
+    return env
+
+def _num(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+# --- Index ---
+# .trades_index.json holds running per-token aggregates (amount held, cost
+# basis at average cost, realized PnL, wins/losses) plus the byte offset and
+# inode of trades.jsonl they cover. Each read only parses the records appended
+# since, so the cost of a query tracks the number of tokens, not of trades.
+# A truncated or replaced trades file is re-read from the start.
+INDEX_VERSION = 2  # 2: multi-line records are no longer skipped
+_SPACE = re.compile(r'\s*')
+
+def _empty_index():
+    return {'version': INDEX_VERSION, 'offset': 0, 'inode': None, 'trades': 0, 'skipped': 0,
+            'tokens': {}, 'platform': None, 'agent_id': None, 'reconcile_tried': None}
+
+def _reset_index(index):
+    """An empty index that keeps what was learned from the platform."""
+    return {**_empty_index(), **{k: index.get(k) for k in ('platform', 'agent_id', 'reconcile_tried')}}
+
+def _load_index():
+    try:
+        with open(INDEX_FILE) as f:
+            index = json.load(f)
+    except Exception:
+        return _empty_index()
+    return index if index.get('version') == INDEX_VERSION else _empty_index()
+
+def _save_index(index):
+    tmp = f'{INDEX_FILE}.{os.getpid()}'
+    with open(tmp, 'w') as f:
+        json.dump(index, f, separators=(',', ':'))
+    os.replace(tmp, INDEX_FILE)
+
+def _apply(index, trade):
+    """Fold one trade-log.sh record into the per-token aggregates."""
+    address = (trade.get('token') or '').lower()
+    action = trade.get('action')
+    if not address or action not in ('buy', 'sell'):
+        index['skipped'] += 1
+        return
+    t = index['tokens'].get(address)
+    if t is None:
+        t = index['tokens'][address] = {'symbol': trade.get('symbol'), 'amount': 0.0, 'cost': 0.0, 'realized': 0.0,
+                                        'invested': 0.0, 'returned': 0.0, 'buys': 0, 'sells': 0,
+                                        'wins': 0, 'losses': 0, 'first_ts': trade.get('ts'), 'last_ts': None}
+    t['symbol'] = trade.get('symbol') or t['symbol']
+    t['last_ts'] = trade.get('ts') or t['last_ts']
+    if action == 'buy':
+        usd = _num(trade.get('amountInUSD'))
+        t['amount'] += _num(trade.get('amountOut'))
+        t['cost'] += usd
+        t['invested'] += usd
+        t['buys'] += 1
+    else:
+        sold = _num(trade.get('amountIn'))
+        proceeds = _num(trade.get('amountOutUSD'))
+        # Average-cost basis; selling more than the log shows bought costs nothing
+        held = t['amount']
+        cost = t['cost'] * min(sold, held) / held if held > 0 else 0.0
+        pnl = proceeds - cost
+        t['amount'] = max(held - sold, 0.0)
+        t['cost'] = t['cost'] - cost if t['amount'] > 0 else 0.0
+        t['realized'] += pnl
+        t['returned'] += proceeds
+        t['sells'] += 1
+        if pnl > 0:
+            t['wins'] += 1
+        elif pnl < 0:
+            t['losses'] += 1
+    index['trades'] += 1
+
+def _ingest(index, data):
+    """Apply every complete record in data; returns how many bytes they span.
+    
+    Records are read as a stream of JSON values, so one-line records and the
+    pretty-printed ones older trade-log.sh versions appended both count. A
+    record still being written is left for the next read; anything that does
+    not parse is skipped up to the next record.
+    """
+    # surrogateescape keeps one character per undecodable byte, so offsets map back exactly
+    text = data.decode('utf-8', 'surrogateescape')
+    decoder = json.JSONDecoder()
+    pos = done = 0
+    while True:
+        pos = _SPACE.match(text, pos).end()
+        if pos == len(text):
+            done = pos
+            break
+        try:
+            trade, pos = decoder.raw_decode(text, pos)
+        except ValueError:
+            # Records start with '{' at the start of a line, one-line or pretty-printed
+            following = text.find('\n{', pos)
+            if following == -1:
+                break  # most likely a record still being written; retried next read
+            index['skipped'] += 1
+            pos = done = following + 1
+            continue
+        done = pos
+        if isinstance(trade, dict):
+            _apply(index, trade)
+        else:
+            index['skipped'] += 1
+    return len(text[:done].encode('utf-8', 'surrogateescape'))
+
+def refresh_index(index=None):
+    """Bring the index up to date with trades.jsonl. Returns (index, number of new trades)."""
+    index = _load_index() if index is None else index
+    try:
+        st = os.stat(TRADES_FILE)
+    except FileNotFoundError:
+        if index['offset']:
+            index = _reset_index(index)
+            _save_index(index)
+        return index, 0
+    if st.st_ino != index['inode'] or st.st_size < index['offset']:
+        index = _reset_index(index)
+        index['inode'] = st.st_ino
+    if st.st_size == index['offset']:
+        return index, 0
+    with open(TRADES_FILE, 'rb') as f:
+        f.seek(index['offset'])
+        data = f.read(st.st_size - index['offset'])
+    before = index['trades']
+    index['offset'] += _ingest(index, data)
+    try:
+        _save_index(index)
+    except OSError:
+        pass
+    return index, index['trades'] - before
+
+def open_positions():
+    """{lowercased address: (symbol, average entry price in USD)} for tokens the log still holds."""
+    index, _ = refresh_index()
+    return {a: (t['symbol'], t['cost'] / t['amount'])
+            for a, t in index['tokens'].items() if t['amount'] > 0 and t['cost'] > 0}
+
+# --- PnL ---
+PNL_RECONCILE_INTERVAL = 3600
+RECONCILE_TOLERANCE = 0.01  # relative difference in a position amount worth reporting
+
+async def _prices(addresses):
+    """{lowercased address: USD price} from one batched DexScreener lookup."""
+    from market import DexScreener, MarketError, _best_pairs
+    if not addresses:
+        return {}
+    try:
+        async with DexScreener() as dex:
+            _, best = _best_pairs(await dex.tokens(addresses))
+    except MarketError as e:
+        _log(f'⚠️  Prices unavailable: {e}')
+        return {}
+    return {a: _num(p.get('priceUsd')) for a, p in best.items() if _num(p.get('priceUsd')) > 0}
+
+async def _reconcile(index, env):
+    """Fetch the platform's PnL and positions into index['platform']."""
+    import httpx
+    headers = {'Authorization': f'Bearer {env["PLATFORM_API_KEY"]}'}
+    async with httpx.AsyncClient(base_url=env['PLATFORM_API_URL'] + '/api/v1', timeout=15, headers=headers) as http:
+        if not index.get('agent_id'):
+            resp = await http.get('/agents/me')
+            resp.raise_for_status()
+            index['agent_id'] = resp.json()['data']['agent']['id']
+        resp = await http.get(f'/agents/{index["agent_id"]}/portfolio')
+        resp.raise_for_status()
+        data = resp.json().get('data') or {}
+    index['platform'] = {
+        'checked_at': time.time(),
+        'realized_pnl': data.get('realized_pnl_usd'),
+        'unrealized_pnl': data.get('unrealized_pnl_usd'),
+        'total_pnl': data.get('total_pnl_usd'),
+        'trades_count': data.get('total_trades'),
+        'pnl_updated_at': data.get('pnl_updated_at'),
+        'positions': [{
+            'token': p.get('token_address'),
+            'symbol': p.get('symbol'),
+            'amount': p.get('amount'),
+            'cost_basis': p.get('cost_basis_usd'),
+            'realized_pnl': p.get('realized_pnl_usd'),
+        } for p in data.get('positions') or []],
+    }
+
+def _drift(index):
+    """Where the local index and the last platform snapshot disagree."""
+    platform = index.get('platform')
+    if not platform:
+        return None
+    local = {a: t['amount'] for a, t in index['tokens'].items() if t['amount'] > 0}
+    remote = {(p['token'] or '').lower(): _num(p['amount']) for p in platform['positions'] if _num(p['amount']) > 0}
+    positions = []
+    for address in sorted(local.keys() | remote.keys()):
+        mine, theirs = local.get(address, 0.0), remote.get(address, 0.0)
+        if abs(mine - theirs) > RECONCILE_TOLERANCE * max(mine, theirs):
+            positions.append({'token': address, 'local_amount': mine, 'platform_amount': theirs})
+    return {
+        'trades': index['trades'] - int(_num(platform['trades_count'])) if platform['trades_count'] is not None else None,
+        'positions': positions,
+    }
+
+def _iso(ts):
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(ts))
+
+def _win_rate(wins, losses):
+    return round(wins / (wins + losses), 3) if wins + losses else None
+
+async def pnl(env, prices=True, reconcile=False):
+    """pnl.sh's JSON, computed from the local index; falls back to the platform's figures without a local log."""
+    index, _ = refresh_index()
+    # Timed from the last attempt, so an unreachable platform is not retried on every query
+    stale = time.time() - (index.get('reconcile_tried') or 0) > PNL_RECONCILE_INTERVAL
+    if (reconcile or stale) and env.get('PLATFORM_API_URL') and env.get('PLATFORM_API_KEY'):
+        index['reconcile_tried'] = time.time()
+        try:
+            await _reconcile(index, env)
+            _save_index(index)
+        except Exception as e:
+            _log(f'⚠️  Platform reconciliation failed: {e}')
+            _save_index(index)
+    
+    held = {a: t for a, t in index['tokens'].items() if t['amount'] > 0}
+    price = await _prices(list(held)) if prices else {}
+    platform = index.get('platform')
+    if not index['trades'] and platform:
+        return {**{k: v for k, v in platform.items() if k != 'checked_at'}, 'source': 'platform',
+                'reconciled_at': _iso(platform['checked_at'])}
+    
+    realized = sum(t['realized'] for t in index['tokens'].values())
+    unrealized = 0.0
+    positions = []
+    for address, t in held.items():
+        value = t['amount'] * price[address] if address in price else None
+        if value is not None:
+            unrealized += value - t['cost']
+        positions.append({
+            'token': address,
+            'symbol': t['symbol'],
+            'amount': t['amount'],
+            'cost_basis': round(t['cost'], 2),
+            'entry_price': t['cost'] / t['amount'] if t['cost'] else None,
+            'price_usd': price.get(address),
+            'value_usd': round(value, 2) if value is not None else None,
+            'unrealized_pnl': round(value - t['cost'], 2) if value is not None else None,
+            'realized_pnl': round(t['realized'], 2),
+        })
+    wins = sum(t['wins'] for t in index['tokens'].values())
+    losses = sum(t['losses'] for t in index['tokens'].values())
+    return {
+        'realized_pnl': round(realized, 2),
+        'unrealized_pnl': round(unrealized, 2),
+        'total_pnl': round(realized + unrealized, 2),
+        'trades_count': index['trades'],
+        'win_rate': _win_rate(wins, losses),
+        'wins': wins,
+        'losses': losses,
+        'pnl_updated_at': _iso(time.time()),
+        'positions': positions,
+        'source': 'local',
+        'reconciled_at': _iso(platform['checked_at']) if platform else None,
+        'drift': _drift(index),
+    }
+
+def stats():
+    index, _ = refresh_index()
+    tokens = sorted(index['tokens'].items(), key=lambda kv: kv[1]['realized'], reverse=True)
+    return {
+        'trades': index['trades'],
+        'skipped': index['skipped'],
+        'tokens': [{
+            'token': address,
+            'symbol': t['symbol'],
+            'buys': t['buys'],
+            'sells': t['sells'],
+            'win_rate': _win_rate(t['wins'], t['losses']),
+            'invested_usd': round(t['invested'], 2),
+            'returned_usd': round(t['returned'], 2),
+            'realized_pnl': round(t['realized'], 2),
+            'open': t['amount'] > 0,
+            'first_ts': t['first_ts'],
+            'last_ts': t['last_ts'],
+        } for address, t in tokens],
+        'index_bytes': os.path.getsize(INDEX_FILE) if os.path.exists(INDEX_FILE) else 0,
+    }
+
+# --- Main ---
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] in ('-h', '--help', 'help'):
+        print(__doc__)
+        sys.exit(0)
+    
+    action, args = sys.argv[1], sys.argv[2:]
+    
+    if action == 'pnl':
+        started = time.perf_counter()
+        result = asyncio.run(pnl(load_env(), prices='--no-prices' not in args, reconcile='--reconcile' in args))
+        _log(f'⏱️ pnl {round((time.perf_counter() - started) * 1000, 1)}ms ({result["source"]})')
+        print(json.dumps(result, indent=2))
+    
+    elif action == 'stats':
+        print(json.dumps(stats(), indent=2))
+    
+    elif action == 'reindex':
+        index, count = refresh_index(_reset_index(_load_index()))
+        print(json.dumps({'ok': True, 'trades': count, 'tokens': len(index['tokens'])}))
+    
+    else:
+        _log(f'Unknown action: {action}. Run without args for help.')
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
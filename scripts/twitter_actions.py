@@ -0,0 +1,1072 @@
+"""
+twitter.py's actions: the @action registry and what runs behind it —
+polling, streaming, threads and media, and the platform report outbox.
+"""
+
+import json
+import os
+import sys
+import time
+
+from twitter_client import COOKIES_FILE, RATE_DB, RateBuckets, _net_stats, _rate_limits, platform_http
+from twitter_core import (SCRIPT_DIR, Account, ActionError, _account, _path, _pop_flag, _tracer,
+                          list_accounts, load_env, trace_stats)
+from twitter_stores import (ENGAGEMENT_SNAPSHOT_COUNT, ENGAGEMENT_TOP, ENGAGEMENT_WINDOWS, _archive, _cache,
+                            _engagement, _is_duplicate, _log_reply, _record_action, _resolve_user_id, _similar,
+                            serialize_tweet, serialize_user)
+
+# --- Incremental polling ---
+# `poll` keeps a high-water tweet id per feed and emits only newer items, or
+# {"unchanged": true} when nothing new arrived since the last poll. The same
+# cursor file holds `--stream` crawl checkpoints under "stream:" keys.
+POLL_CURSORS_FILE = os.path.join(SCRIPT_DIR, '..', '.poll_cursors.json')
+POLL_DEFAULT_FEEDS = ['timeline', 'notifications']
+
+async def _fetch_feed(client, feed, count, since=None):
+    """Fetch a feed ('timeline', 'notifications' or 'search:<query>'), keeping only ids newer than since."""
+    if feed == 'timeline':
+        items = (await client.get_timeline(count=count))[:count]
+    elif feed == 'notifications':
+        # Notifications wrap the tweet they are about; follows and the like carry none.
+        # Several notifications (likes, retweets) can point at the same tweet.
+        items = list({n.tweet.id: n.tweet for n in await client.get_notifications('All', count=count)
+                      if getattr(n, 'tweet', None) is not None}.values())
+    elif feed.startswith('search:'):
+        query = feed[len('search:'):]
+        if since:
+            # Let search do the filtering server-side
+            query = f'{query} since_id:{since}'
+        items = await client.search_tweet(query, 'Latest', count=count)
+    else:
+        raise ActionError(f"Unknown feed: {feed}. Use timeline, notifications or search:<query>")
+    if not since:
+        return list(items)
+    since = int(since)
+    return [t for t in items if int(t.id) > since]
+
+def _load_cursors():
+    try:
+        with open(_path(POLL_CURSORS_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_cursors(cursors):
+    path = _path(POLL_CURSORS_FILE)
+    tmp = f'{path}.{os.getpid()}'
+    with open(tmp, 'w') as f:
+        json.dump(cursors, f)
+    os.replace(tmp, path)
+
+def _save_cursors(updates):
+    # Re-read before writing so concurrent polls of other feeds aren't lost
+    cursors = _load_cursors()
+    cursors.update(updates)
+    _write_cursors(cursors)
+
+def _reset_cursors(feeds):
+    path = _path(POLL_CURSORS_FILE)
+    if not feeds:
+        if os.path.exists(path):
+            os.unlink(path)
+        return
+    cursors = _load_cursors()
+    for feed in feeds:
+        cursors.pop(feed, None)
+    _write_cursors(cursors)
+
+async def poll_feeds(client, feeds, count):
+    """Fetch feeds concurrently and return only what is new since each feed's cursor."""
+    import asyncio
+    cursors = _load_cursors()
+    fetched = await asyncio.gather(*[_fetch_feed(client, feed, count, cursors.get(feed)) for feed in feeds],
+                                   return_exceptions=True)
+    out, updates = {}, {}
+    for feed, items in zip(feeds, fetched):
+        if isinstance(items, ActionError):
+            raise items
+        if isinstance(items, Exception):
+            out[feed] = {'error': str(items)}
+        elif not items:
+            out[feed] = {'unchanged': True, 'since': cursors.get(feed)}
+        else:
+            # One malformed item fails its feed, not the whole poll; the cursor stays put
+            try:
+                tweets = [serialize_tweet(t, source=feed.partition(':')[0]) for t in items]
+                cursor = str(max(int(t['id']) for t in tweets))
+            except Exception as e:
+                _tracer.error('poll', e)
+                out[feed] = {'error': str(e)}
+                continue
+            updates[feed] = cursor
+            out[feed] = {'new': tweets, 'since': cursors.get(feed), 'cursor': cursor}
+    if updates:
+        _save_cursors(updates)
+    return out
+
+# --- Streaming pagination ---
+# `followers|following|likers|retweeters|search ... --stream` walks twikit's
+# Result cursors lazily and prints one NDJSON record at a time, so memory stays
+# flat however many pages we crawl. The next page is fetched while the current
+# one is written, under a pages-per-minute budget. After each fully written
+# page the next cursor is checkpointed so `--resume` continues where an
+# interrupted crawl stopped.
+STREAM_ACTIONS = {'followers', 'following', 'likers', 'retweeters', 'search'}
+STREAM_PAGE_SIZE = 100
+STREAM_SEARCH_PAGE_SIZE = 20  # search caps pages at 20 tweets
+STREAM_PAGES_PER_MIN = 30
+
+async def _fetch_page(client, action, target, count, cursor):
+    if action == 'followers':
+        return await client.get_user_followers(await _resolve_user_id(client, target), count=count, cursor=cursor)
+    if action == 'following':
+        return await client.get_user_following(await _resolve_user_id(client, target), count=count, cursor=cursor)
+    if action == 'likers':
+        return await client.get_favoriters(target, count=count, cursor=cursor)
+    if action == 'retweeters':
+        return await client.get_retweeters(target, count=count, cursor=cursor)
+    return await client.search_tweet(target, 'Latest', count=count, cursor=cursor)
+
+# twikit method behind each streamable action, for rate-limit accounting of page.next()
+STREAM_METHODS = {
+    'followers': 'get_user_followers',
+    'following': 'get_user_following',
+    'likers': 'get_favoriters',
+    'retweeters': 'get_retweeters',
+    'search': 'search_tweet',
+}
+
+async def _next_page(client, action, page, delay):
+    import asyncio
+    if delay > 0:
+        await asyncio.sleep(delay)
+    return await client.call(STREAM_METHODS[action], page.next)
+
+async def iter_pages(client, action, target, page_size, cursor=None, pages_per_min=STREAM_PAGES_PER_MIN):
+    """Async generator of (items, page_cursor, next_cursor), prefetching one page ahead."""
+    import asyncio
+    interval = 60 / pages_per_min if pages_per_min else 0
+    fetched_at = time.monotonic()
+    page = await _fetch_page(client, action, target, page_size, cursor)
+    nxt = None
+    try:
+        while True:
+            items = list(page)
+            next_cursor = getattr(page, 'next_cursor', None)
+            if items and next_cursor:
+                delay = fetched_at + interval - time.monotonic()
+                nxt = asyncio.ensure_future(_next_page(client, action, page, delay))
+            yield items, cursor, next_cursor
+            if nxt is None:
+                return
+            page, nxt = await nxt, None
+            fetched_at = time.monotonic()
+            cursor = next_cursor
+    finally:
+        if nxt is not None:
+            nxt.cancel()
+
+async def _run_stream(client, args, emit, drain=None):
+    """Stream `<action> <target> [count] [--resume] [--pages-per-min N]` as records.
+    
+    Returns (exit_status, summary).
+    """
+    try:
+        action, args = args[0], args[1:]
+        resume = '--resume' in args
+        args = [a for a in args if a != '--resume']
+        pages_per_min, args = _pop_flag(args, '--pages-per-min')
+        pages_per_min = float(pages_per_min) if pages_per_min else STREAM_PAGES_PER_MIN
+        if action not in STREAM_ACTIONS or not args:
+            raise ActionError(f'Usage: {action} <target> [count] --stream [--resume] [--pages-per-min N]')
+        if action == 'search':
+            if len(args) > 1 and args[-1].isdigit():
+                limit, target = int(args[-1]), ' '.join(args[:-1])
+            else:
+                limit, target = 20, ' '.join(args)
+            serialize, page_size = serialize_tweet, STREAM_SEARCH_PAGE_SIZE
+        else:
+            target = args[0]
+            limit = int(args[1]) if len(args) > 1 else 20
+            serialize, page_size = serialize_user, STREAM_PAGE_SIZE
+    except (ActionError, ValueError, IndexError) as e:
+        return 1, {'error': str(e) or 'Usage: <action> <target> [count] --stream'}
+    
+    key = f'stream:{action}:{target}'
+    cursor = _load_cursors().get(key) if resume else None
+    records = pages = 0
+    checkpoint = cursor
+    try:
+        pager = iter_pages(client, action, target, min(page_size, limit), cursor, pages_per_min)
+        try:
+            async for items, page_cursor, next_cursor in pager:
+                pages += 1
+                batch = items[:limit - records]
+                for item in batch:
+                    emit(serialize(item))
+                records += len(batch)
+                _cache.save()
+                _archive.save()
+                if drain is not None:
+                    await drain()
+                # Only move the checkpoint past pages we emitted in full
+                checkpoint = next_cursor if len(batch) == len(items) else page_cursor
+                _save_cursors({key: checkpoint})
+                if records >= limit:
+                    break
+        finally:
+            await pager.aclose()
+    except Exception as e:
+        return 1, {'error': str(e), 'records': records, 'pages': pages, 'cursor': checkpoint}
+    return 0, {'ok': True, 'records': records, 'pages': pages, 'cursor': checkpoint}
+
+# --- Threads & media ---
+# Every attachment of a thread starts uploading concurrently before the first
+# part is posted; each part then waits only for its own media and its parent's
+# id. Posted ids are checkpointed per thread (keyed by its content), so running
+# the same thread again after a failure continues from the last posted part
+# instead of double-posting the head of the thread.
+
+THREAD_PROGRESS_FILE = os.path.join(SCRIPT_DIR, '..', '.thread_progress.json')
+THREAD_PROGRESS_TTL = 86400
+MEDIA_UPLOAD_CONCURRENCY = 4
+MEDIA_PER_TWEET = 4
+
+def _parse_thread_parts(text):
+    """Split `a | b [media: x.png]` into [{'text', 'media'}] parts."""
+    import re
+    parts = []
+    for raw in text.split('|'):
+        media = []
+        for tag in re.findall(r'\[media:([^\]]*)\]', raw):
+            media.extend(p.strip() for p in tag.split(',') if p.strip())
+        body = re.sub(r'\[media:[^\]]*\]', '', raw).strip()
+        if body or media:
+            parts.append({'text': body, 'media': media})
+    return parts
+
+def _check_media(paths):
+    if len(paths) > MEDIA_PER_TWEET:
+        raise ActionError(f'At most {MEDIA_PER_TWEET} media per tweet')
+    for path in paths:
+        if not os.path.exists(path):
+            raise ActionError(f'File not found: {path}')
+
+async def _upload_media(client, path, sem):
+    """Upload one file; videos/GIFs wait for server-side processing before use."""
+    import mimetypes
+    mime = mimetypes.guess_type(path)[0] or ''
+    if mime == 'image/gif':
+        category = 'tweet_gif'
+    elif mime.startswith('video/'):
+        category = 'tweet_video'
+    else:
+        category = None
+    async with sem:
+        return await client.upload_media(path, wait_for_completion=category is not None,
+                                         media_type=mime or None, media_category=category)
+
+def _start_uploads(client, paths):
+    """Kick off uploads for all paths at once; returns {path: task}."""
+    import asyncio
+    sem = asyncio.Semaphore(MEDIA_UPLOAD_CONCURRENCY)
+    return {path: asyncio.ensure_future(_upload_media(client, path, sem)) for path in dict.fromkeys(paths)}
+
+def _cancel_uploads(uploads):
+    for task in uploads.values():
+        if task.done():
+            if not task.cancelled():
+                task.exception()
+        else:
+            task.cancel()
+
+def _thread_key(parts):
+    import hashlib
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+def _load_thread_progress():
+    try:
+        with open(_path(THREAD_PROGRESS_FILE)) as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def _save_thread_progress(key, tweet_ids):
+    """Checkpoint posted ids for a thread (None clears it); stale entries expire."""
+    now = time.time()
+    progress = {k: v for k, v in _load_thread_progress().items()
+                if now - v.get('ts', 0) < THREAD_PROGRESS_TTL}
+    if tweet_ids is None:
+        progress.pop(key, None)
+    else:
+        progress[key] = {'ids': tweet_ids, 'ts': now}
+    path = _path(THREAD_PROGRESS_FILE)
+    tmp = f'{path}.{os.getpid()}'
+    with open(tmp, 'w') as f:
+        json.dump(progress, f)
+    os.replace(tmp, path)
+
+async def post_thread(client, parts):
+    """Post parts as a reply chain; returns (tweet_ids, parts already posted by an earlier run)."""
+    for part in parts:
+        _check_media(part['media'])
+    key = _thread_key(parts)
+    tweet_ids = list(_load_thread_progress().get(key, {}).get('ids', []))[:len(parts)]
+    resumed = len(tweet_ids)
+    pending = parts[resumed:]
+    uploads = _start_uploads(client, [path for part in pending for path in part['media']])
+    try:
+        for part in pending:
+            media_ids = [await uploads[path] for path in part['media']] or None
+            tweet = await client.create_tweet(part['text'], media_ids=media_ids,
+                                              reply_to=tweet_ids[-1] if tweet_ids else None)
+            _archive.add_own(tweet.id, part['text'], reply_to=tweet_ids[-1] if tweet_ids else None)
+            tweet_ids.append(tweet.id)
+            _save_thread_progress(key, tweet_ids)
+    except Exception as e:
+        _cancel_uploads(uploads)
+        raise ActionError(f'Thread stopped after {len(tweet_ids)}/{len(parts)} parts: {e} '
+                          '— run the same thread again to resume',
+                          tweet_ids=tweet_ids, resumable=True) from e
+    _save_thread_progress(key, None)
+    return tweet_ids, resumed
+
+# --- Platform report outbox ---
+# Reports are queued in a local SQLite outbox so the user-facing action returns
+# as soon as the tweet action succeeds. A flusher (the daemon's background task,
+# or a detached `twitter.py flush` process) resolves parent tweet metadata for
+# the whole pending batch in one lookup and POSTs the reports over a single
+# pooled keep-alive connection, retrying failures with exponential backoff.
+OUTBOX_DB = os.path.join(SCRIPT_DIR, '..', '.outbox.db')
+OUTBOX_MAX_ENTRIES = 1000
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_BATCH = 50
+OUTBOX_BACKOFF = 5  # seconds, doubled per failed attempt
+OUTBOX_BACKOFF_MAX = 3600
+OUTBOX_FLUSH_INTERVAL = 5  # daemon flush cadence when idle
+
+_outbox_wakeup = None  # asyncio.Event, created by the daemon's _outbox_loop
+
+def _outbox_db():
+    state = _account().state
+    if 'outbox' not in state:
+        import sqlite3
+        conn = sqlite3.connect(_path(OUTBOX_DB), timeout=10, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS outbox (id INTEGER PRIMARY KEY, report TEXT NOT NULL, '
+                     'attempts INTEGER NOT NULL DEFAULT 0, next_try REAL NOT NULL)')
+        conn.execute('CREATE INDEX IF NOT EXISTS outbox_next_try ON outbox (next_try)')
+        state['outbox'] = conn
+    return state['outbox']
+
+def _build_report(action, result, args):
+    """Build the social-action report; parent tweet fields are filled in at flush time."""
+    from datetime import datetime, timezone
+    
+    ref_tweet_id = None
+    if action in ('like', 'retweet', 'bookmark'):
+        ref_tweet_id = args[0] if args else None
+    elif action in ('reply', 'quote'):
+        ref_tweet_id = result.get('reply_to', result.get('quoted'))
+    
+    ext_id = (result.get('tweet_id') or result.get('liked') or result.get('unliked') or
+              result.get('retweeted') or result.get('unretweeted') or result.get('followed') or
+              result.get('unfollowed') or result.get('bookmarked') or result.get('unbookmarked') or
+              result.get('deleted') or '')
+    
+    if action in ('follow', 'unfollow'):
+        ext_url = f"https://x.com/intent/user?user_id={ext_id}" if ext_id else None
+    elif ext_id:
+        ext_url = f"https://x.com/i/status/{ext_id}"
+    else:
+        ext_url = None
+    
+    return {
+        'platform': 'x',
+        'action_type': action,
+        'content': result.get('text', ''),
+        'external_id': ext_id,
+        'external_url': ext_url,
+        'parent_external_id': result.get('reply_to', result.get('quoted', '')),
+        'parent_external_url': None,
+        'parent_content': None,
+        'parent_author': None,
+        'parent_author_name': None,
+        'parent_author_avatar': None,
+        'posted_at': datetime.now(timezone.utc).isoformat(),
+        '_ref_tweet_id': ref_tweet_id,
+    }
+
+def _attach_parent(report, parent):
+    """Fill parent tweet metadata into a queued report."""
+    ref = report.pop('_ref_tweet_id', None)
+    if parent is not None and ref:
+        report['parent_content'] = parent['text']
+        report['parent_author'] = parent['user']
+        report['parent_author_name'] = parent['user_name']
+        report['parent_author_avatar'] = parent['user_avatar']
+    parent_ext_id = report['parent_external_id']
+    parent_author = report['parent_author']
+    report['parent_external_url'] = (f"https://x.com/{parent_author}/status/{parent_ext_id}" if parent_author and parent_ext_id
+                                     else f"https://x.com/i/status/{parent_ext_id}" if parent_ext_id else None)
+    return report
+
+def report_to_platform(env, action, result, args):
+    """Queue a social action report for the platform. Never blocks on the network."""
+    if not env.get('PLATFORM_API_URL', '') or not env.get('PLATFORM_API_KEY', ''):
+        return
+    import sqlite3
+    try:
+        conn = _outbox_db()
+        conn.execute('INSERT INTO outbox (report, next_try) VALUES (?, ?)',
+                     (json.dumps(_build_report(action, result, args)), time.time()))
+        # Cap queue size — drop the oldest reports first
+        conn.execute('DELETE FROM outbox WHERE id <= (SELECT MAX(id) FROM outbox) - ?', (OUTBOX_MAX_ENTRIES,))
+    except sqlite3.Error as e:
+        _tracer.error('report', e)
+        return
+    _tracer.count('reports_queued')
+    if _outbox_wakeup is not None:
+        _outbox_wakeup.set()
+
+async def _post_reports(env, reports):
+    """POST reports over the pooled platform connection. Returns an HTTP status (None = network error) per report."""
+    import httpx
+    http = platform_http(env)
+    # The pool is shared by every account; the key (and URL) are the reporting account's
+    url = env.get('PLATFORM_API_URL', '') + '/api/v1/social-actions'
+    headers = {'Authorization': f"Bearer {env.get('PLATFORM_API_KEY', '')}"}
+    statuses = []
+    for report in reports:
+        try:
+            resp = await http.post(url, json=report, headers=headers)
+            statuses.append(resp.status_code)
+        except httpx.TransportError:
+            # Platform unreachable — leave the rest queued for the next attempt
+            break
+    return statuses + [None] * (len(reports) - len(statuses))
+
+async def flush_outbox(client, env):
+    """Send due reports from the outbox. Returns counts of what happened."""
+    import fcntl
+    import random
+    import sqlite3
+    
+    stats = {'sent': 0, 'retry': 0, 'dropped': 0}
+    if not env.get('PLATFORM_API_URL', '') or not env.get('PLATFORM_API_KEY', ''):
+        return stats
+    
+    # One flusher at a time across processes
+    with open(_path(OUTBOX_DB) + '.lock', 'w') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return stats
+        try:
+            conn = _outbox_db()
+            rows = conn.execute('SELECT id, report, attempts FROM outbox WHERE next_try <= ? ORDER BY id LIMIT ?',
+                                (time.time(), OUTBOX_BATCH)).fetchall()
+        except sqlite3.Error:
+            return stats
+        if not rows:
+            return stats
+        
+        reports = [json.loads(r[1]) for r in rows]
+        # Referenced tweet metadata: cache first, then one call for the whole batch
+        ref_ids = {r['_ref_tweet_id'] for r in reports if r.get('_ref_tweet_id')}
+        parents = {i: _cache.get('tweet', i) for i in ref_ids}
+        missing = [i for i, parent in parents.items() if parent is None]
+        if missing:
+            try:
+                with _tracer.span('report_parents'):
+                    for tweet in await client.get_tweets_by_ids(missing):
+                        if tweet is not None:
+                            parents[tweet.id] = serialize_tweet(tweet)
+            except Exception as e:
+                # Reports still go out, just without parent tweet details
+                _tracer.error('report_parents', e)
+        reports = [_attach_parent(r, parents.get(r.get('_ref_tweet_id'))) for r in reports]
+        
+        with _tracer.span('report_post'):
+            statuses = await _post_reports(env, reports)
+        
+        now = time.time()
+        for (row_id, _, attempts), status in zip(rows, statuses):
+            if status is not None and status < 300:
+                conn.execute('DELETE FROM outbox WHERE id = ?', (row_id,))
+                stats['sent'] += 1
+            elif (status is not None and 400 <= status < 500 and status != 429) or attempts + 1 >= OUTBOX_MAX_ATTEMPTS:
+                # Rejected by the platform or retried too often — give up
+                conn.execute('DELETE FROM outbox WHERE id = ?', (row_id,))
+                stats['dropped'] += 1
+                _tracer.count('reports_dropped')
+            else:
+                delay = min(OUTBOX_BACKOFF * 2 ** attempts, OUTBOX_BACKOFF_MAX) * random.uniform(0.5, 1.5)
+                conn.execute('UPDATE outbox SET attempts = ?, next_try = ? WHERE id = ?',
+                             (attempts + 1, now + delay, row_id))
+                stats['retry'] += 1
+    _tracer.count('reports_sent', stats['sent'])
+    _tracer.count('reports_retried', stats['retry'])
+    return stats
+
+def _outbox_pending():
+    import sqlite3
+    if not os.path.exists(_path(OUTBOX_DB)):
+        return 0
+    try:
+        return _outbox_db().execute('SELECT COUNT(*) FROM outbox').fetchone()[0]
+    except sqlite3.Error:
+        return 0
+
+def _spawn_flusher(account=None):
+    """Flush the outbox from a detached process so the caller can exit right away."""
+    import subprocess
+    subprocess.Popen([sys.executable, os.path.join(SCRIPT_DIR, 'twitter.py'),
+                      *(['--account', account] if account else []), 'flush'],
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     start_new_session=True)
+
+def _hand_off_reports(pool, account_ids):
+    """After a batch: wake the daemon's flusher, or spawn one per account with queued reports."""
+    if _outbox_wakeup is not None:
+        _outbox_wakeup.set()
+        return
+    for account_id in account_ids:
+        try:
+            account = pool.account(account_id)
+        except ActionError:
+            continue
+        with account.use():
+            if _outbox_pending():
+                _spawn_flusher(account_id)
+
+async def _outbox_loop(pool):
+    """Daemon background task: flush every account's outbox when woken by a new report or every few seconds."""
+    import asyncio
+    global _outbox_wakeup
+    _outbox_wakeup = asyncio.Event()
+    while True:
+        try:
+            await asyncio.wait_for(_outbox_wakeup.wait(), timeout=OUTBOX_FLUSH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        _outbox_wakeup.clear()
+        for account_id in [None, *list_accounts()]:
+            try:
+                account = pool.account(account_id)
+                with account.use():
+                    if not _outbox_pending():
+                        continue
+                    client = (await pool.session(account)).client
+                    while (await flush_outbox(client, account.env))['sent']:
+                        pass
+            except Exception as e:
+                _tracer.error('flush', e)
+                print(f'⚠️ Outbox flush failed for {account_id or "default"}: {e}', file=sys.stderr)
+        pool.evict()
+        _cache.save()
+
+
+# --- Action registry ---
+# Every action is declared once, next to its handler: how many args it needs,
+# what it writes (batch ordering), whether repeats are skipped and whether it
+# is reported to the platform. Network actions are `async (client, env, args)`;
+# local ones are plain `(env, args)` functions, so the CLI can answer them
+# without an event loop or a Twitter client.
+
+class Action:
+    """Declaration of one twitter.py action."""
+    
+    def __init__(self, name, handler, required=0, usage=None, target=None, report=False, dedup=False,
+                 similar=None, archive=False, local=False):
+        self.name = name
+        self.handler = handler
+        self.required = required  # minimum number of args
+        self.usage = usage  # error message when fewer are given
+        self.target = target  # None for reads; 'self', 'tweet' or 'user' for writes (args[0] is the id)
+        self.report = report  # record in the dedup store and reply log, report to the platform
+        self.dedup = dedup  # skip a repeat on the same args[0] within DEDUP_MAX_AGE
+        self.similar = similar  # index of the first text arg for the near-duplicate guard
+        self.archive = archive  # archive the tweet we posted
+        self.local = local  # answered from local state, no client
+
+ACTIONS = {}
+
+def action(name, **spec):
+    """Register the decorated function as the handler of an action."""
+    def register(handler):
+        ACTIONS[name] = Action(name, handler, **spec)
+        return handler
+    return register
+
+# === TWEETS ===
+
+@action('post', required=1, usage='Text required', target='self', report=True, similar=0, archive=True)
+async def _action_post(client, env, args):
+    text = ' '.join(args)
+    tweet = await client.create_tweet(text)
+    return {'ok': True, 'tweet_id': tweet.id, 'text': text}
+
+@action('reply', required=2, usage='Usage: reply <tweet_id> <text>', target='tweet', report=True, similar=1, archive=True)
+async def _action_reply(client, env, args):
+    tweet_id = args[0]
+    text = ' '.join(args[1:])
+    tweet = await client.create_tweet(text, reply_to=tweet_id)
+    return {'ok': True, 'tweet_id': tweet.id, 'reply_to': tweet_id, 'text': text}
+
+@action('quote', required=2, usage='Usage: quote <tweet_id> <text>', target='tweet', report=True, similar=1, archive=True)
+async def _action_quote(client, env, args):
+    tweet_ref = args[0]
+    text = ' '.join(args[1:])
+    if not tweet_ref.startswith('http'):
+        tweet_ref = f'https://x.com/i/status/{tweet_ref}'
+    tweet = await client.create_tweet(text, attachment_url=tweet_ref)
+    return {'ok': True, 'tweet_id': tweet.id, 'quoted': args[0], 'text': text}
+
+@action('thread', target='self', report=True)
+async def _action_thread(client, env, args):
+    # Thread: texts separated by |, or a JSON spec of {text, media} parts
+    spec, args = _pop_flag(args, '--file')
+    if spec:
+        try:
+            with open(spec) as f:
+                parts = [{'text': str(p.get('text', '')).strip(), 'media': list(p.get('media') or [])}
+                         for p in json.load(f)]
+        except (OSError, ValueError, AttributeError, TypeError) as e:
+            raise ActionError(f'Invalid thread spec {spec}: {e}')
+    else:
+        text = ' '.join(args) if args else ''
+        if not text:
+            raise ActionError('Usage: thread <text1> | <text2> | ...')
+        parts = _parse_thread_parts(text)
+    if len(parts) < 2:
+        raise ActionError('Thread needs at least 2 parts separated by |')
+    tweet_ids, resumed = await post_thread(client, parts)
+    result = {'ok': True, 'tweet_ids': tweet_ids, 'parts': len(parts), 'text': parts[0]['text']}
+    if resumed:
+        result['resumed_from'] = resumed
+    return result
+
+def _simple(name, method, key, target, usage, **spec):
+    """Register an action that calls one client method on args[0] and echoes the id back."""
+    async def handler(client, env, args):
+        await getattr(client, method)(args[0])
+        return {'ok': True, key: args[0]}
+    action(name, required=1, usage=usage, target=target, **spec)(handler)
+
+_simple('like', 'favorite_tweet', 'liked', 'tweet', 'Tweet ID required', report=True, dedup=True)
+_simple('unlike', 'unfavorite_tweet', 'unliked', 'tweet', 'Tweet ID required')
+_simple('retweet', 'retweet', 'retweeted', 'tweet', 'Tweet ID required', report=True, dedup=True)
+_simple('unretweet', 'delete_retweet', 'unretweeted', 'tweet', 'Tweet ID required')
+_simple('bookmark', 'bookmark_tweet', 'bookmarked', 'tweet', 'Tweet ID required', report=True, dedup=True)
+_simple('unbookmark', 'delete_bookmark', 'unbookmarked', 'tweet', 'Tweet ID required')
+_simple('delete', 'delete_tweet', 'deleted', 'tweet', 'Tweet ID required', report=True)
+
+@action('tweet', required=1, usage='Tweet ID required')
+async def _action_tweet(client, env, args):
+    tweets = await client.get_tweets_by_ids([args[0]])
+    if tweets:
+        return {'ok': True, 'tweet': serialize_tweet(tweets[0])}
+    return {'ok': False, 'error': 'Tweet not found'}
+
+# === USERS ===
+
+_simple('follow', 'follow_user', 'followed', 'user', 'User ID required', report=True, dedup=True)
+_simple('unfollow', 'unfollow_user', 'unfollowed', 'user', 'User ID required', report=True)
+_simple('block', 'block_user', 'blocked', 'user', 'User ID required')
+_simple('unblock', 'unblock_user', 'unblocked', 'user', 'User ID required')
+_simple('mute', 'mute_user', 'muted', 'user', 'User ID required')
+_simple('unmute', 'unmute_user', 'unmuted', 'user', 'User ID required')
+
+@action('user', required=1, usage='Username required')
+async def _action_user(client, env, args):
+    user = await client.get_user_by_screen_name(args[0])
+    return {'ok': True, 'user': serialize_user(user)}
+
+@action('user_id', required=1, usage='User ID required')
+async def _action_user_id(client, env, args):
+    user = await client.get_user_by_id(args[0])
+    return {'ok': True, 'user': serialize_user(user)}
+
+@action('followers', required=1, usage='Username required')
+async def _action_followers(client, env, args):
+    user_id = await _resolve_user_id(client, args[0])
+    count = int(args[1]) if len(args) > 1 else 20
+    users = await client.get_user_followers(user_id, count=count)
+    return {'ok': True, 'users': [serialize_user(u) for u in users]}
+
+@action('following', required=1, usage='Username required')
+async def _action_following(client, env, args):
+    user_id = await _resolve_user_id(client, args[0])
+    count = int(args[1]) if len(args) > 1 else 20
+    users = await client.get_user_following(user_id, count=count)
+    return {'ok': True, 'users': [serialize_user(u) for u in users]}
+
+# === SEARCH & DISCOVERY ===
+
+def _query_count(args):
+    """(query, count) from `<query words> [count]`."""
+    # Last arg might be count if it's a digit
+    if len(args) > 1 and args[-1].isdigit():
+        return ' '.join(args[:-1]), int(args[-1])
+    return ' '.join(args), 20
+
+@action('search')
+async def _action_search(client, env, args):
+    since, args = _pop_flag(args, '--since')
+    if not args:
+        raise ActionError('Query required')
+    query, count = _query_count(args)
+    tweets = await _fetch_feed(client, f'search:{query}', count, since)
+    return {'ok': True, 'tweets': [serialize_tweet(t) for t in tweets]}
+
+@action('search_users', required=1, usage='Query required')
+async def _action_search_users(client, env, args):
+    query, count = _query_count(args)
+    users = await client.search_user(query, count=count)
+    return {'ok': True, 'users': [serialize_user(u) for u in users]}
+
+@action('timeline')
+async def _action_timeline(client, env, args):
+    since, args = _pop_flag(args, '--since')
+    count = int(args[0]) if args else 50
+    tweets = await _fetch_feed(client, 'timeline', count, since)
+    return {'ok': True, 'tweets': [serialize_tweet(t) for t in tweets]}
+
+@action('user_tweets', required=1, usage='Username required')
+async def _action_user_tweets(client, env, args):
+    user_id = await _resolve_user_id(client, args[0])
+    count = int(args[1]) if len(args) > 1 else 20
+    tweets = await client.get_user_tweets(user_id, 'Tweets', count=count)
+    return {'ok': True, 'tweets': [serialize_tweet(t) for t in tweets]}
+
+@action('snapshot')
+async def _action_snapshot(client, env, args):
+    windows, args = _pop_flag(args, '--window')
+    top, args = _pop_flag(args, '--top')
+    limit, args = _pop_flag(args, '--limit')
+    handle = (args[0] if args else _engagement.handle() or env.get('X_HANDLE', '')).lstrip('@')
+    if not handle:
+        raise ActionError('Usage: snapshot <own username> [count] (or set X_HANDLE)')
+    count = int(args[1]) if len(args) > 1 else ENGAGEMENT_SNAPSHOT_COUNT
+    user = await client.get_user_by_screen_name(handle)
+    tweets = await client.get_user_tweets(user.id, 'Tweets', count=count)
+    profile = serialize_user(user)
+    # The profile timeline also carries our retweets of other people's tweets
+    own = [t for t in map(serialize_tweet, tweets) if (t['user'] or '').lower() == profile['username'].lower()]
+    with _tracer.span('engagement'):
+        _engagement.record(profile, own)
+    return {'ok': True, 'recorded': len(own), **_engagement_result(windows, top, limit)}
+
+@action('notifications')
+async def _action_notifications(client, env, args):
+    since, args = _pop_flag(args, '--since')
+    count = int(args[0]) if args else 20
+    notifs = await _fetch_feed(client, 'notifications', count, since)
+    return {'ok': True, 'notifications': [serialize_tweet(t, source='notifications') for t in notifs]}
+
+@action('poll')
+async def _action_poll(client, env, args):
+    if args and args[0] == 'reset':
+        _reset_cursors(args[1:])
+        return {'ok': True, 'reset': args[1:] or 'all'}
+    count, args = _pop_flag(args, '--count')
+    return {'ok': True, 'feeds': await poll_feeds(client, args or POLL_DEFAULT_FEEDS, int(count or 20))}
+
+@action('trends')
+async def _action_trends(client, env, args):
+    trends = await client.get_trends('trending')
+    return {'ok': True, 'trends': [{'name': t.name, 'tweet_count': t.tweet_count if hasattr(t, 'tweet_count') else None} for t in trends]}
+
+@action('likers', required=1, usage='Tweet ID required')
+async def _action_likers(client, env, args):
+    count = int(args[1]) if len(args) > 1 else 20
+    users = await client.get_favoriters(args[0], count=count)
+    return {'ok': True, 'users': [serialize_user(u) for u in users]}
+
+@action('retweeters', required=1, usage='Tweet ID required')
+async def _action_retweeters(client, env, args):
+    count = int(args[1]) if len(args) > 1 else 20
+    users = await client.get_retweeters(args[0], count=count)
+    return {'ok': True, 'users': [serialize_user(u) for u in users]}
+
+# === DMs ===
+
+@action('dm', required=2, usage='Usage: dm <user_id> <text>', target='user')
+async def _action_dm(client, env, args):
+    user_id = args[0]
+    text = ' '.join(args[1:])
+    await client.send_dm(user_id, text)
+    return {'ok': True, 'dm_sent': user_id, 'text': text}
+
+@action('dm_history', required=1, usage='User ID required')
+async def _action_dm_history(client, env, args):
+    count = int(args[1]) if len(args) > 1 else 20
+    messages = await client.get_dm_history(args[0], max_id=None)
+    return {
+        'ok': True,
+        'messages': [{
+            'id': m.id,
+            'text': m.text,
+            'sender_id': m.sender_id,
+            'time': str(m.time) if hasattr(m, 'time') else None,
+        } for m in (messages[:count] if messages else [])]
+    }
+
+# === MEDIA ===
+
+@action('post_media', required=2, usage='Usage: post_media <text> <media_path> [media_path ...]',
+        target='self', archive=True)
+async def _action_post_media(client, env, args):
+    # Trailing arguments that are existing files are attachments
+    media = [args[-1]]
+    while len(args) - len(media) > 1 and len(media) < MEDIA_PER_TWEET and os.path.exists(args[-len(media) - 1]):
+        media.insert(0, args[-len(media) - 1])
+    text = ' '.join(args[:-len(media)])
+    _check_media(media)
+    uploads = _start_uploads(client, media)
+    try:
+        media_ids = [await uploads[path] for path in media]
+    except Exception:
+        _cancel_uploads(uploads)
+        raise
+    tweet = await client.create_tweet(text, media_ids=media_ids)
+    return {'ok': True, 'tweet_id': tweet.id, 'text': text, 'media': media[0] if len(media) == 1 else media}
+
+@action('update_profile', target='self')
+async def _action_update_profile(client, env, args):
+    # Usage: update_profile [--name "Name"] [--bio "Bio"] [--location "Location"] [--website "URL"]
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--name', default=None)
+    parser.add_argument('--bio', default=None)
+    parser.add_argument('--location', default=None)
+    parser.add_argument('--website', default=None)
+    pargs = parser.parse_args(args)
+    
+    params = {}
+    if pargs.name is not None: params['name'] = pargs.name
+    if pargs.bio is not None: params['description'] = pargs.bio
+    if pargs.location is not None: params['location'] = pargs.location
+    if pargs.website is not None: params['url'] = pargs.website
+    
+    if not params:
+        raise ActionError('Provide at least one: --name, --bio, --location, --website')
+    
+    headers = {
+        'content-type': 'application/x-www-form-urlencoded',
+        'x-csrf-token': client.http.headers.get('x-csrf-token', ''),
+    }
+    resp = await client.call(
+        'update_profile', client.http.post,
+        'https://api.twitter.com/1.1/account/update_profile.json',
+        data=params,
+        headers=headers,
+    )
+    profile = resp.json() if hasattr(resp, 'json') else {}
+    return {'ok': True, 'updated': list(params.keys()), 'name': profile.get('name'), 'bio': profile.get('description')}
+
+# === PLATFORM ===
+
+@action('flush')
+async def _action_flush(client, env, args):
+    totals = {'sent': 0, 'retry': 0, 'dropped': 0}
+    while True:
+        stats = await flush_outbox(client, env)
+        for k in totals:
+            totals[k] += stats[k]
+        if not stats['sent']:
+            break
+    return {'ok': True, **totals, 'pending': _outbox_pending()}
+
+# === LOCAL STATE ===
+
+@action('netstats', local=True)
+def _action_netstats(env, args):
+    return {'ok': True, 'pid': os.getpid(), **{k: v.summary() for k, v in _net_stats.items()}}
+
+@action('stats', local=True)
+def _action_stats(env, args):
+    hours, args = _pop_flag(args, '--hours')
+    only, args = _pop_flag(args, '--action')
+    since = time.time() - float(hours) * 3600 if hours else None
+    result = {'ok': True, 'tracing': _tracer.enabled, **trace_stats(since, only)}
+    if _tracer.counters:
+        # Live counters of the process answering (the daemon, when it is up)
+        result['process'] = {'pid': os.getpid(), 'mode': _tracer.mode, 'counters': dict(sorted(_tracer.counters.items()))}
+    return result
+
+@action('limits', local=True)
+def _action_limits(env, args):
+    return {'ok': True, 'limits': RateBuckets(_path(RATE_DB), _rate_limits(env)).status()}
+
+@action('archive', local=True)
+def _action_archive(env, args):
+    sub = args[0] if args else 'stats'
+    rest = args[1:]
+    if sub == 'query':
+        days, rest = _pop_flag(rest, '--days')
+        author, rest = _pop_flag(rest, '--author')
+        limit, rest = _pop_flag(rest, '--limit')
+        ours = '--ours' in rest
+        words = ' '.join(a for a in rest if a != '--ours')
+        if not words and not (days or author or ours):
+            raise ActionError('Usage: archive query <words> [--days N] [--author user] [--ours] [--limit N]')
+        tweets = _archive.query(words, days=days, author=author, ours=ours, limit=limit or 20)
+        return {'ok': True, 'tweets': tweets, 'count': len(tweets)}
+    if sub == 'replied':
+        if not rest:
+            raise ActionError('Usage: archive replied <tweet_id>')
+        replies = _archive.replied(rest[0])
+        return {'ok': True, 'tweet_id': rest[0], 'replied': bool(replies), 'replies': replies}
+    if sub == 'unseen':
+        limit, rest = _pop_flag(rest, '--limit')
+        tweets = _archive.unseen(limit or 20, mark='--peek' not in rest)
+        return {'ok': True, 'tweets': tweets, 'count': len(tweets)}
+    if sub == 'prune':
+        _archive.prune()
+        return {'ok': True, 'archive': _archive.stats()}
+    if sub == 'stats':
+        return {'ok': True, 'archive': _archive.stats()}
+    raise ActionError('Usage: archive query|replied|unseen|stats|prune ...')
+
+def _engagement_result(windows, top, limit):
+    return _engagement.query(windows or ENGAGEMENT_WINDOWS, int(top or ENGAGEMENT_TOP), int(limit or 10))
+
+@action('engagement', local=True)
+def _action_engagement(env, args):
+    if args[:1] == ['stats']:
+        return {'ok': True, 'engagement': _engagement.stats()}
+    windows, args = _pop_flag(args, '--window')
+    top, args = _pop_flag(args, '--top')
+    limit, args = _pop_flag(args, '--limit')
+    return {'ok': True, **_engagement_result(windows, top, limit)}
+
+@action('cache', local=True)
+def _action_cache(env, args):
+    if args and args[0] == 'clear':
+        _cache.clear()
+        return {'ok': True, 'cleared': True}
+    return {'ok': True, 'cache': _cache.stats()}
+
+@action('accounts', local=True)
+def _action_accounts(env, args):
+    from twitter_batch import _pool
+    live = _pool.status() if _pool is not None else {}
+    accounts = []
+    for account_id in [None, *list_accounts()]:
+        name = 'default' if account_id is None else account_id
+        try:
+            account = Account(account_id, load_env())
+        except ActionError:
+            continue
+        cookies = os.path.exists(account.path(COOKIES_FILE)) or bool(account.env.get('TWITTER_AUTH_TOKEN'))
+        accounts.append({'id': name, 'cookies': cookies, 'proxy': bool(account.env.get('TWITTER_PROXY')),
+                         'session': live.get(name)})
+    return {'ok': True, 'current': _account().id or 'default', 'accounts': accounts}
+
+# Actions that get auto-reported to platform
+REPORTABLE_ACTIONS = {name for name, a in ACTIONS.items() if a.report}
+# Actions that change state on Twitter — kept in submission order per target in batches
+WRITE_ACTIONS = {name for name, a in ACTIONS.items() if a.target}
+# Actions answered from local state — no Twitter client needed
+LOCAL_ACTIONS = {name for name, a in ACTIONS.items() if a.local}
+
+def lookup_action(action, args):
+    """The Action for a call after checking its argument count; raises ActionError otherwise."""
+    spec = ACTIONS.get(action)
+    if spec is None:
+        raise ActionError(f'Unknown action: {action}. Run without args for help.')
+    if len(args) < spec.required:
+        raise ActionError(spec.usage)
+    return spec
+
+async def run_action(client, env, action, args):
+    """Run one action against an authenticated client and return its result dict."""
+    spec = lookup_action(action, args)
+    if spec.local:
+        return spec.handler(env, args)
+    result = await spec.handler(client, env, args)
+    
+    # Archive our own posts (thread parts are archived as they go out)
+    if spec.archive and result.get('ok'):
+        _archive.add_own(result['tweet_id'], result.get('text', ''), reply_to=result.get('reply_to'))
+        if spec.similar is not None:
+            _similar.add(result['tweet_id'], result.get('text', ''))
+    
+    # Record in dedup cache + reply log + auto-report to platform
+    if spec.report:
+        with _tracer.span('dedup'):
+            _record_action(action, args)
+        if action == 'reply' and result.get('ok'):
+            with _tracer.span('reply_log'):
+                _log_reply(result.get('reply_to', ''), result.get('text', ''))
+        with _tracer.span('report'):
+            report_to_platform(env, action, result, args)
+    
+    return result
+
+def _skip_result(action, args):
+    """Result for a duplicate write action, or None if the action should run."""
+    with _tracer.span('dedup'):
+        skipped = _check_skip(action, args)
+    if skipped:
+        _tracer.count('similar_skips' if 'similar_to' in skipped else 'dedup_skips')
+    return skipped
+
+def _check_skip(action, args):
+    spec = ACTIONS.get(action)
+    if spec is None:
+        return None
+    if spec.dedup and _is_duplicate(action, args):
+        return {'ok': False, 'skipped': True, 'reason': f'Duplicate {action} — already done recently'}
+    if spec.similar is not None:
+        match = _similar.check(' '.join(args[spec.similar:]))
+        if match:
+            tweet_id, text, score = match
+            return {'ok': False, 'skipped': True, 'reason': f'Too similar to tweet {tweet_id} (score {score:.2f})',
+                    'similar_to': tweet_id, 'similar_text': text, 'score': round(score, 2)}
+    return None
+
+async def execute(client, env, action, args):
+    """Run an action and return (exit_status, result) without touching stdout."""
+    if action in LOCAL_ACTIONS:
+        return execute_local(env, action, args)
+    with _tracer.action(action) as trace:
+        status, result = await _execute(client, env, action, args)
+        trace.status = status
+        return status, result
+
+def execute_local(env, action, args):
+    """execute() for a local action — synchronous, so the CLI needs no event loop for it."""
+    with _tracer.action(action) as trace:
+        try:
+            status, result = 0, lookup_action(action, args).handler(env, args)
+        except Exception as e:
+            status, result = _failure(action, e)
+        finally:
+            _persist()
+        trace.status = status
+        return status, result
+
+async def _execute(client, env, action, args):
+    skipped = _skip_result(action, args)
+    if skipped:
+        return 0, skipped
+    try:
+        return 0, await run_action(client, env, action, args)
+    except (Exception, SystemExit) as e:
+        return _failure(action, e)
+    finally:
+        _persist()
+
+def _failure(action, e):
+    if isinstance(e, SystemExit):
+        # argparse in update_profile bails out on bad flags
+        return 1, {'error': f'Invalid arguments for {action}'}
+    return 1, {'error': str(e), **getattr(e, 'details', {})}
+
+def _persist():
+    with _tracer.span('persist'):
+        _cache.save()
+        _archive.save()
@@ -0,0 +1,238 @@
+"""
+twitter.py's session pool and batch mode: one logged-in client per account,
+shared by the requests of a batch or of the daemon.
+"""
+
+import json
+import sys
+import time
+
+from twitter_actions import ACTIONS, LOCAL_ACTIONS, _hand_off_reports, execute, execute_local
+from twitter_client import _api_base_transport, _net_stats, get_client, http_options
+from twitter_core import _DEFAULT_ACCOUNT, Account, ActionError, Shape, _tracer
+
+BATCH_CONCURRENCY = 4
+
+# --- Session pool ---
+# Batches and the daemon serve every account from one event loop: one
+# authenticated client per account, created on first use. Clients without
+# their own TWITTER_PROXY share a single connection pool (one httpx
+# transport) and keep separate cookies. Sessions idle for longer than
+# TWITTER_SESSION_IDLE seconds are evicted, and so is the least recently used
+# once more than TWITTER_MAX_SESSIONS are live. Eviction flushes and closes
+# that account's state.
+SESSION_IDLE = 900
+MAX_SESSIONS = 32
+
+class _Session:
+    __slots__ = ('account', 'client', 'last_used', 'active')
+    
+    def __init__(self, account, client):
+        self.account = account
+        self.client = client
+        self.last_used = time.monotonic()
+        self.active = 0
+
+class AccountPool:
+    """Authenticated clients and per-account state, keyed by account id (None = default account)."""
+    
+    def __init__(self, env):
+        self.env = env
+        _DEFAULT_ACCOUNT.env = dict(env)
+        self.sessions = {}
+        self.idle = float(env.get('TWITTER_SESSION_IDLE', '') or SESSION_IDLE)
+        self.max_sessions = int(env.get('TWITTER_MAX_SESSIONS', '') or MAX_SESSIONS)
+        self._transport = None
+    
+    def account(self, account_id):
+        """The Account for an id; raises ActionError for an unknown one."""
+        session = self.sessions.get(account_id)
+        if session is not None:
+            return session.account
+        return _DEFAULT_ACCOUNT if account_id is None else Account(account_id, self.env)
+    
+    def _shared_transport(self):
+        if self._transport is None:
+            import httpx
+            options = http_options(self.env, _net_stats['twitter'])
+            if self.env.get('TWITTER_API_BASE'):
+                self._transport = _api_base_transport(self.env['TWITTER_API_BASE'], options)
+            else:
+                self._transport = httpx.AsyncHTTPTransport(http2=options['http2'], limits=options['limits'])
+        return self._transport
+    
+    async def session(self, account):
+        """The live session of an account, logging it in first if needed."""
+        session = self.sessions.get(account.id)
+        if session is None:
+            with account.use():
+                client = await get_client(account.env, self._shared_transport())
+            session = self.sessions[account.id] = _Session(account, client)
+            self.evict()
+        session.last_used = time.monotonic()
+        return session
+    
+    async def call(self, account_id, work):
+        """await work(account, client) as account_id; an unknown account or failed login is (1, {'error'})."""
+        try:
+            account = self.account(account_id)
+            with account.use():
+                session = await self.session(account)
+        except ActionError as e:
+            return 1, {'error': str(e)}
+        session.active += 1
+        try:
+            with account.use():
+                return await work(account, session.client)
+        finally:
+            session.active -= 1
+            session.last_used = time.monotonic()
+    
+    async def execute(self, account_id, action, args):
+        """execute() on behalf of an account."""
+        if action in LOCAL_ACTIONS:
+            try:
+                account = self.account(account_id)
+            except ActionError as e:
+                return 1, {'error': str(e)}
+            with account.use():
+                return execute_local(account.env, action, args)
+        return await self.call(account_id, lambda account, client: execute(client, account.env, action, args))
+    
+    def evict(self):
+        """Drop idle sessions, then the least recently used beyond max_sessions."""
+        now = time.monotonic()
+        over = len(self.sessions) - self.max_sessions
+        for last_used, account_id in sorted((s.last_used, a) for a, s in self.sessions.items() if not s.active):
+            if over <= 0 and now - last_used < self.idle:
+                break
+            over -= 1
+            self._drop(account_id)
+    
+    def _drop(self, account_id):
+        import asyncio
+        session = self.sessions.pop(account_id)
+        session.account.close()
+        if session.account.env.get('TWITTER_PROXY'):
+            # Proxied clients own their pool; the shared one stays open for the rest
+            asyncio.ensure_future(session.client.http.aclose())
+        _tracer.count('sessions_evicted')
+    
+    def status(self):
+        now = time.monotonic()
+        return {('default' if a is None else a): {'idle_s': round(now - s.last_used), 'active': s.active}
+                for a, s in self.sessions.items()}
+
+_pool = None  # the daemon's AccountPool, set by serve()
+
+def _request_account(req, default=None):
+    """Account id a batch/daemon request runs as."""
+    account = req.get('account', default) if isinstance(req, dict) else default
+    if account is not None and not isinstance(account, str):
+        raise ValueError('Bad request: "account" must be a string')
+    return account or None
+
+# --- Batch mode ---
+# `twitter.py batch [--concurrency N] [file]` reads a JSON array or JSONL of
+# {"action": ..., "args": [...], "id": ...} requests (stdin by default), runs
+# them concurrently and prints one {"id", "status", "result"} line per request
+# as it completes. A request may carry "account" to run as another identity.
+
+def _write_target(action, args):
+    """Ordering key for a write action, or None for reads."""
+    spec = ACTIONS.get(action)
+    if spec is None or not spec.target:
+        return None
+    if spec.target == 'self' or not args:
+        return 'self'
+    return f'{spec.target}:{args[0]}'
+
+def _parse_request(req):
+    """Validate a batch/daemon request. Returns (action, args) or raises ValueError."""
+    if not isinstance(req, dict) or not isinstance(req.get('action'), str):
+        raise ValueError('Bad request: expected {"action": ..., "args": [...]}')
+    args = req.get('args', [])
+    if isinstance(args, str):
+        args = [args]
+    if not isinstance(args, list):
+        raise ValueError('Bad request: "args" must be a list')
+    return req['action'], [str(a) for a in args]
+
+def parse_batch(text):
+    """Parse batch input: a JSON array or one JSON object per line."""
+    text = text.strip()
+    if not text:
+        return []
+    if text.startswith('['):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+async def run_batch(pool, requests, concurrency, emit, account=None, shape=None):
+    """Run requests concurrently, calling emit() with each result line as it finishes.
+    
+    Reads fan out under a concurrency cap; writes to the same tweet/user (or to
+    our own timeline) wait for the previous write on that target. Requests
+    without an "account" run as `account`, and without shape keys get `shape`.
+    Returns the worst exit status once queued platform reports are handed off.
+    """
+    import asyncio
+    sem = asyncio.Semaphore(max(1, concurrency))
+    last_write = {}
+    reported = set()  # accounts whose writes may have queued reports
+    
+    async def run_one(rid, req, after):
+        if after is not None:
+            await asyncio.wait([after])
+        try:
+            action, args = _parse_request(req)
+            account_id = _request_account(req, account)
+            req_shape = Shape.from_request(req, shape)
+            if action in ('batch', 'stream', 'serve', 'ping'):
+                raise ValueError(f'{action} is not allowed inside a batch')
+        except ValueError as e:
+            status, result = 1, {'error': str(e)}
+        else:
+            async with sem:
+                status, result = await pool.execute(account_id, action, args)
+            if status == 0 and ACTIONS.get(action) is not None and ACTIONS[action].report:
+                reported.add(account_id)
+            if req_shape is not None:
+                result = req_shape.apply(result)
+        emit({'id': rid, 'status': status, 'result': result})
+        return status
+    
+    tasks = []
+    for i, req in enumerate(requests):
+        rid = req.get('id', i) if isinstance(req, dict) else i
+        try:
+            target = _write_target(*_parse_request(req))
+            if target:
+                target = (_request_account(req, account), target)
+        except ValueError:
+            target = None
+        task = asyncio.ensure_future(run_one(rid, req, last_write.get(target)))
+        if target:
+            last_write[target] = task
+        tasks.append(task)
+    statuses = await asyncio.gather(*tasks)
+    _hand_off_reports(pool, reported)
+    return max(statuses, default=0)
+
+def _batch_args(args, env):
+    """Parse `batch [--concurrency N] [file]` into (requests, concurrency)."""
+    concurrency = int(env.get('TWITTER_BATCH_CONCURRENCY', '') or BATCH_CONCURRENCY)
+    path = None
+    i = 0
+    while i < len(args):
+        if args[i] == '--concurrency' and i + 1 < len(args):
+            concurrency = int(args[i + 1])
+            i += 2
+            continue
+        path = args[i]
+        i += 1
+    if path and path != '-':
+        with open(path) as f:
+            text = f.read()
+    else:
+        text = sys.stdin.read()
+    return parse_batch(text), concurrency
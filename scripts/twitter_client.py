@@ -0,0 +1,367 @@
+"""
+twitter.py's Twitter and platform HTTP clients: pooled transports and the
+rate-limit scheduler every twikit call goes through.
+"""
+
+import os
+import time
+
+from twitter_core import SCRIPT_DIR, ActionError, _account, _path, _tracer
+
+COOKIES_FILE = os.path.join(SCRIPT_DIR, '..', 'twitter_cookies.json')
+
+# --- HTTP transport ---
+# twikit's httpx client and the platform client share one pool configuration:
+# keep-alive connections, HTTP/2 where the h2 package is installed and the
+# server negotiates it, and timeouts — all tunable from .env. Requests are
+# traced so `twitter.py netstats` can show how often a warm connection was
+# reused instead of paying DNS + TCP + TLS again. TWITTER_API_BASE redirects
+# every x.com request to a local stand-in (scripts/bench.py).
+HTTP_DEFAULTS = {
+    'HTTP_POOL_SIZE': '10',  # max connections per client
+    'HTTP_KEEPALIVE_EXPIRY': '60',  # seconds an idle connection stays pooled
+    'HTTP_TIMEOUT': '15',
+    'HTTP2': '1',
+}
+
+class ConnStats:
+    """Counts requests against fresh connections/TLS handshakes via httpcore trace events."""
+    
+    def __init__(self):
+        self.requests = 0
+        self.connects = 0
+        self.tls = 0
+        self.http2 = 0
+    
+    async def on_request(self, request):
+        self.requests += 1
+        request.extensions['trace'] = self._trace
+    
+    async def _trace(self, event, info):
+        if event.endswith('connect_tcp.complete'):
+            self.connects += 1
+        elif event.endswith('start_tls.complete'):
+            self.tls += 1
+        elif event.startswith('http2.send_request_headers.started'):
+            self.http2 += 1
+    
+    def summary(self):
+        return {
+            'requests': self.requests,
+            'new_connections': self.connects,
+            'tls_handshakes': self.tls,
+            'reused': max(0, self.requests - self.connects),
+            'reuse_rate': round(1 - self.connects / self.requests, 3) if self.requests else None,
+            'http2_requests': self.http2,
+        }
+
+_net_stats = {'twitter': ConnStats(), 'platform': ConnStats()}
+_platform_http = None
+
+def http_options(env, stats):
+    """httpx.AsyncClient keyword arguments from .env pool settings."""
+    import importlib.util
+    import httpx
+    
+    def setting(key):
+        return float(env.get(key, '') or HTTP_DEFAULTS[key])
+    
+    pool = int(setting('HTTP_POOL_SIZE'))
+    return {
+        'http2': setting('HTTP2') != 0 and importlib.util.find_spec('h2') is not None,
+        'limits': httpx.Limits(max_connections=pool, max_keepalive_connections=pool,
+                               keepalive_expiry=setting('HTTP_KEEPALIVE_EXPIRY')),
+        'timeout': httpx.Timeout(setting('HTTP_TIMEOUT')),
+        'event_hooks': {'request': [stats.on_request]},
+    }
+
+def _api_base_transport(base, options):
+    """Transport that sends every Twitter host to TWITTER_API_BASE (the bench.py stand-in).
+    
+    Only the connection target changes: the Host header, cookies and paths stay
+    those of x.com, so the stand-in can route by host like the real thing.
+    """
+    import httpx
+    target = httpx.URL(base)
+    
+    class Redirect(httpx.AsyncHTTPTransport):
+        async def handle_async_request(self, request):
+            original = request.url
+            request.url = original.copy_with(scheme=target.scheme, host=target.host, port=target.port)
+            try:
+                return await super().handle_async_request(request)
+            finally:
+                request.url = original
+    
+    return Redirect(http2=options['http2'], limits=options['limits'])
+
+def platform_http(env):
+    """Shared keep-alive client for PLATFORM_API_URL."""
+    global _platform_http
+    if _platform_http is None:
+        import httpx
+        _platform_http = httpx.AsyncClient(
+            base_url=env.get('PLATFORM_API_URL', ''),
+            headers={'Authorization': f"Bearer {env.get('PLATFORM_API_KEY', '')}"},
+            **http_options(env, _net_stats['platform']),
+        )
+    return _platform_http
+
+# --- Rate-limit scheduler ---
+# Every twikit call goes through ScheduledClient, which takes a token from a
+# per-endpoint bucket before calling out. Buckets live in SQLite so parallel
+# twitter.py processes (and the daemon) share one budget. Calls that would
+# exceed the budget are delayed, not failed, unless the wait is longer than
+# RATE_MAX_WAIT. A 429 blocks the endpoint until its x-rate-limit-reset for
+# everyone; reads are also retried with jittered backoff on 5xx/network errors.
+RATE_DB = os.path.join(SCRIPT_DIR, '..', '.ratelimit.db')
+RATE_MAX_WAIT = 30  # seconds we are willing to queue a call
+RATE_MAX_RETRIES = 3
+RATE_BACKOFF = 1.0  # seconds, doubled per retry
+RATE_DEFAULT_BLOCK = 60  # when a 429 carries no reset header
+
+# endpoint: (requests, per seconds) — override with TWITTER_RATE_<ENDPOINT>=N/SECONDS in .env
+RATE_LIMITS = {
+    'search': (50, 900),
+    'timeline': (180, 900),
+    'notifications': (180, 900),
+    'tweet_lookup': (150, 900),
+    'user_lookup': (95, 900),
+    'user_tweets': (50, 900),
+    'user_list': (50, 900),
+    'trends': (30, 900),
+    'create_tweet': (50, 900),
+    'favorite': (50, 900),
+    'retweet': (50, 900),
+    'bookmark': (50, 900),
+    'follow': (15, 900),
+    'moderation': (50, 900),
+    'delete': (50, 900),
+    'dm': (50, 900),
+    'media': (50, 900),
+    'profile': (15, 900),
+}
+
+# twikit method -> endpoint bucket
+RATE_ENDPOINTS = {
+    'search_tweet': 'search', 'search_user': 'search',
+    'get_timeline': 'timeline',
+    'get_notifications': 'notifications',
+    'get_tweets_by_ids': 'tweet_lookup',
+    'get_user_by_screen_name': 'user_lookup', 'get_user_by_id': 'user_lookup',
+    'get_user_tweets': 'user_tweets',
+    'get_user_followers': 'user_list', 'get_user_following': 'user_list',
+    'get_favoriters': 'user_list', 'get_retweeters': 'user_list',
+    'get_trends': 'trends',
+    'create_tweet': 'create_tweet',
+    'favorite_tweet': 'favorite', 'unfavorite_tweet': 'favorite',
+    'retweet': 'retweet', 'delete_retweet': 'retweet',
+    'bookmark_tweet': 'bookmark', 'delete_bookmark': 'bookmark',
+    'follow_user': 'follow', 'unfollow_user': 'follow',
+    'block_user': 'moderation', 'unblock_user': 'moderation',
+    'mute_user': 'moderation', 'unmute_user': 'moderation',
+    'delete_tweet': 'delete',
+    'send_dm': 'dm', 'get_dm_history': 'dm',
+    'upload_media': 'media',
+    'update_profile': 'profile',  # raw client.http call, see run_action
+}
+
+# Calls that may be retried after a 5xx/network error without risking a double write
+RATE_SAFE_RETRY = {m for m in RATE_ENDPOINTS if m.startswith(('get_', 'search_'))}
+
+class RateLimited(Exception):
+    """An endpoint is out of budget for longer than we are willing to wait."""
+    
+    def __init__(self, endpoint, retry_after):
+        super().__init__(f'Rate limited on {endpoint} — retry in {int(retry_after)}s')
+        self.endpoint = endpoint
+        self.retry_after = int(retry_after)
+        self.details = {'rate_limited': endpoint, 'retry_after': self.retry_after}
+
+def _rate_limits(env):
+    limits = dict(RATE_LIMITS)
+    for endpoint in limits:
+        override = env.get(f'TWITTER_RATE_{endpoint.upper()}', '')
+        if '/' in override:
+            n, _, per = override.partition('/')
+            limits[endpoint] = (float(n), float(per))
+    return limits
+
+class RateBuckets:
+    """Token buckets per endpoint, shared across processes through SQLite."""
+    
+    def __init__(self, path, limits):
+        self.path = path
+        self.limits = limits
+        self._conn = None
+    
+    def _db(self):
+        if self._conn is None:
+            import sqlite3
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS buckets (endpoint TEXT PRIMARY KEY, tokens REAL NOT NULL, '
+                         'updated REAL NOT NULL, blocked_until REAL NOT NULL DEFAULT 0)')
+            self._conn = conn
+        return self._conn
+    
+    def _refill(self, endpoint, row, now):
+        limit, period = self.limits.get(endpoint, (50, 900))
+        if row is None:
+            return float(limit), 0.0
+        tokens, updated, blocked_until = row
+        if blocked_until and now >= blocked_until:
+            # The server-side window has reset
+            return float(limit), 0.0
+        return min(float(limit), tokens + (now - updated) * limit / period), blocked_until
+    
+    def take(self, endpoint):
+        """Take one token. Returns 0 on success, else seconds until one is available."""
+        limit, period = self.limits.get(endpoint, (50, 900))
+        now = time.time()
+        conn = self._db()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated, blocked_until FROM buckets WHERE endpoint = ?',
+                               (endpoint,)).fetchone()
+            tokens, blocked_until = self._refill(endpoint, row, now)
+            if blocked_until > now:
+                wait = blocked_until - now
+            elif tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) * period / limit
+            conn.execute('INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?)', (endpoint, tokens, now, blocked_until))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return wait
+    
+    def block(self, endpoint, until):
+        """Empty an endpoint's bucket until `until` (epoch seconds) after a 429."""
+        conn = self._db()
+        conn.execute('INSERT OR REPLACE INTO buckets VALUES (?, 0, ?, ?)', (endpoint, time.time(), until))
+    
+    def status(self):
+        now = time.time()
+        rows = {}
+        if os.path.exists(self.path):
+            rows = {r[0]: r[1:] for r in self._db().execute('SELECT endpoint, tokens, updated, blocked_until FROM buckets')}
+        out = {}
+        for endpoint, (limit, period) in sorted(self.limits.items()):
+            tokens, blocked_until = self._refill(endpoint, rows.get(endpoint), now)
+            out[endpoint] = {
+                'limit': f'{limit:g}/{period:g}s',
+                'available': int(tokens),
+                'blocked_for': int(blocked_until - now) if blocked_until > now else 0,
+            }
+        return out
+
+def _error_kind(e):
+    """Classify an exception from twikit/httpx: 'rate_limit', 'transient' or None."""
+    name = type(e).__name__
+    if name == 'TooManyRequests':
+        return 'rate_limit'
+    if name in ('ServerError', 'RequestTimeout') or name.endswith(('Timeout', 'ConnectError', 'RemoteProtocolError')):
+        return 'transient'
+    return None
+
+class ScheduledClient:
+    """Wraps a twikit Client so each API call waits for its endpoint's budget."""
+    
+    def __init__(self, client, buckets):
+        self._client = client
+        self.buckets = buckets
+        self.retries = 0
+    
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name not in RATE_ENDPOINTS or not callable(attr):
+            return attr
+        async def scheduled(*args, **kwargs):
+            return await self.call(name, attr, *args, **kwargs)
+        return scheduled
+    
+    async def call(self, name, fn, *args, **kwargs):
+        """Run fn under the budget of twikit method `name`, retrying 429s (and 5xx for reads)."""
+        import asyncio
+        import random
+        endpoint = RATE_ENDPOINTS.get(name, 'default')
+        attempt = 0
+        while True:
+            wait = self.buckets.take(endpoint)
+            if wait > RATE_MAX_WAIT:
+                _tracer.count('rate_limited')
+                raise RateLimited(endpoint, wait)
+            if wait > 0:
+                _tracer.count('rate_waits')
+                with _tracer.span('rate_wait'):
+                    await asyncio.sleep(wait)
+                continue
+            try:
+                with _tracer.span('twikit'):
+                    return await fn(*args, **kwargs)
+            except Exception as e:
+                kind = _error_kind(e)
+                if kind is None or attempt >= RATE_MAX_RETRIES or (kind == 'transient' and name not in RATE_SAFE_RETRY):
+                    raise
+                if kind == 'rate_limit':
+                    reset = getattr(e, 'rate_limit_reset', None)
+                    until = float(reset) if reset else time.time() + RATE_DEFAULT_BLOCK
+                    self.buckets.block(endpoint, until)
+                    if until - time.time() > RATE_MAX_WAIT:
+                        _tracer.count('rate_limited')
+                        raise RateLimited(endpoint, until - time.time()) from e
+                else:
+                    await asyncio.sleep(RATE_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5))
+                attempt += 1
+                self.retries += 1
+                _tracer.count('retries')
+
+async def get_client(env, transport=None):
+    with _tracer.span('import'):
+        from twikit import Client
+    with _tracer.span('client'):
+        return await _make_client(Client, env, transport)
+
+async def _make_client(Client, env, transport=None):
+    """Authenticated, rate-scheduled client for the current account from its cookies file or .env cookies.
+    
+    `transport` is a connection pool shared with other accounts' clients; it is
+    not used when the account goes through its own TWITTER_PROXY.
+    """
+    import httpx
+    proxy = env.get('TWITTER_PROXY', '') or None
+    options = http_options(env, _net_stats['twitter'])
+    if transport is not None and proxy is None:
+        options['transport'] = transport
+    elif env.get('TWITTER_API_BASE'):
+        options['transport'] = _api_base_transport(env['TWITTER_API_BASE'], options)
+    else:
+        options['transport'] = httpx.AsyncHTTPTransport(proxy=proxy, http2=options['http2'], limits=options['limits'])
+    # twikit builds its own AsyncClient with an all:// mount even without a
+    # proxy, which would bypass the transport chosen above. It makes every
+    # request through client.http, so that client is closed (the placeholder
+    # saves it building a default pool too) and replaced by one of ours.
+    client = Client('en-US', transport=httpx.AsyncBaseTransport())
+    await client.http.aclose()
+    client.http = httpx.AsyncClient(**options)
+    buckets = RateBuckets(_path(RATE_DB), _rate_limits(env))
+    cookies_file = _path(COOKIES_FILE)
+    
+    if os.path.exists(cookies_file):
+        client.load_cookies(cookies_file)
+        return ScheduledClient(client, buckets)
+    
+    auth_token = env.get('TWITTER_AUTH_TOKEN', '')
+    ct0 = env.get('TWITTER_CT0', '')
+    
+    if auth_token and ct0:
+        client.set_cookies({'auth_token': auth_token, 'ct0': ct0})
+        client.save_cookies(cookies_file)
+        return ScheduledClient(client, buckets)
+    
+    where = '.env' if _account().id is None else f'accounts/{_account().id}/.env'
+    raise ActionError(f'No Twitter cookies found. Set TWITTER_AUTH_TOKEN and TWITTER_CT0 in {where}')
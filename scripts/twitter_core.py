@@ -0,0 +1,813 @@
+"""
+Spirit Agent Twitter client using twikit (cookie-based, no API key needed).
+Usage: python3 twitter.py [--account id] <action> [args...]
+
+TWEETS:
+  post <text>                          Post a tweet
+  reply <tweet_id> <text>              Reply to a tweet
+  quote <tweet_id> <text>              Quote tweet
+  like <tweet_id>                      Like a tweet
+  unlike <tweet_id>                    Unlike a tweet
+  retweet <tweet_id>                   Retweet
+  unretweet <tweet_id>                 Undo retweet
+  bookmark <tweet_id>                  Bookmark a tweet
+  unbookmark <tweet_id>               Remove bookmark
+  delete <tweet_id>                    Delete own tweet
+  tweet <tweet_id>                     Get a tweet by ID
+  thread <text1> | <text2> | ...       Post a thread (pipe-separated); a part may carry
+                                       [media: a.png, b.mp4] — all media uploads up front,
+                                       and re-running a failed thread resumes where it stopped
+  thread --file <spec.json>            Thread from [{"text": ..., "media": [paths]}, ...]
+
+USERS:
+  follow <user_id>                     Follow user
+  unfollow <user_id>                   Unfollow user
+  block <user_id>                      Block user
+  unblock <user_id>                    Unblock user
+  mute <user_id>                       Mute user
+  unmute <user_id>                     Unmute user
+  user <username>                      Get user info by username
+  user_id <user_id>                    Get user info by ID
+  followers <username> [count]         Get user's followers
+  following <username> [count]         Get user's following
+
+STREAMING (followers, following, likers, retweeters, search):
+  <action> <target> [count] --stream   Walk every page up to count, one NDJSON record
+         [--resume] [--pages-per-min N] per line; --resume continues from the last
+                                       checkpointed cursor; summary goes to stderr
+
+SEARCH & DISCOVERY:
+  search <query> [count] [--since id]  Search tweets
+  search_users <query> [count]         Search users
+  timeline [count] [--since id]        Get home timeline
+  user_tweets <username> [count]       Get user's tweets
+  snapshot [username] [count]          Record our follower count and our latest tweets'
+                                       likes/retweets/replies/views, then answer like
+                                       `engagement` (username defaults to the last one,
+                                       then X_HANDLE)
+  notifications [count] [--since id]   Get notifications
+  poll [feed ...] [--count N]          Only what's new since the last poll, per feed:
+                                       timeline, notifications, search:<query>
+                                       (default: timeline notifications)
+  poll reset [feed ...]                Forget poll cursors
+  trends                               Get trending topics
+  likers <tweet_id> [count]            Get users who liked a tweet
+  retweeters <tweet_id> [count]        Get users who retweeted
+
+DMs:
+  dm <user_id> <text>                  Send a DM
+  dm_history <user_id> [count]         Get DM conversation
+
+MEDIA:
+  post_media <text> <path> [path ...]  Post tweet with up to 4 images/videos
+
+LOCAL STATE:
+  cache [clear]                        Tweet/user metadata cache hit/miss stats (or wipe it)
+  archive query <words> [--days N]     Full-text search of every tweet seen or posted
+          [--author user] [--ours] [--limit N]
+  archive replied <tweet_id>           Did we already reply in this tweet's conversation?
+  archive unseen [--limit N] [--peek]  Notification tweets not shown before (marks them seen)
+  archive stats | prune                Row counts / apply retention now
+  engagement [--window 1h,24h,7d]      Gains, per-hour rates and top performers of our
+             [--top N] [--limit N]     tweets and followers per window, from snapshots
+  engagement stats                     Series/point counts of the snapshot store
+  limits                               Remaining per-endpoint rate-limit budget
+  stats [--hours N] [--action name]    p50/p99 latency per action and phase from the trace
+                                       log (needs TWITTER_TRACE=1)
+  netstats                             Connection reuse stats (meaningful against the daemon)
+
+PLATFORM:
+  flush                                Send queued social-action reports now (normally
+                                       done in the background after each write action)
+
+BATCH:
+  batch [--concurrency N] [file]       Run a JSON array / JSONL of {"id", "action", "args"}
+                                       requests (stdin by default) concurrently; prints one
+                                       {"id", "status", "result"} line per request
+
+DAEMON:
+  serve                                Keep a warm client on a Unix socket (.twitter.sock);
+                                       other invocations forward to it when it is running;
+                                       snapshots engagement every TWITTER_ENGAGEMENT_INTERVAL
+                                       seconds (default 300, 0 = off)
+  ping                                 Check whether the daemon is running; "stale": true when
+                                       its code has changed on disk since it started
+
+OUTPUT (any action that returns tweets, users or messages):
+  --fields id,text,likes               Keep only these keys of each record
+  --max-text N                         Cut tweet text and bios to N characters
+  --columns                            Lists as {"columns": [keys], "rows": [[values], ...]};
+                                       --stream prints the column line, then one array per record
+
+ACCOUNTS:
+  --account <id> <action> ...          Run as accounts/<id> (its .env, cookies and state);
+                                       TWITTER_ACCOUNT=<id> does the same
+  accounts                             Configured accounts and the daemon's live sessions
+"""
+
+import json
+import os
+import sys
+import time
+
+_MODULE_START = time.perf_counter()
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ENV_FILE = os.path.join(SCRIPT_DIR, '..', '.env')
+SOCKET_FILE = os.path.join(SCRIPT_DIR, '..', '.twitter.sock')
+
+def load_env(path=ENV_FILE):
+    env = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, _, val = line.partition('=')
+                    val = val.strip().strip('"').strip("'")
+                    env[key.strip()] = val
+    return env
+
+class ActionError(Exception):
+    """Bad usage or arguments for an action — reported as {'error': ...} with exit 1."""
+    
+    def __init__(self, message, **details):
+        super().__init__(message)
+        self.details = details
+
+def _pop_flag(args, name):
+    """Remove `name value` from args. Returns (value or None, remaining args)."""
+    if name not in args:
+        return None, args
+    i = args.index(name)
+    if i + 1 >= len(args):
+        raise ActionError(f'{name} needs a value')
+    return args[i + 1], args[:i] + args[i + 2:]
+
+# --- Accounts ---
+# One skill directory can drive several agent identities. The default account
+# is the skill directory itself (.env, twitter_cookies.json and the state files
+# next to it); account <id> lives in accounts/<id>/, whose .env overlays the
+# skill .env (cookies, TWITTER_PROXY, PLATFORM_API_KEY, TWITTER_RATE_*) and
+# which holds that identity's own cookies, rate-limit buckets, dedup store,
+# reply log, report outbox, archive, near-duplicate index, engagement history,
+# poll cursors and thread progress. The metadata cache, trace log and daemon socket are shared.
+# The account an action runs for is a context variable, so concurrent requests
+# for different accounts in the daemon never see each other's state.
+ACCOUNTS_DIR = os.path.join(SCRIPT_DIR, '..', 'accounts')
+
+class Account:
+    """One agent identity: its env and the per-identity state opened for it."""
+    
+    def __init__(self, account_id=None, base_env=None):
+        self.id = account_id
+        self.env = dict(base_env or {})
+        self.dir = None if account_id is None else os.path.join(ACCOUNTS_DIR, account_id)
+        if account_id is not None:
+            if account_id.startswith('.') or os.sep in account_id or not os.path.isdir(self.dir):
+                raise ActionError(f'Unknown account: {account_id} (expected accounts/{account_id}/.env)')
+            self.env.update(load_env(os.path.join(self.dir, '.env')))
+        self.state = {}  # name -> sqlite connection / TweetArchive / SimilarityIndex
+    
+    def path(self, default):
+        """This account's copy of a state file whose default-account path is `default`."""
+        return default if self.dir is None else os.path.join(self.dir, os.path.basename(default))
+    
+    def use(self):
+        """Context manager making this the current account."""
+        return _UsingAccount(self)
+    
+    def close(self):
+        """Flush and drop everything opened for this account."""
+        for item in self.state.values():
+            if hasattr(item, 'save'):
+                item.save()  # TweetArchive buffers rows
+            elif hasattr(item, 'close'):
+                item.close()  # sqlite connections
+        self.state.clear()
+
+class _UsingAccount:
+    __slots__ = ('account', 'token')
+    
+    def __init__(self, account):
+        self.account = account
+    
+    def __enter__(self):
+        global _account_var
+        if _account_var is None:
+            import contextvars
+            _account_var = contextvars.ContextVar('twitter_account', default=_DEFAULT_ACCOUNT)
+        self.token = _account_var.set(self.account)
+        return self.account
+    
+    def __exit__(self, *exc):
+        _account_var.reset(self.token)
+        return False
+
+_DEFAULT_ACCOUNT = Account()
+_account_var = None  # ContextVar, created the first time another account is used
+
+def _account():
+    """The account the running action belongs to."""
+    return _DEFAULT_ACCOUNT if _account_var is None else _account_var.get()
+
+def _path(default):
+    return _account().path(default)
+
+class _AccountState:
+    """Module-level handle whose attributes resolve on the current account's instance."""
+    
+    def __init__(self, name, make):
+        self._name = name
+        self._make = make
+    
+    def __getattr__(self, attr):
+        state = _account().state
+        if self._name not in state:
+            state[self._name] = self._make()
+        return getattr(state[self._name], attr)
+
+def list_accounts():
+    """Ids of the configured named accounts."""
+    try:
+        return sorted(d for d in os.listdir(ACCOUNTS_DIR)
+                      if not d.startswith('.') and os.path.isdir(os.path.join(ACCOUNTS_DIR, d)))
+    except OSError:
+        return []
+
+# --- Tracing & metrics ---
+# With TWITTER_TRACE=1 (in .env or the environment) every action appends one
+# JSON line to .trace.jsonl: total time, time per phase (twikit import,
+# client setup, each twikit call, serialization, dedup checks, outbox I/O,
+# persistence), the counters it bumped (retries, cache hits, dedup skips,
+# dropped reports...) and any error a best-effort step swallowed. The file is
+# rotated at TRACE_MAX_BYTES. `twitter.py stats` summarizes it. With
+# TWITTER_METRICS_PORT set, the daemon also serves the per-process counters
+# and latency histograms in Prometheus text format. Disabled, span() hands
+# back one shared no-op context manager and count() returns immediately.
+TRACE_FILE = os.path.join(SCRIPT_DIR, '..', '.trace.jsonl')
+TRACE_MAX_BYTES = 5 * 1024 * 1024
+TRACE_ROTATIONS = 3  # .trace.jsonl.1 ... .3
+METRICS_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+class _NoSpan:
+    """Shared stand-in for spans and action traces while tracing is off."""
+    __slots__ = ()
+    status = property(lambda self: None, lambda self, value: None)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+class _Span:
+    """Adds its wall time to the current action's record under `name`."""
+    __slots__ = ('record', 'name', 'start')
+    
+    def __init__(self, record, name):
+        self.record = record
+        self.name = name
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        spans = self.record['spans']
+        spans[self.name] = round(spans.get(self.name, 0) + (time.perf_counter() - self.start) * 1000, 3)
+        return False
+
+class _ActionTrace:
+    """Context manager around one action; writes its trace line on exit."""
+    
+    def __init__(self, tracer, action, mode):
+        self.tracer = tracer
+        self.action = action
+        self.mode = mode
+        self.status = None
+        self.record = {'spans': {}, 'counters': {}, 'errors': []}
+    
+    def __enter__(self):
+        self.token = self.tracer.current.set(self.record)
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        ms = (time.perf_counter() - self.start) * 1000
+        self.tracer.current.reset(self.token)
+        status = self.status
+        if status is None:
+            status = (exc.code if isinstance(exc, SystemExit) else 1) if exc_type else 0
+        self.tracer.finish(self.action, self.mode, ms, status, self.record)
+        return False
+
+class Tracer:
+    """Spans per action (tracked through a contextvar, so batch/daemon actions
+    running concurrently keep separate records) and per-process counters."""
+    
+    def __init__(self):
+        import contextvars
+        self.enabled = False
+        self.mode = 'cli'
+        self.current = contextvars.ContextVar('trace_record', default=None)
+        self.counters = {}
+        self.histograms = {}  # action -> [bucket counts..., sum seconds, count]
+    
+    def configure(self, env, mode=None):
+        if mode:
+            self.mode = mode
+        flag = os.environ.get('TWITTER_TRACE') or env.get('TWITTER_TRACE', '')
+        self.enabled = flag not in ('', '0') or bool(env.get('TWITTER_METRICS_PORT'))
+    
+    def action(self, action, mode=None):
+        """Trace an action, unless tracing is off or an enclosing action is already traced."""
+        if not self.enabled or self.current.get() is not None:
+            return _NO_SPAN
+        return _ActionTrace(self, action, mode or self.mode)
+    
+    def span(self, name):
+        if not self.enabled:
+            return _NO_SPAN
+        record = self.current.get()
+        return _NO_SPAN if record is None else _Span(record, name)
+    
+    def add_span(self, name, ms):
+        """Record a phase that was timed before its action started (module load)."""
+        record = self.current.get() if self.enabled else None
+        if record is not None:
+            record['spans'][name] = round(record['spans'].get(name, 0) + ms, 3)
+    
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        self.counters[name] = self.counters.get(name, 0) + n
+        record = self.current.get()
+        if record is not None:
+            record['counters'][name] = record['counters'].get(name, 0) + n
+    
+    def error(self, where, e):
+        """A best-effort step failed: count it and keep the message on the action's record."""
+        if not self.enabled:
+            return
+        self.count(f'{where}_errors')
+        record = self.current.get()
+        if record is not None:
+            record['errors'].append(f'{where}: {type(e).__name__}: {e}')
+    
+    def finish(self, action, mode, ms, status, record):
+        hist = self.histograms.setdefault(action, [0] * len(METRICS_BUCKETS) + [0.0, 0])
+        seconds = ms / 1000
+        for i, bound in enumerate(METRICS_BUCKETS):
+            if seconds <= bound:
+                hist[i] += 1
+        hist[-2] += seconds
+        hist[-1] += 1
+        line = {'ts': round(time.time(), 3), 'pid': os.getpid(), 'mode': mode, 'action': action,
+                'status': status, 'ms': round(ms, 3), 'spans': record['spans']}
+        if record['counters']:
+            line['counters'] = record['counters']
+        if record['errors']:
+            line['errors'] = record['errors']
+        try:
+            _trace_write(json.dumps(line) + '\n')
+        except OSError:
+            pass
+    
+    def prometheus(self):
+        """Counters, latency histograms and connection stats in Prometheus text format."""
+        out = ['# TYPE spirit_twitter_action_seconds histogram']
+        for action, hist in sorted(self.histograms.items()):
+            for bound, n in zip(METRICS_BUCKETS, hist):
+                out.append(f'spirit_twitter_action_seconds_bucket{{action="{action}",le="{bound}"}} {n}')
+            out.append(f'spirit_twitter_action_seconds_bucket{{action="{action}",le="+Inf"}} {hist[-1]}')
+            out.append(f'spirit_twitter_action_seconds_sum{{action="{action}"}} {hist[-2]:.6f}')
+            out.append(f'spirit_twitter_action_seconds_count{{action="{action}"}} {hist[-1]}')
+        out.append('# TYPE spirit_twitter_events_total counter')
+        for name, n in sorted(self.counters.items()):
+            out.append(f'spirit_twitter_events_total{{event="{name}"}} {n}')
+        out.append('# TYPE spirit_twitter_http_requests_total counter')
+        from twitter_client import _net_stats
+        for client, stats in _net_stats.items():
+            summary = stats.summary()
+            out.append(f'spirit_twitter_http_requests_total{{client="{client}"}} {summary["requests"]}')
+            out.append(f'spirit_twitter_http_new_connections_total{{client="{client}"}} {summary["new_connections"]}')
+        return '\n'.join(out) + '\n'
+
+def _trace_write(line):
+    """Append to the trace file, rotating it once it grows past TRACE_MAX_BYTES."""
+    try:
+        size = os.path.getsize(TRACE_FILE)
+    except OSError:
+        size = 0
+    if size > TRACE_MAX_BYTES:
+        for i in range(TRACE_ROTATIONS - 1, 0, -1):
+            if os.path.exists(f'{TRACE_FILE}.{i}'):
+                os.replace(f'{TRACE_FILE}.{i}', f'{TRACE_FILE}.{i + 1}')
+        os.replace(TRACE_FILE, f'{TRACE_FILE}.1')
+    # One write of one line on an O_APPEND file: lines from concurrent processes don't interleave
+    with open(TRACE_FILE, 'a') as f:
+        f.write(line)
+
+def _percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+def trace_stats(since=None, only=None):
+    """p50/p99 latency per action and mode (plus per-phase p50s and summed counters) from the trace files."""
+    records = []
+    for path in [f'{TRACE_FILE}.{i}' for i in range(TRACE_ROTATIONS, 0, -1)] + [TRACE_FILE]:
+        try:
+            with open(path) as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError:
+            continue
+    if since:
+        records = [r for r in records if r.get('ts', 0) >= since]
+    if only:
+        records = [r for r in records if r.get('action') == only]
+    
+    groups, counters = {}, {}
+    for r in records:
+        groups.setdefault(r.get('action'), {}).setdefault(r.get('mode', 'cli'), []).append(r)
+        for name, n in (r.get('counters') or {}).items():
+            counters[name] = counters.get(name, 0) + n
+    
+    actions = {}
+    for action, modes in sorted(groups.items(), key=lambda kv: str(kv[0])):
+        actions[action] = {}
+        for mode, rs in sorted(modes.items()):
+            ms = sorted(r['ms'] for r in rs)
+            phases = {}
+            for r in rs:
+                for name, v in (r.get('spans') or {}).items():
+                    phases.setdefault(name, []).append(v)
+            actions[action][mode] = {
+                'n': len(ms),
+                'errors': sum(1 for r in rs if r.get('status')),
+                'p50_ms': round(_percentile(ms, 0.5), 2),
+                'p99_ms': round(_percentile(ms, 0.99), 2),
+                'mean_ms': round(sum(ms) / len(ms), 2),
+                'phases_p50_ms': {name: round(_percentile(sorted(v), 0.5), 2) for name, v in sorted(phases.items())},
+            }
+    return {'records': len(records), 'actions': actions, 'counters': dict(sorted(counters.items()))}
+
+async def _serve_metrics(port):
+    """Minimal HTTP endpoint answering every GET with the Prometheus text exposition."""
+    import asyncio
+    async def handle(reader, writer):
+        try:
+            while (await reader.readline()).strip():
+                pass
+            body = _tracer.prometheus().encode()
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n'
+                         b'Content-Length: ' + str(len(body)).encode() + b'\r\nConnection: close\r\n\r\n' + body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    return await asyncio.start_server(handle, '127.0.0.1', port)
+
+_tracer = Tracer()
+
+# --- Output shaping ---
+# `--fields id,text,likes` keeps only those keys of every tweet/user/message in
+# a result, `--max-text N` cuts text and bios to N characters, and `--columns`
+# turns each list of records into {"columns": [keys], "rows": [[values], ...]}
+# (a stream prints the column line once, then one array per record). Shaped
+# output is encoded without whitespace. Batch and daemon requests carry the
+# same options as "fields", "max_text" and "columns" keys.
+SHAPE_TEXT_KEYS = ('text', 'bio')
+SHAPE_RECORD_KEYS = ('tweet', 'user')  # single records inside a result
+
+class Shape:
+    __slots__ = ('fields', 'max_text', 'columns')
+    
+    def __init__(self, fields=None, max_text=None, columns=False):
+        self.fields = fields
+        self.max_text = max_text
+        self.columns = columns
+    
+    @classmethod
+    def parse(cls, args):
+        """Pop --fields/--max-text/--columns from args. Returns (Shape or None, remaining args)."""
+        fields, args = _pop_flag(args, '--fields')
+        max_text, args = _pop_flag(args, '--max-text')
+        columns = '--columns' in args
+        if columns:
+            args = [a for a in args if a != '--columns']
+        try:
+            return cls._make(fields, max_text, columns), args
+        except ValueError as e:
+            raise ActionError(str(e))
+    
+    @classmethod
+    def from_request(cls, req, default=None):
+        """Shape named by a batch/daemon request, or `default`. Raises ValueError."""
+        if not isinstance(req, dict) or not any(k in req for k in ('fields', 'max_text', 'columns')):
+            return default
+        return cls._make(req.get('fields'), req.get('max_text'), bool(req.get('columns')))
+    
+    @classmethod
+    def _make(cls, fields, max_text, columns):
+        if isinstance(fields, str):
+            fields = [f.strip() for f in fields.split(',') if f.strip()]
+        if fields is not None and (not isinstance(fields, list) or not fields):
+            raise ValueError('Bad request: "fields" must be a non-empty list or comma-separated string')
+        if max_text is not None:
+            try:
+                max_text = int(max_text)
+            except (TypeError, ValueError):
+                max_text = -1
+            if max_text < 0:
+                raise ValueError('max_text must be a non-negative number')
+        if fields is None and max_text is None and not columns:
+            return None
+        return cls(fields and [str(f) for f in fields], max_text, columns)
+    
+    def request(self):
+        """The request keys that carry this shape to the daemon."""
+        return {'fields': self.fields, 'max_text': self.max_text, 'columns': self.columns}
+    
+    def record(self, rec):
+        """Projected copy of one record; cached records are never modified."""
+        if self.fields is not None:
+            rec = {k: rec[k] for k in self.fields if k in rec}
+        elif self.max_text is not None:
+            rec = dict(rec)
+        if self.max_text is not None:
+            for key in SHAPE_TEXT_KEYS:
+                if isinstance(rec.get(key), str):
+                    rec[key] = rec[key][:self.max_text]
+        return rec
+    
+    def _keys(self, records):
+        if self.fields is not None:
+            return self.fields
+        keys = {}
+        for rec in records:
+            keys.update(dict.fromkeys(rec))
+        return list(keys)
+    
+    def apply(self, value, is_record=False):
+        """Shaped copy of an action result."""
+        if isinstance(value, dict):
+            if is_record:
+                return self.record(value)
+            return {k: self.apply(v, k in SHAPE_RECORD_KEYS) for k, v in value.items()}
+        if isinstance(value, list) and value and all(isinstance(v, dict) for v in value):
+            records = [self.record(v) for v in value]
+            if not self.columns:
+                return records
+            keys = self._keys(records)
+            return {'columns': keys, 'rows': [[rec.get(k) for k in keys] for rec in records]}
+        return value
+    
+    def stream(self, emit):
+        """Wrap a stream's per-record emit()."""
+        if not self.columns:
+            return lambda rec: emit(self.record(rec))
+        keys = None
+        
+        def emit_row(rec):
+            nonlocal keys
+            rec = self.record(rec)
+            if keys is None:
+                keys = self._keys([rec])
+                emit({'columns': keys})
+            emit([rec.get(k) for k in keys])
+        return emit_row
+
+def _encode(obj, shape=None):
+    """One output line; shaped output drops the separator whitespace."""
+    if shape is None:
+        return json.dumps(obj)
+    return json.dumps(obj, separators=(',', ':'))
+
+# --- Daemon client ---
+def _connect_daemon():
+    """Connect to a running daemon. Returns a socket or None."""
+    import socket
+    if not os.path.exists(SOCKET_FILE):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(SOCKET_FILE)
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+def _forward(action, args, account=None, shape=None):
+    """Send one action to the daemon. Returns (status, result), or None if no daemon is running."""
+    sock = _connect_daemon()
+    if sock is None:
+        return None
+    # Once connected we never fall back: the daemon may already have run the action
+    with sock, _tracer.action(action, 'forward') as trace:
+        try:
+            req = {'action': action, 'args': args}
+            if account is not None:
+                req['account'] = account
+            if shape is not None:
+                req.update(shape.request())
+            sock.sendall(json.dumps(req).encode() + b'\n')
+            line = sock.makefile('rb').readline()
+            resp = json.loads(line)
+            trace.status = resp['status']
+            return resp['status'], resp['result']
+        except (OSError, ValueError, KeyError):
+            trace.status = 1
+            return 1, {'error': 'Lost connection to twitter.py daemon'}
+
+def _forward_stream(request):
+    """Send a batch/stream request to the daemon, printing each streamed line.
+    
+    Returns the final {"status", "result"} line, or None if no daemon is running.
+    """
+    sock = _connect_daemon()
+    if sock is None:
+        return None
+    with sock:
+        try:
+            sock.sendall(json.dumps(request).encode() + b'\n')
+            out = sys.stdout.buffer
+            for line in sock.makefile('rb'):
+                resp = json.loads(line)
+                if isinstance(resp, dict) and resp.get('done'):
+                    return resp
+                # Already encoded (and shaped) by the daemon
+                out.write(line)
+                out.flush()
+        except (OSError, ValueError):
+            pass
+    return {'status': 1, 'result': {'error': 'Lost connection to twitter.py daemon'}}
+
+def _source_files():
+    """File names of the skill modules this process has loaded."""
+    files = set()
+    for module in list(sys.modules.values()):
+        path = getattr(module, '__file__', None)
+        if path and os.path.dirname(os.path.abspath(path)) == SCRIPT_DIR:
+            files.add(os.path.basename(path))
+    return sorted(files)
+
+def _code_version(files):
+    """Short hash of those files as they are on disk now."""
+    import hashlib
+    digest = hashlib.sha1()
+    for name in files:
+        digest.update(name.encode() + b'\0')
+        try:
+            with open(os.path.join(SCRIPT_DIR, name), 'rb') as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(b'\0missing')
+    return digest.hexdigest()[:12]
+
+# --- CLI ---
+async def _with_client(env, work):
+    """Log in and return await work(client); a login failure prints the error and exits 1."""
+    from twitter_client import get_client
+    try:
+        client = await get_client(env)
+    except ActionError as e:
+        print(json.dumps({'error': str(e)}))
+        sys.exit(1)
+    return await work(client)
+
+def main():
+    # Only paths that talk to Twitter import asyncio (and, through get_client,
+    # twikit): help, ping, local actions, dedup skips and daemon forwarding
+    # run on the bare interpreter. Help, ping and forwarding don't load the
+    # action modules either.
+    started = time.perf_counter()
+    argv = sys.argv[1:]
+    account_id = None
+    if argv[:1] == ['--account']:
+        account_id, argv = (argv[1:2] or [''])[0], argv[2:]
+    if not argv:
+        print(__doc__)
+        sys.exit(1)
+    
+    action = argv[0]
+    args = argv[1:]
+    env = load_env()
+    _tracer.configure(env, 'batch' if action == 'batch' else 'cli')
+    try:
+        shape, args = Shape.parse(args)
+    except ActionError as e:
+        print(json.dumps({'error': str(e)}))
+        sys.exit(1)
+    
+    if action == 'serve':
+        import asyncio
+        from twitter_daemon import serve
+        try:
+            asyncio.run(serve(env))
+        except ActionError as e:
+            print(json.dumps({'error': str(e)}))
+            sys.exit(1)
+        return
+    
+    try:
+        account = Account(account_id or os.environ.get('TWITTER_ACCOUNT') or env.get('TWITTER_ACCOUNT') or None, env)
+    except ActionError as e:
+        print(json.dumps({'error': str(e)}))
+        sys.exit(1)
+    with account.use():
+        _run_cli(env, account, action, args, started, shape)
+
+def _run_cli(env, account, action, args, started, shape=None):
+    """main() for one action as `account` (the current account), printing results shaped by `shape`."""
+    if action == 'batch':
+        from twitter_batch import AccountPool, _batch_args, run_batch
+        try:
+            requests, concurrency = _batch_args(args, env)
+        except (OSError, ValueError) as e:
+            print(json.dumps({'error': f'Bad batch input: {e}'}))
+            sys.exit(1)
+        request = {'action': 'batch', 'requests': requests, 'concurrency': concurrency, 'account': account.id}
+        if shape is not None:
+            request.update(shape.request())
+        forwarded = _forward_stream(request)
+        if forwarded is not None:
+            if 'error' in forwarded['result']:
+                print(json.dumps(forwarded['result']))
+            sys.exit(forwarded['status'])
+        import asyncio
+        emit = lambda d: print(_encode(d, shape), flush=True)
+        sys.exit(asyncio.run(run_batch(AccountPool(env), requests, concurrency, emit, account.id, shape)))
+    
+    env = account.env
+    if '--stream' in args:
+        from twitter_actions import STREAM_ACTIONS, _run_stream
+        if action in STREAM_ACTIONS:
+            # NDJSON records on stdout, the summary (or error) on stderr
+            args = [action] + [a for a in args if a != '--stream']
+            request = {'action': 'stream', 'args': args, 'account': account.id}
+            if shape is not None:
+                request.update(shape.request())
+            forwarded = _forward_stream(request)
+            if forwarded is not None:
+                status, result = forwarded['status'], forwarded['result']
+            else:
+                import asyncio
+                emit = lambda d: print(_encode(d, shape), flush=True)
+                if shape is not None:
+                    emit = shape.stream(emit)
+                status, result = asyncio.run(_with_client(env, lambda client: _run_stream(client, args, emit)))
+            print(json.dumps(result), file=sys.stderr)
+            sys.exit(status)
+    
+    forwarded = _forward(action, args, account.id, shape)
+    if forwarded is not None:
+        status, result = forwarded
+        if action == 'ping' and isinstance(result, dict) and result.get('daemon'):
+            # Stale: the daemon runs code that has changed on disk since it started
+            result['stale'] = _code_version(result.get('files') or []) != result.get('code')
+        print(_encode(result, shape))
+        sys.exit(status)
+    
+    if action == 'ping':
+        print(json.dumps({'ok': False, 'daemon': False}))
+        sys.exit(1)
+    
+    # The action modules count towards module_load, not towards the action
+    loading = time.perf_counter()
+    from twitter_actions import (_outbox_pending, _skip_result, _spawn_flusher, execute, execute_local,
+                                 lookup_action)
+    module_load = started - _MODULE_START + time.perf_counter() - loading
+    try:
+        spec = lookup_action(action, args)
+    except ActionError as e:
+        print(json.dumps({'error': str(e)}))
+        sys.exit(1)
+    
+    if spec.local:
+        status, result = execute_local(env, action, args)
+        print(_encode(result if shape is None else shape.apply(result), shape))
+        sys.exit(status)
+    
+    with _tracer.action(action) as trace:
+        _tracer.add_span('module_load', module_load * 1000)
+        # Dedup check — block duplicate write actions before paying for a client
+        skipped = _skip_result(action, args)
+        if skipped:
+            print(json.dumps(skipped))
+            sys.exit(0)
+        
+        import asyncio
+        status, result = asyncio.run(_with_client(env, lambda client: execute(client, env, action, args)))
+        trace.status = status
+    print(_encode(result if shape is None else shape.apply(result), shape), flush=True)
+    # Hand queued platform reports to a background flusher instead of waiting on them
+    if spec.report and status == 0 and _outbox_pending():
+        _spawn_flusher(account.id)
+    sys.exit(status)
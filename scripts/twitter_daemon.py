@@ -0,0 +1,154 @@
+"""
+twitter.py's daemon: `twitter.py serve` and the background tasks it runs.
+"""
+
+import json
+import os
+import sys
+
+import twitter_batch
+from twitter_actions import _outbox_loop, _run_stream
+from twitter_batch import BATCH_CONCURRENCY, AccountPool, _parse_request, _request_account, run_batch
+from twitter_core import (SOCKET_FILE, ActionError, Shape, _code_version, _connect_daemon, _encode,
+                          _serve_metrics, _source_files, _tracer, list_accounts)
+from twitter_stores import ENGAGEMENT_INTERVAL, _engagement
+
+# --- Daemon mode ---
+# `twitter.py serve` keeps one authenticated client (and its connection pool)
+# alive and answers newline-delimited JSON requests on a Unix socket:
+#   -> {"action": "like", "args": ["123"], "id": "optional"}
+#   <- {"status": 0, "result": {...}, "id": "optional"}
+# A batch request ({"action": "batch", "requests": [...], "concurrency": N})
+# streams one line per request, and a stream request ({"action": "stream",
+# "args": ["followers", "bob", "5000"]}) one line per record; both end with a
+# line carrying "done": true.
+# Every other invocation first tries to forward to the daemon and falls back
+# to running in-process when no daemon is listening.
+
+async def _serve_connection(pool, reader, writer):
+    import asyncio
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            req = None
+            try:
+                req = json.loads(line)
+                action, args = _parse_request(req)
+                account_id = _request_account(req)
+                shape = Shape.from_request(req)
+            except ValueError as e:
+                shape = None
+                resp = {'status': 1, 'result': {'error': str(e)}}
+            else:
+                emit = lambda d: writer.write(_encode(d, shape).encode() + b'\n')
+                if action == 'batch':
+                    requests = req.get('requests', [])
+                    concurrency = int(req.get('concurrency') or BATCH_CONCURRENCY)
+                    status = await run_batch(pool, requests, concurrency, emit, account_id, shape)
+                    resp = {'status': status, 'result': {'ok': status == 0, 'batch': len(requests)}, 'done': True}
+                elif action == 'stream':
+                    records = emit if shape is None else shape.stream(emit)
+                    status, result = await pool.call(
+                        account_id, lambda account, client: _run_stream(client, args, records, writer.drain))
+                    resp = {'status': status, 'result': result, 'done': True}
+                elif action == 'ping':
+                    resp = {'status': 0, 'result': {'ok': True, 'daemon': True, 'pid': os.getpid(), **_loaded_code}}
+                else:
+                    status, result = await pool.execute(account_id, action, args)
+                    resp = {'status': status, 'result': result if shape is None else shape.apply(result)}
+            if isinstance(req, dict) and 'id' in req:
+                resp['id'] = req['id']
+            writer.write(_encode(resp, shape).encode() + b'\n')
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+async def _engagement_loop(pool, interval):
+    """Daemon background task: snapshot every account with a known handle once per interval."""
+    import asyncio
+    while True:
+        for account_id in [None, *list_accounts()]:
+            try:
+                account = pool.account(account_id)
+                with account.use():
+                    age = _engagement.age()
+                    if not (_engagement.handle() or account.env.get('X_HANDLE')):
+                        continue
+                if age is not None and age < interval:
+                    continue  # a context build took one recently
+                status, result = await pool.execute(account_id, 'snapshot', [])
+                if status:
+                    raise RuntimeError(result.get('error'))
+            except Exception as e:
+                _tracer.error('snapshot', e)
+                print(f'⚠️ Engagement snapshot failed for {account_id or "default"}: {e}', file=sys.stderr)
+        pool.evict()
+        await asyncio.sleep(interval)
+
+_loaded_code = {}  # the daemon's {'code', 'files'} as of startup
+
+def _bind_socket(path):
+    """A listening Unix socket at path that only our user can connect to."""
+    import socket
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # Bound under a restrictive umask: a chmod after bind leaves a window where anyone can connect
+    umask = os.umask(0o177)
+    try:
+        sock.bind(path)
+    except OSError:
+        sock.close()
+        raise
+    finally:
+        os.umask(umask)
+    return sock
+
+async def serve(env):
+    """Run the daemon until killed; SIGTERM shuts it down cleanly."""
+    import asyncio
+    import signal
+    sock = _connect_daemon()
+    if sock is not None:
+        sock.close()
+        raise ActionError(f'Daemon already running on {SOCKET_FILE}')
+    _tracer.configure(env, 'daemon')
+    pool = twitter_batch._pool = AccountPool(env)
+    try:
+        # Warm the default account's session; only fatal when there are no other accounts
+        await pool.session(pool.account(None))
+    except ActionError:
+        if not list_accounts():
+            raise
+    # What `ping` compares against the files on disk to spot a skill update
+    files = _source_files()
+    _loaded_code.update(code=_code_version(files), files=files)
+    outbox_task = asyncio.ensure_future(_outbox_loop(pool))
+    interval = float(env.get('TWITTER_ENGAGEMENT_INTERVAL', '') or ENGAGEMENT_INTERVAL)
+    engagement_task = asyncio.ensure_future(_engagement_loop(pool, interval)) if interval > 0 else None
+    metrics = None
+    if env.get('TWITTER_METRICS_PORT'):
+        metrics = await _serve_metrics(int(env['TWITTER_METRICS_PORT']))
+        print(f'📈 Prometheus metrics on http://127.0.0.1:{env["TWITTER_METRICS_PORT"]}/metrics', file=sys.stderr)
+    if os.path.exists(SOCKET_FILE):
+        os.unlink(SOCKET_FILE)
+    server = await asyncio.start_unix_server(
+        lambda r, w: _serve_connection(pool, r, w), sock=_bind_socket(SOCKET_FILE))
+    print(f'🐦 twitter.py daemon listening on {SOCKET_FILE} (pid {os.getpid()})', file=sys.stderr)
+    stop = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        outbox_task.cancel()
+        if engagement_task is not None:
+            engagement_task.cancel()
+        for session in pool.sessions.values():
+            session.account.close()
+        if metrics is not None:
+            metrics.close()
+        if os.path.exists(SOCKET_FILE):
+            os.unlink(SOCKET_FILE)
@@ -0,0 +1,854 @@
+"""
+twitter.py's local state: dedup and reply logs, the tweet archive, the
+near-duplicate index, engagement history and the metadata cache.
+"""
+
+import json
+import os
+import time
+
+from twitter_core import SCRIPT_DIR, ActionError, _AccountState, _account, _path, _tracer
+
+# --- Dedup system ---
+DEDUP_DB = os.path.join(SCRIPT_DIR, '..', '.dedup.db')
+DEDUP_FILE = os.path.join(SCRIPT_DIR, '..', '.dedup_cache.json')  # legacy, migrated into DEDUP_DB
+DEDUP_MAX_AGE = 3600 * 6  # 6 hours
+DEDUP_MAX_ENTRIES = 200000
+
+def _dedup_key(action, args):
+    """Generate a unique key for an action. Returns None if not dedup-able."""
+    from twitter_actions import ACTIONS
+    spec = ACTIONS.get(action)
+    if spec is not None and spec.dedup and args:
+        return f"{action}:{args[0]}"
+    # Replies are NOT deduped here — managed via reply log + agent awareness
+    return None
+
+def _dedup_db():
+    """Open the dedup store, migrating the legacy .dedup_cache.json on first use.
+    
+    One SQLite row per key in WAL mode: lookups hit the primary key, expiry and
+    eviction are indexed range deletes, and concurrent writers from several
+    processes serialize on SQLite's lock instead of clobbering a JSON file.
+    """
+    state = _account().state
+    if 'dedup' not in state:
+        import sqlite3
+        conn = sqlite3.connect(_path(DEDUP_DB), timeout=10, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS dedup (id INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE, ts REAL NOT NULL)')
+        conn.execute('CREATE INDEX IF NOT EXISTS dedup_ts ON dedup (ts)')
+        legacy_file = _path(DEDUP_FILE)
+        if os.path.exists(legacy_file):
+            try:
+                with open(legacy_file) as f:
+                    legacy = json.load(f)
+                conn.executemany('INSERT OR IGNORE INTO dedup (key, ts) VALUES (?, ?)',
+                                 sorted(legacy.items(), key=lambda kv: kv[1]))
+                os.replace(legacy_file, legacy_file + '.migrated')
+            except (OSError, ValueError, AttributeError):
+                pass
+        state['dedup'] = conn
+    return state['dedup']
+
+def _is_duplicate(action, args):
+    """Check if this action was already performed recently."""
+    key = _dedup_key(action, args)
+    if key is None:
+        return False
+    import sqlite3
+    try:
+        row = _dedup_db().execute('SELECT 1 FROM dedup WHERE key = ? AND ts > ?',
+                                  (key, time.time() - DEDUP_MAX_AGE)).fetchone()
+    except sqlite3.Error:
+        return False
+    return row is not None
+
+# --- Reply log ---
+REPLY_LOG_FILE = os.path.join(SCRIPT_DIR, '..', '.reply_log.json')
+REPLY_LOG_MAX_AGE = 3600 * 24  # 24 hours
+REPLY_LOG_MAX_ENTRIES = 200
+
+def _log_reply(tweet_id, text):
+    """Log a reply for agent awareness."""
+    path = _path(REPLY_LOG_FILE)
+    try:
+        log = []
+        if os.path.exists(path):
+            with open(path) as f:
+                log = json.load(f)
+        now = time.time()
+        # Clean old entries
+        log = [e for e in log if now - e.get('ts', 0) < REPLY_LOG_MAX_AGE]
+        log.append({'tweet_id': tweet_id, 'text': text[:200], 'ts': now})
+        # Cap size
+        if len(log) > REPLY_LOG_MAX_ENTRIES:
+            log = log[-REPLY_LOG_MAX_ENTRIES:]
+        with open(path, 'w') as f:
+            json.dump(log, f)
+    except Exception as e:
+        _tracer.error('reply_log', e)
+
+def get_reply_log():
+    """Get recent replies for injection into agent loop."""
+    path = _path(REPLY_LOG_FILE)
+    try:
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            log = json.load(f)
+        now = time.time()
+        return [e for e in log if now - e.get('ts', 0) < REPLY_LOG_MAX_AGE]
+    except Exception:
+        return []
+
+def _record_action(action, args):
+    """Record an action in the dedup cache."""
+    key = _dedup_key(action, args)
+    if key is None:
+        return
+    import sqlite3
+    now = time.time()
+    try:
+        conn = _dedup_db()
+        # REPLACE re-inserts the key with a fresh id, so ids stay in ts order
+        conn.execute('INSERT OR REPLACE INTO dedup (key, ts) VALUES (?, ?)', (key, now))
+        # Clean old entries and cap size — both touch only the rows they delete
+        conn.execute('DELETE FROM dedup WHERE ts < ?', (now - DEDUP_MAX_AGE,))
+        conn.execute('DELETE FROM dedup WHERE id <= (SELECT MAX(id) FROM dedup) - ?', (DEDUP_MAX_ENTRIES,))
+    except sqlite3.Error:
+        pass
+
+# --- Tweet archive ---
+# Every tweet we serialize (timeline, search, notifications, lookups) and every
+# tweet we post lands in a local SQLite archive with an FTS5 index on the text
+# and b-tree indexes on author, conversation and reply target, so "did we reply
+# here already?" or "what did we say about $TICKER this week?" never needs a
+# search round-trip. Rows are buffered and written once per action; retention
+# keeps our own posts for a year and everything else for 30 days.
+ARCHIVE_DB = os.path.join(SCRIPT_DIR, '..', '.archive.db')
+ARCHIVE_RETENTION = 86400 * 30
+ARCHIVE_OWN_RETENTION = 86400 * 365
+ARCHIVE_MAX_ROWS = 200000
+ARCHIVE_FLUSH_EVERY = 500  # pending rows; keeps long streams from buffering everything
+
+class TweetArchive:
+    """Append-mostly store of seen and posted tweets with a full-text index."""
+    
+    def __init__(self, path):
+        self.path = path
+        self.pending = {}  # id -> row
+        self._conn = None
+    
+    def _db(self):
+        if self._conn is None:
+            import sqlite3
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS tweets (
+                    rowid INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, author TEXT, conversation_id TEXT,
+                    reply_to TEXT, text TEXT NOT NULL, data TEXT NOT NULL, source TEXT, ts REAL NOT NULL,
+                    ours INTEGER NOT NULL DEFAULT 0, seen INTEGER NOT NULL DEFAULT 0);
+                CREATE INDEX IF NOT EXISTS tweets_author ON tweets (author, ts);
+                CREATE INDEX IF NOT EXISTS tweets_conversation ON tweets (conversation_id);
+                CREATE INDEX IF NOT EXISTS tweets_reply_to ON tweets (reply_to);
+                CREATE INDEX IF NOT EXISTS tweets_ours ON tweets (ours, ts);
+                CREATE INDEX IF NOT EXISTS tweets_unseen ON tweets (source, seen);
+                CREATE VIRTUAL TABLE IF NOT EXISTS tweets_fts USING fts5(text, content='tweets', content_rowid='rowid');
+                CREATE TRIGGER IF NOT EXISTS tweets_ai AFTER INSERT ON tweets BEGIN
+                    INSERT INTO tweets_fts (rowid, text) VALUES (new.rowid, new.text);
+                END;
+                CREATE TRIGGER IF NOT EXISTS tweets_ad AFTER DELETE ON tweets BEGIN
+                    INSERT INTO tweets_fts (tweets_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+                END;
+                CREATE TRIGGER IF NOT EXISTS tweets_au AFTER UPDATE OF text ON tweets BEGIN
+                    INSERT INTO tweets_fts (tweets_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+                    INSERT INTO tweets_fts (rowid, text) VALUES (new.rowid, new.text);
+                END;
+            ''')
+            self._conn = conn
+        return self._conn
+    
+    def add(self, tweet, conversation_id=None, reply_to=None, source=None, ours=False):
+        """Buffer a serialized tweet dict for the next save()."""
+        if not tweet.get('id') or tweet.get('text') is None:
+            return
+        self.pending[str(tweet['id'])] = (str(tweet['id']), tweet.get('user'), conversation_id, reply_to,
+                                          tweet['text'], json.dumps(tweet), source, time.time(), int(ours))
+        if len(self.pending) >= ARCHIVE_FLUSH_EVERY:
+            self.save()
+    
+    def add_own(self, tweet_id, text, reply_to=None):
+        """Record a tweet we just posted; replies inherit the parent's conversation."""
+        conversation_id = self._conversation_of(reply_to) if reply_to else str(tweet_id)
+        self.add({'id': tweet_id, 'text': text}, conversation_id=conversation_id, reply_to=reply_to,
+                 source='own', ours=True)
+    
+    def _conversation_of(self, tweet_id):
+        import sqlite3
+        tweet_id = str(tweet_id)
+        row = self.pending.get(tweet_id)
+        if row is not None:
+            return row[2] or tweet_id
+        try:
+            row = self._db().execute('SELECT conversation_id FROM tweets WHERE id = ?', (tweet_id,)).fetchone()
+        except sqlite3.Error:
+            row = None
+        return (row and row[0]) or tweet_id
+    
+    def save(self):
+        """Write buffered rows in one transaction, then apply retention."""
+        import sqlite3
+        if not self.pending:
+            return
+        rows = list(self.pending.values())
+        try:
+            conn = self._db()
+            with conn:
+                # Re-seeing a tweet refreshes its data but keeps first-seen ts, seen flag and ownership;
+                # a tweet first read elsewhere still becomes a notification once it shows up as one
+                conn.executemany('''
+                    INSERT INTO tweets (id, author, conversation_id, reply_to, text, data, source, ts, ours)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (id) DO UPDATE SET
+                        author = COALESCE(excluded.author, author),
+                        conversation_id = COALESCE(excluded.conversation_id, conversation_id),
+                        reply_to = COALESCE(excluded.reply_to, reply_to),
+                        text = excluded.text,
+                        data = CASE WHEN excluded.ours THEN data ELSE excluded.data END,
+                        source = CASE WHEN ours OR excluded.ours THEN 'own'
+                                      WHEN excluded.source = 'notifications' THEN 'notifications'
+                                      ELSE COALESCE(source, excluded.source) END,
+                        ours = MAX(ours, excluded.ours)
+                ''', rows)
+                self._prune(conn)
+        except sqlite3.Error:
+            return
+        self.pending.clear()
+    
+    def _prune(self, conn):
+        now = time.time()
+        conn.execute('DELETE FROM tweets WHERE ours = 0 AND ts < ?', (now - ARCHIVE_RETENTION,))
+        conn.execute('DELETE FROM tweets WHERE ts < ?', (now - ARCHIVE_OWN_RETENTION,))
+        conn.execute('DELETE FROM tweets WHERE rowid <= (SELECT MAX(rowid) FROM tweets) - ?', (ARCHIVE_MAX_ROWS,))
+    
+    def prune(self):
+        self.save()
+        if os.path.exists(self.path):
+            with self._db() as conn:
+                self._prune(conn)
+    
+    def _rows(self, sql, params=()):
+        self.save()
+        if not os.path.exists(self.path):
+            return []
+        return [dict(json.loads(data), archived_at=int(ts), ours=bool(ours))
+                for data, ts, ours in self._db().execute(sql, params)]
+    
+    def query(self, words, days=None, author=None, ours=False, limit=20):
+        """Newest tweets matching every word (FTS5), optionally filtered by age/author/ownership."""
+        # Quote each word so $TICKER, @handles and FTS operators are matched literally
+        match = ' '.join('"' + w.replace('"', '""') + '"' for w in words.split())
+        where, params = [], []
+        if match:
+            where.append('rowid IN (SELECT rowid FROM tweets_fts WHERE tweets_fts MATCH ?)')
+            params.append(match)
+        if days:
+            where.append('ts >= ?')
+            params.append(time.time() - float(days) * 86400)
+        if author:
+            where.append('author = ?')
+            params.append(author.lstrip('@'))
+        if ours:
+            where.append('ours = 1')
+        sql = 'SELECT data, ts, ours FROM tweets'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        return self._rows(sql + ' ORDER BY rowid DESC LIMIT ?', (*params, int(limit)))
+    
+    def replied(self, tweet_id):
+        """Our tweets replying to tweet_id or anywhere in its conversation."""
+        conversation_id = self._conversation_of(tweet_id)
+        return self._rows('SELECT data, ts, ours FROM tweets WHERE ours = 1 AND (reply_to = ? OR conversation_id = ?) '
+                          'ORDER BY rowid DESC', (str(tweet_id), conversation_id))
+    
+    def unseen(self, limit=20, mark=True):
+        """Notification tweets not returned by an earlier unseen() call."""
+        self.save()
+        if not os.path.exists(self.path):
+            return []
+        conn = self._db()
+        with conn:
+            rows = conn.execute("SELECT rowid, data, ts FROM tweets WHERE source = 'notifications' AND seen = 0 "
+                                'ORDER BY rowid DESC LIMIT ?', (int(limit),)).fetchall()
+            if mark and rows:
+                conn.executemany('UPDATE tweets SET seen = 1 WHERE rowid = ?', [(r[0],) for r in rows])
+        return [dict(json.loads(data), archived_at=int(ts)) for _, data, ts in rows]
+    
+    def stats(self):
+        self.save()
+        if not os.path.exists(self.path):
+            return {'tweets': 0, 'ours': 0, 'unseen': 0, 'bytes': 0}
+        conn = self._db()
+        total, ours, unseen = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(ours), 0), COALESCE(SUM(source = 'notifications' AND seen = 0), 0) "
+            'FROM tweets').fetchone()
+        size = sum(os.path.getsize(f) for f in (self.path, self.path + '-wal') if os.path.exists(f))
+        return {'tweets': total, 'ours': ours, 'unseen': unseen, 'bytes': size}
+
+_archive = _AccountState('archive', lambda: TweetArchive(_path(ARCHIVE_DB)))
+
+# --- Near-duplicate guard ---
+# post/reply/quote text is compared against everything we posted recently
+# before create_tweet runs. Texts are reduced to character 5-gram shingles;
+# a one-permutation MinHash signature split into LSH bands finds candidate
+# posts through an indexed lookup, and only those candidates get an exact
+# Jaccard score, so a check stays well under a millisecond however long the
+# history is. Very short texts ("gm", "lfg") are never flagged.
+SIMILARITY_DB = os.path.join(SCRIPT_DIR, '..', '.similarity.db')
+SIMILARITY_THRESHOLD = 0.8  # Jaccard over shingles
+SIMILARITY_SHINGLE = 5  # characters
+SIMILARITY_MIN_SHINGLES = 8
+SIMILARITY_BINS = 32
+SIMILARITY_BAND = 4  # bins per LSH band -> 8 bands
+SIMILARITY_MAX_CANDIDATES = 200
+SIMILARITY_MAX_AGE = 86400 * 90
+SIMILARITY_MAX_ENTRIES = 50000
+SIMILARITY_KEY_VERSION = 1  # bumped when _lsh_keys changes; older indexes are re-keyed on open
+
+def _shingles(text):
+    """Hashed character shingles of text with case, links and @mentions normalized away."""
+    import re
+    import zlib
+    text = re.sub(r'https?://\S+|@\w+', ' ', text.lower())
+    text = ' '.join(re.findall(r'[\w$#]+', text))
+    k = SIMILARITY_SHINGLE
+    return {zlib.crc32(text[i:i + k].encode()) for i in range(len(text) - k + 1)}
+
+def _lsh_keys(shingles):
+    """Band keys of a one-permutation MinHash signature (empty bins borrow from the next filled one)."""
+    import struct
+    import zlib
+    bins = [None] * SIMILARITY_BINS
+    for h in shingles:
+        b, v = h % SIMILARITY_BINS, h // SIMILARITY_BINS
+        if bins[b] is None or v < bins[b]:
+            bins[b] = v
+    filled = [(i, v) for i, v in enumerate(bins) if v is not None]
+    for i in range(SIMILARITY_BINS):
+        if bins[i] is None:
+            bins[i] = next((v for j, v in filled if j > i), filled[0][1])
+    # Keys are persisted, so they come from crc32 like the shingles, not hash()
+    return [zlib.crc32(struct.pack(f'<{SIMILARITY_BAND + 1}I', band, *bins[band:band + SIMILARITY_BAND]))
+            for band in range(0, SIMILARITY_BINS, SIMILARITY_BAND)]
+
+class SimilarityIndex:
+    """LSH index of our recent post texts for near-duplicate checks."""
+    
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+    
+    def _db(self):
+        if self._conn is None:
+            import sqlite3
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            fresh = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'posts'").fetchone() is None
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS posts (
+                    rowid INTEGER PRIMARY KEY, tweet_id TEXT NOT NULL UNIQUE, text TEXT NOT NULL,
+                    shingles BLOB NOT NULL, ts REAL NOT NULL);
+                CREATE INDEX IF NOT EXISTS posts_ts ON posts (ts);
+                CREATE TABLE IF NOT EXISTS bands (key INTEGER NOT NULL, post INTEGER NOT NULL,
+                                                  PRIMARY KEY (key, post)) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS bands_post ON bands (post);
+                CREATE TRIGGER IF NOT EXISTS posts_ad AFTER DELETE ON posts BEGIN
+                    DELETE FROM bands WHERE post = old.rowid;
+                END;
+            ''')
+            self._conn = conn
+            if fresh:
+                self._backfill()
+            elif conn.execute('PRAGMA user_version').fetchone()[0] < SIMILARITY_KEY_VERSION:
+                self._rekey()
+            conn.execute(f'PRAGMA user_version = {SIMILARITY_KEY_VERSION}')
+        return self._conn
+    
+    def _rekey(self):
+        """Recompute every post's band keys from its stored shingles."""
+        from array import array
+        with self._conn as conn:
+            conn.execute('DELETE FROM bands')
+            for rowid, blob in conn.execute('SELECT rowid, shingles FROM posts').fetchall():
+                conn.executemany('INSERT OR IGNORE INTO bands VALUES (?, ?)',
+                                 [(key, rowid) for key in _lsh_keys(set(array('I', blob)))])
+    
+    def _backfill(self):
+        """Seed a new index with our posts from the tweet archive."""
+        import sqlite3
+        archive_db = _path(ARCHIVE_DB)
+        if not os.path.exists(archive_db):
+            return
+        try:
+            conn = sqlite3.connect(archive_db, timeout=10)
+            rows = conn.execute('SELECT id, text, ts FROM tweets WHERE ours = 1 AND ts > ?',
+                                (time.time() - SIMILARITY_MAX_AGE,)).fetchall()
+            conn.close()
+        except sqlite3.Error:
+            return
+        try:
+            with self._conn as conn:
+                for tweet_id, text, ts in rows:
+                    self._index(conn, tweet_id, text, ts)
+        except sqlite3.Error:
+            pass
+    
+    def _index(self, conn, tweet_id, text, ts):
+        from array import array
+        shingles = _shingles(text)
+        if len(shingles) < SIMILARITY_MIN_SHINGLES:
+            return
+        cur = conn.execute('INSERT OR REPLACE INTO posts (tweet_id, text, shingles, ts) VALUES (?, ?, ?, ?)',
+                           (str(tweet_id), text, array('I', shingles).tobytes(), ts))
+        conn.executemany('INSERT OR IGNORE INTO bands VALUES (?, ?)',
+                         [(key, cur.lastrowid) for key in _lsh_keys(shingles)])
+    
+    def add(self, tweet_id, text):
+        """Index a text we just posted."""
+        import sqlite3
+        now = time.time()
+        try:
+            conn = self._db()
+            with conn:
+                self._index(conn, tweet_id, text, now)
+                conn.execute('DELETE FROM posts WHERE ts < ?', (now - SIMILARITY_MAX_AGE,))
+                conn.execute('DELETE FROM posts WHERE rowid <= (SELECT MAX(rowid) FROM posts) - ?',
+                             (SIMILARITY_MAX_ENTRIES,))
+        except sqlite3.Error:
+            pass
+    
+    def check(self, text, threshold=SIMILARITY_THRESHOLD):
+        """(tweet_id, text, score) of the closest recent post at or above threshold, else None."""
+        import sqlite3
+        from array import array
+        shingles = _shingles(text)
+        if len(shingles) < SIMILARITY_MIN_SHINGLES or not os.path.exists(self.path):
+            return None
+        keys = _lsh_keys(shingles)
+        try:
+            rows = self._db().execute(
+                f'SELECT tweet_id, text, shingles FROM posts WHERE rowid IN '
+                f'(SELECT post FROM bands WHERE key IN ({",".join("?" * len(keys))})) AND ts > ? '
+                'ORDER BY rowid DESC LIMIT ?',
+                (*keys, time.time() - SIMILARITY_MAX_AGE, SIMILARITY_MAX_CANDIDATES)).fetchall()
+        except sqlite3.Error:
+            return None
+        best = None
+        for tweet_id, other_text, blob in rows:
+            other = set(array('I', blob))
+            overlap = len(shingles & other)
+            score = overlap / (len(shingles) + len(other) - overlap)
+            if score >= threshold and (best is None or score > best[2]):
+                best = (tweet_id, other_text, score)
+        return best
+
+_similar = _AccountState('similar', lambda: SimilarityIndex(_path(SIMILARITY_DB)))
+
+# --- Engagement history ---
+# `snapshot` reads our profile and latest tweets and appends one sample per
+# series (followers, and likes/retweets/replies/views per tweet) to a SQLite
+# time series. Each point stores only the change since the previous sample of
+# its series and unchanged samples are not stored at all; the series row keeps
+# the running totals, so the newest value is one lookup and the gain over any
+# window is a sum over the points inside it. Points older than a day are merged
+# into one per hour, older than a week into one per day, and a series that has
+# not been sampled for 30 days is dropped. `engagement` answers from the store
+# alone: per-tweet gains and rates and the top performers over 1h/24h/7d. With
+# TWITTER_ENGAGEMENT_INTERVAL > 0 the daemon takes a snapshot that often.
+ENGAGEMENT_DB = os.path.join(SCRIPT_DIR, '..', '.engagement.db')
+ENGAGEMENT_FIELDS = {'tweet': ('likes', 'retweets', 'replies', 'views'),
+                     'user': ('followers', 'following', 'tweets')}
+ENGAGEMENT_TIERS = ((86400, 3600), (86400 * 7, 86400))  # (points older than, merged per) seconds
+ENGAGEMENT_RETENTION = 86400 * 30
+ENGAGEMENT_COMPACT_EVERY = 3600
+ENGAGEMENT_WINDOWS = '1h,24h,7d'
+ENGAGEMENT_MIN_SPAN = 300  # rates over shorter spans are extrapolated from this
+ENGAGEMENT_INTERVAL = 300  # daemon snapshot cadence
+ENGAGEMENT_SNAPSHOT_COUNT = 20
+ENGAGEMENT_TOP = 5
+
+def _window_seconds(spec):
+    """'90m' / '24h' / '7d' -> seconds."""
+    units = {'m': 60, 'h': 3600, 'd': 86400}
+    try:
+        seconds = float(spec[:-1]) * units[spec[-1]]
+    except (KeyError, ValueError, IndexError):
+        raise ActionError(f'Bad window: {spec} (expected e.g. 1h, 24h, 7d)')
+    if seconds <= 0:
+        raise ActionError(f'Bad window: {spec} (expected e.g. 1h, 24h, 7d)')
+    return seconds
+
+def _tweet_epoch(created_at):
+    """Epoch seconds of a twikit created_at ('Wed Oct 10 20:19:24 +0000 2018'), or None."""
+    from datetime import datetime
+    try:
+        return datetime.strptime(created_at, '%a %b %d %H:%M:%S %z %Y').timestamp()
+    except (TypeError, ValueError):
+        return None
+
+class EngagementStore:
+    """Delta-encoded engagement samples of our own tweets and profile."""
+    
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+    
+    def _db(self):
+        if self._conn is None:
+            import sqlite3
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS series (
+                    id INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE, kind TEXT NOT NULL, created REAL,
+                    first_ts INTEGER NOT NULL, ts INTEGER NOT NULL,
+                    v0 INTEGER, v1 INTEGER, v2 INTEGER, v3 INTEGER, info TEXT);
+                CREATE INDEX IF NOT EXISTS series_ts ON series (ts);
+                CREATE TABLE IF NOT EXISTS points (
+                    series INTEGER NOT NULL, ts INTEGER NOT NULL,
+                    d0 INTEGER NOT NULL, d1 INTEGER NOT NULL, d2 INTEGER NOT NULL, d3 INTEGER NOT NULL,
+                    PRIMARY KEY (series, ts)) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            ''')
+            self._conn = conn
+        return self._conn
+    
+    def _meta(self, key):
+        import sqlite3
+        if not os.path.exists(self.path):
+            return None
+        try:
+            row = self._db().execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        except sqlite3.Error:
+            return None
+        return row and row[0]
+    
+    def handle(self):
+        """Screen name of the last snapshot."""
+        return self._meta('handle')
+    
+    def age(self, now=None):
+        """Seconds since the last snapshot, or None if there is none."""
+        sampled_at = self._meta('sampled_at')
+        return None if sampled_at is None else (now or time.time()) - float(sampled_at)
+    
+    def record(self, user, tweets, now=None):
+        """Append one sample of a serialized profile and our serialized tweets."""
+        now = int(now or time.time())
+        items = [('user:' + str(user['id']), 'user', user, None)]
+        items += [('tweet:' + str(t['id']), 'tweet', t, _tweet_epoch(t.get('created_at'))) for t in tweets]
+        conn = self._db()
+        with conn:
+            for key, kind, data, created in items:
+                fields = ENGAGEMENT_FIELDS[kind]
+                values = [data.get(f) for f in fields] + [None] * (4 - len(fields))
+                info = json.dumps(data if kind == 'user' else
+                                  {'id': str(data['id']), 'text': data.get('text'), 'created_at': data.get('created_at')})
+                row = conn.execute('SELECT id, v0, v1, v2, v3 FROM series WHERE key = ?', (key,)).fetchone()
+                if row is None:
+                    series = conn.execute('INSERT INTO series (key, kind, created, first_ts, ts, info) VALUES (?, ?, ?, ?, ?, ?)',
+                                          (key, kind, created, now, now, info)).lastrowid
+                    previous = [None] * 4
+                else:
+                    series, previous = row[0], list(row[1:])
+                # A missing count (twikit has no view count for older tweets) keeps the last value
+                current = [p if v is None else int(v) for v, p in zip(values, previous)]
+                deltas = [(c or 0) - (p or 0) for c, p in zip(current, previous)]
+                if row is None or any(deltas):
+                    conn.execute('''
+                        INSERT INTO points (series, ts, d0, d1, d2, d3) VALUES (?, ?, ?, ?, ?, ?)
+                        ON CONFLICT (series, ts) DO UPDATE SET
+                            d0 = d0 + excluded.d0, d1 = d1 + excluded.d1, d2 = d2 + excluded.d2, d3 = d3 + excluded.d3
+                    ''', (series, now, *deltas))
+                conn.execute('UPDATE series SET ts = ?, v0 = ?, v1 = ?, v2 = ?, v3 = ?, info = ? WHERE id = ?',
+                             (now, *current, info, series))
+            conn.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                             [('handle', user.get('username')), ('sampled_at', str(now))])
+            compacted = conn.execute("SELECT value FROM meta WHERE key = 'compacted_at'").fetchone()
+            if compacted is None or now - float(compacted[0]) >= ENGAGEMENT_COMPACT_EVERY:
+                self._compact(conn, now)
+    
+    def _compact(self, conn, now):
+        """Merge old points per tier bucket and drop series no longer sampled."""
+        for older_than, bucket in ENGAGEMENT_TIERS:
+            # A series' first point holds its totals at first sight; it is never merged
+            rows = conn.execute('SELECT p.series, p.ts, p.d0, p.d1, p.d2, p.d3 FROM points p '
+                                'JOIN series s ON s.id = p.series WHERE p.ts < ? AND p.ts > s.first_ts '
+                                'ORDER BY p.series, p.ts', (now - older_than,)).fetchall()
+            groups = {}
+            for series, ts, *deltas in rows:
+                groups.setdefault((series, ts // bucket), []).append((ts, deltas))
+            for (series, _), points in groups.items():
+                if len(points) < 2:
+                    continue
+                conn.executemany('DELETE FROM points WHERE series = ? AND ts = ?', [(series, ts) for ts, _ in points])
+                conn.execute('INSERT INTO points (series, ts, d0, d1, d2, d3) VALUES (?, ?, ?, ?, ?, ?)',
+                             (series, points[-1][0], *[sum(column) for column in zip(*(d for _, d in points))]))
+        stale = now - ENGAGEMENT_RETENTION
+        conn.execute('DELETE FROM points WHERE series IN (SELECT id FROM series WHERE ts < ?)', (stale,))
+        conn.execute('DELETE FROM series WHERE ts < ?', (stale,))
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('compacted_at', ?)", (str(now),))
+    
+    def query(self, windows=ENGAGEMENT_WINDOWS, top=ENGAGEMENT_TOP, limit=10, now=None):
+        """Current counts, gains and hourly rates per window for the profile and our newest tweets."""
+        spans = {w: _window_seconds(w) for w in windows.split(',') if w}
+        if not spans:
+            raise ActionError('At least one window required')
+        now = now or time.time()
+        result = {'handle': self.handle(), 'age': None, 'user': None, 'tweets': [], 'top': {w: [] for w in spans}}
+        if not os.path.exists(self.path):
+            return result
+        age = self.age(now)
+        result['age'] = None if age is None else round(age)
+        conn = self._db()
+        series = conn.execute('SELECT id, kind, created, first_ts, v0, v1, v2, v3, info FROM series').fetchall()
+        points = {}
+        for sid, ts, *deltas in conn.execute('SELECT series, ts, d0, d1, d2, d3 FROM points WHERE ts > ?',
+                                             (now - max(spans.values()),)):
+            points.setdefault(sid, []).append((ts, deltas))
+        
+        def gains(sid, kind, created, first_ts):
+            fields = ENGAGEMENT_FIELDS[kind]
+            out = {}
+            for window, seconds in spans.items():
+                since = now - seconds
+                # The first point is everything gained before we first looked: it only
+                # counts when the tweet itself was posted inside the window
+                fresh = created is not None and created >= since
+                totals = [0] * 4
+                for ts, deltas in points.get(sid, ()):
+                    if ts > since and (ts > first_ts or fresh):
+                        totals = [a + b for a, b in zip(totals, deltas)]
+                start = created if fresh else max(since, first_ts)
+                hours = max(now - start, ENGAGEMENT_MIN_SPAN) / 3600
+                gained = dict(zip(fields, totals))
+                score = gained['followers'] if kind == 'user' else gained['likes'] + gained['retweets'] + gained['replies']
+                out[window] = {**gained, 'per_hour': round(score / hours, 2)}
+            return out
+        
+        user, tweets = None, []
+        for sid, kind, created, first_ts, v0, v1, v2, v3, info in series:
+            record = {**json.loads(info or '{}'), **dict(zip(ENGAGEMENT_FIELDS[kind], (v0, v1, v2, v3)))}
+            if kind == 'tweet':
+                tweets.append((created or 0, sid, first_ts, record))
+            elif user is None or first_ts >= user[0]:
+                # More than one user series only if the handle moved to another account
+                user = (first_ts, sid, record)
+        if user is not None:
+            first_ts, sid, record = user
+            result['user'] = {**record, 'gained': gains(sid, 'user', None, first_ts)}
+        tweets.sort(key=lambda t: t[0], reverse=True)
+        for created, sid, first_ts, tweet in tweets:
+            gained = gains(sid, 'tweet', created or None, first_ts)
+            for window, g in gained.items():
+                score = g['likes'] + g['retweets'] + g['replies']
+                if score:
+                    result['top'][window].append({'id': tweet.get('id'), 'text': tweet.get('text'),
+                                                  'engagement': score, 'per_hour': g['per_hour']})
+            if len(result['tweets']) < limit:
+                result['tweets'].append({**tweet, 'gained': gained})
+        for window, ranked in result['top'].items():
+            ranked.sort(key=lambda t: t['engagement'], reverse=True)
+            del ranked[top:]
+        return result
+    
+    def stats(self):
+        if not os.path.exists(self.path):
+            return {'series': 0, 'points': 0, 'bytes': 0}
+        conn = self._db()
+        series = conn.execute('SELECT COUNT(*) FROM series').fetchone()[0]
+        points = conn.execute('SELECT COUNT(*) FROM points').fetchone()[0]
+        size = sum(os.path.getsize(f) for f in (self.path, self.path + '-wal') if os.path.exists(f))
+        return {'series': series, 'points': points, 'bytes': size}
+    
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+_engagement = _AccountState('engagement', lambda: EngagementStore(_path(ENGAGEMENT_DB)))
+
+# --- Tweet/user metadata cache ---
+# Every serialized tweet and user is remembered by id (and users by screen
+# name) in a size-bounded LRU with per-kind TTLs. The in-memory LRU serves the
+# daemon; a SQLite table carries entries across CLI invocations so parent-tweet
+# lookups and handle -> id resolution rarely touch the network.
+CACHE_DB = os.path.join(SCRIPT_DIR, '..', '.meta_cache.db')
+CACHE_MAX_ENTRIES = 5000  # in memory
+CACHE_DB_MAX_ENTRIES = 100000  # on disk
+CACHE_TTL = {
+    'tweet': 3600,  # text/author never change; engagement counts drift
+    'user': 900,
+    'handle': 86400 * 7,  # screen name -> user id
+}
+
+class MetaCache:
+    """LRU+TTL cache of serialized tweets/users with hit/miss counters, persisted to SQLite."""
+    
+    def __init__(self, path):
+        from collections import OrderedDict
+        self.path = path
+        self.mem = OrderedDict()  # key -> (ts, value)
+        self.dirty = {}
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+    
+    def _db(self):
+        if self._conn is None:
+            import sqlite3
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS cache (id INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE, '
+                         'value TEXT NOT NULL, ts REAL NOT NULL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            self._conn = conn
+        return self._conn
+    
+    def _remember(self, key, entry):
+        self.mem[key] = entry
+        self.mem.move_to_end(key)
+        while len(self.mem) > CACHE_MAX_ENTRIES:
+            self.mem.popitem(last=False)
+    
+    def get(self, kind, ident):
+        """Cached value for (kind, ident), or None if missing or expired."""
+        import sqlite3
+        key = f'{kind}:{ident}'
+        entry = self.mem.get(key)
+        if entry is None and os.path.exists(self.path):
+            try:
+                row = self._db().execute('SELECT ts, value FROM cache WHERE key = ?', (key,)).fetchone()
+            except sqlite3.Error:
+                row = None
+            if row:
+                entry = (row[0], json.loads(row[1]))
+                self._remember(key, entry)
+        if entry is not None and time.time() - entry[0] < CACHE_TTL[kind]:
+            self.mem.move_to_end(key)
+            self.hits += 1
+            _tracer.count('cache_hits')
+            return entry[1]
+        self.misses += 1
+        _tracer.count('cache_misses')
+        return None
+    
+    def put(self, kind, ident, value):
+        key = f'{kind}:{ident}'
+        entry = (time.time(), value)
+        self._remember(key, entry)
+        self.dirty[key] = entry
+    
+    def save(self):
+        """Write new entries and counters to disk in one transaction."""
+        import sqlite3
+        if not self.dirty and not self.hits and not self.misses:
+            return
+        try:
+            conn = self._db()
+            with conn:
+                conn.executemany('INSERT OR REPLACE INTO cache (key, value, ts) VALUES (?, ?, ?)',
+                                 [(k, json.dumps(v), ts) for k, (ts, v) in self.dirty.items()])
+                conn.execute('DELETE FROM cache WHERE id <= (SELECT MAX(id) FROM cache) - ?', (CACHE_DB_MAX_ENTRIES,))
+                conn.executemany('INSERT INTO counters VALUES (?, ?) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value',
+                                 [('hits', self.hits), ('misses', self.misses)])
+        except sqlite3.Error:
+            return
+        self.dirty.clear()
+        self.hits = self.misses = 0
+    
+    def stats(self):
+        """Lifetime hit/miss counters and entry counts."""
+        self.save()
+        counters, entries = {}, 0
+        if os.path.exists(self.path):
+            conn = self._db()
+            counters = dict(conn.execute('SELECT name, value FROM counters'))
+            entries = conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        hits, misses = counters.get('hits', 0), counters.get('misses', 0)
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+            'entries': entries,
+            'in_memory': len(self.mem),
+        }
+    
+    def clear(self):
+        self.mem.clear()
+        self.dirty.clear()
+        if os.path.exists(self.path):
+            with self._db() as conn:
+                conn.execute('DELETE FROM cache')
+                conn.execute('DELETE FROM counters')
+
+_cache = MetaCache(CACHE_DB)
+
+def serialize_tweet(t, source=None):
+    with _tracer.span('serialize'):
+        return _serialize_tweet(t, source)
+
+def _serialize_tweet(t, source):
+    # Every field is built even under --fields: the cache and archive keep full records
+    user = t.user
+    created_at = t.created_at
+    tweet = {
+        'id': t.id,
+        'text': t.text,
+        'user': user.screen_name if user else None,
+        'user_name': user.name if user else None,
+        'user_avatar': user.profile_image_url if user else None,
+        'created_at': str(created_at) if created_at else None,
+        'likes': t.favorite_count,
+        'retweets': t.retweet_count,
+        'replies': getattr(t, 'reply_count', None),
+        'views': getattr(t, 'view_count', None),
+    }
+    _cache.put('tweet', tweet['id'], tweet)
+    # twikit exposes no conversation id property; it lives in the legacy payload
+    legacy = getattr(t, '_legacy', None) or {}
+    _archive.add(tweet, conversation_id=legacy.get('conversation_id_str'),
+                 reply_to=getattr(t, 'in_reply_to', None), source=source)
+    return tweet
+
+def serialize_user(u):
+    with _tracer.span('serialize'):
+        return _serialize_user(u)
+
+def _serialize_user(u):
+    user = {
+        'id': u.id,
+        'name': u.name,
+        'username': u.screen_name,
+        'bio': u.description,
+        'followers': u.followers_count,
+        'following': u.following_count,
+        'tweets': u.statuses_count,
+        'avatar': getattr(u, 'profile_image_url', None),
+        'verified': getattr(u, 'is_blue_verified', None),
+    }
+    _cache.put('user', user['id'], user)
+    if user['username']:
+        _cache.put('handle', user['username'].lower(), user['id'])
+    return user
+
+async def _resolve_user_id(client, screen_name):
+    """Map a screen name to a user id, only hitting the network on a cache miss."""
+    screen_name = screen_name.lstrip('@')
+    user_id = _cache.get('handle', screen_name.lower())
+    if user_id is None:
+        user_id = serialize_user(await client.get_user_by_screen_name(screen_name))['id']
+    return user_id